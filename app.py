@@ -1,19 +1,104 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
+import gc
 import os
 import json
+import threading
+from contextlib import contextmanager
+from functools import wraps
 from grammar_engine import ConjugationEngine
-from translation_model import AdvancedTranslationModel
+from lexicon import get_lexicon, get_lexicon_journal, get_loaded_lexicon, update_lexicon
+from lexicon_snapshot import LexiconSnapshots
+from metrics import StageTimer, observe_dictionary_write, render_metrics
+from prefork import default_torch_threads, set_torch_threads, worker_info
+from request_profiler import RequestProfiler
+from tokenizer import split_sentences
+from translation_memory import get_translation_memory
+from translation_model import AdvancedTranslationModel, INFERENCE_PROFILES, PendingTranslation
 
 app = Flask(__name__)
 
+# Máximo de textos aceptados en una sola petición de traducción por lotes
+MAX_BATCH_ITEMS = 1000
+
+# Caché de traducciones: número máximo de resultados (0 la desactiva) y expiración en segundos
+TRANSLATION_CACHE_SIZE = int(os.environ.get('TRANSLATION_CACHE_SIZE', 1024))
+TRANSLATION_CACHE_TTL = float(os.environ.get('TRANSLATION_CACHE_TTL', 3600))
+
+# Carga de NLLB: 'background' (por defecto), 'sync' o 'none'
+NLLB_LOADING = os.environ.get('NLLB_LOADING', 'background')
+
+# Micro-lotes de NLLB: tamaño máximo del lote y espera máxima para formarlo (ms)
+NLLB_MAX_BATCH_SIZE = int(os.environ.get('NLLB_MAX_BATCH_SIZE', 32))
+NLLB_MAX_WAIT_MS = float(os.environ.get('NLLB_MAX_WAIT_MS', 10))
+
+# Perfil de inferencia de NLLB en CPU: 'quality' (por defecto), 'balanced', 'fast' o 'bf16'
+NLLB_INFERENCE_PROFILE = os.environ.get('NLLB_INFERENCE_PROFILE', 'quality')
+
+# Despliegue pre-fork (gunicorn.conf.py): cargar modelo y léxico una sola vez en el maestro
+PRELOAD_MODEL = os.environ.get('PRELOAD_MODEL', '').lower() in ('1', 'true', 'yes')
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+# Hilos de PyTorch por worker (0 = núcleos / workers) e hilos inter-op
+TORCH_THREADS_PER_WORKER = int(os.environ.get('TORCH_THREADS_PER_WORKER', 0))
+TORCH_INTEROP_THREADS = int(os.environ.get('TORCH_INTEROP_THREADS', 1))
+
+# Perfilado bajo demanda: desactivado por defecto; si se activa, se perfilan solo las peticiones
+# con la cabecera X-Profile: 1 o el parámetro ?profiling=1
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+PROFILING_DIR = os.environ.get('PROFILING_DIR', 'profiles')
+# 'cprofile' (determinista, volcado pstats) o 'sampling' (pilas colapsadas)
+PROFILING_MODE = os.environ.get('PROFILING_MODE', 'cprofile')
+PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 1))
+PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', 100))
+
+request_profiler = RequestProfiler(PROFILING_DIR, PROFILING_MODE, PROFILING_INTERVAL_MS / 1000,
+                                   PROFILING_MAX_PROFILES) if PROFILING_ENABLED else None
+
+def profiling_requested():
+    return request.headers.get('X-Profile') in ('1', 'true') or request.args.get('profiling') in ('1', 'true')
+
+def profiled(view):
+    """Perfilar la vista cuando la petición lo pide; sin perfilado configurado la vista queda intacta"""
+    if request_profiler is None:
+        return view
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiling_requested():
+            return view(*args, **kwargs)
+        response, profile_id = request_profiler.profile(
+            lambda: app.make_response(view(*args, **kwargs)),
+            {'endpoint': request.path, 'content_length': request.content_length})
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = profile_id
+            if response.is_json:
+                payload = response.get_json()
+                if isinstance(payload, dict):
+                    payload['profile_id'] = profile_id
+                    response.set_data(json.dumps(payload, ensure_ascii=False))
+        return response
+
+    return wrapper
+
 # Inicializar el modelo de traducción avanzado
 translation_model = None
+translation_model_lock = threading.Lock()
 
 def get_translation_model():
     global translation_model
     if translation_model is None:
-        nasa_yuwe_dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
-        translation_model = AdvancedTranslationModel(nasa_yuwe_dictionary_path)
+        with translation_model_lock:
+            if translation_model is None:
+                nasa_yuwe_dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
+                # Diccionario y gramática quedan listos de inmediato; NLLB carga en segundo plano
+                translation_model = AdvancedTranslationModel(
+                    nasa_yuwe_dictionary_path,
+                    cache_size=TRANSLATION_CACHE_SIZE,
+                    cache_ttl=TRANSLATION_CACHE_TTL,
+                    nllb_loading=None if NLLB_LOADING == 'none' else NLLB_LOADING,
+                    nllb_max_batch_size=NLLB_MAX_BATCH_SIZE,
+                    nllb_max_wait=NLLB_MAX_WAIT_MS / 1000,
+                    inference_profile=NLLB_INFERENCE_PROFILE
+                )
     return translation_model
 
 # Mantener compatibilidad con el motor de conjugación
@@ -23,55 +108,289 @@ def get_conjugation_engine():
     global conjugation_engine
     if conjugation_engine is None:
         nasa_yuwe_dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
-        conjugation_engine = ConjugationEngine(nasa_yuwe_dictionary_path)
+        # Comparte el mismo léxico en memoria que el modelo de traducción
+        conjugation_engine = ConjugationEngine(nasa_yuwe_dictionary_path, lexicon=get_lexicon(nasa_yuwe_dictionary_path))
     return conjugation_engine
 
+model_preloaded = False
+
+def preload_translation_model():
+    """Construir el modelo (con NLLB ya cargado), el léxico y el motor de conjugación antes del fork"""
+    global model_preloaded
+    if NLLB_LOADING != 'none':
+        # Un solo hilo en el maestro: el pool de hilos de OpenMP no sobrevive al fork. Los hilos
+        # inter-op solo pueden fijarse antes del primer trabajo de PyTorch, así que se fijan aquí
+        # y los workers los heredan
+        set_torch_threads(1, TORCH_INTEROP_THREADS)
+    model = get_translation_model()
+    # El hilo de carga de NLLB tampoco sobrevive al fork: esperar a que termine aquí
+    model.wait_until_ready()
+    get_conjugation_engine()
+    model.share_memory()
+    # Sacar del recolector cíclico lo ya creado (léxico, índices, motor): al recorrerlo
+    # escribiría en sus páginas y cada worker acabaría con una copia privada
+    gc.collect()
+    gc.freeze()
+    model_preloaded = True
+    return model
+
+def create_app(preload=None):
+    """Fábrica de la aplicación para servidores WSGI (gunicorn 'app:create_app()')"""
+    if PRELOAD_MODEL if preload is None else preload:
+        preload_translation_model()
+    return app
+
+def init_worker(workers=WORKERS):
+    """Configurar un worker recién creado (hook post_fork de gunicorn.conf.py)"""
+    if NLLB_LOADING != 'none':
+        # Tras el fork solo los hilos intra-op: los inter-op ya los fijó preload_translation_model
+        set_torch_threads(TORCH_THREADS_PER_WORKER or default_torch_threads(workers))
+
+# Instantáneas del léxico para el cliente y registro de cambios para los deltas
+lexicon_snapshots = LexiconSnapshots()
+
+# Serializa las escrituras del diccionario para publicarlas en memoria en el mismo orden que en el diario
+dictionary_write_lock = threading.Lock()
+
+@contextmanager
+def dictionary_write(timer):
+    """Tomar el bloqueo de escritura del diccionario midiendo la espera"""
+    with timer.stage('lock'):
+        dictionary_write_lock.acquire()
+    try:
+        yield
+    finally:
+        dictionary_write_lock.release()
+
+def apply_dictionary_changes(dictionary_path, operations, journal_position=None):
+    """Aplicar en memoria los cambios ya escritos en el diario (hasta `journal_position`), sin reiniciar"""
+    global conjugation_engine
+    previous = get_loaded_lexicon(dictionary_path)
+    lexicon = update_lexicon(dictionary_path, operations, journal_position)
+    if lexicon is None or not operations:
+        # Aún no se cargó (al cargarse leerá la instantánea y el diario completos)
+        # o solo avanzó la posición en el diario
+        return
+    if previous is not None:
+        lexicon_snapshots.record(previous.version, lexicon.version, operations)
+    if translation_model is not None:
+        translation_model.apply_lexicon_update(lexicon, operations)
+    if conjugation_engine is not None:
+        conjugation_engine = conjugation_engine.with_lexicon(lexicon, operations)
+
+@app.before_request
+def sync_worker_state():
+    """
+    Ponerse al día con lo que otros workers escribieron en el diario del
+    diccionario y en la memoria de traducción antes de atender la petición.
+
+    Con varios procesos (pre-fork) cada escritura se publica en memoria solo
+    en el worker que la atendió; los demás la aplican aquí. Si nada cambió,
+    el costo es consultar el tamaño de ambos archivos.
+    """
+    dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
+    lexicon = get_loaded_lexicon(dictionary_path)
+    if lexicon is not None:
+        journal = get_lexicon_journal(dictionary_path)
+        if journal.changed_since(lexicon.journal_position):
+            with dictionary_write_lock:
+                # Otro hilo pudo publicar los mismos cambios mientras se esperaba el bloqueo
+                lexicon = get_loaded_lexicon(dictionary_path)
+                operations, position = journal.read_since(lexicon)
+                apply_dictionary_changes(dictionary_path, operations, position)
+    memory = translation_model.memory if translation_model is not None else None
+    if memory is not None and memory.changed_on_disk():
+        memory.refresh()
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+def validate_translation_request(text, source_lang, target_lang, profile=None):
+    """Validar una petición de traducción; devuelve el mensaje de error o None"""
+    if not text:
+        return 'No se proporcionó texto para traducir'
+
+    if profile is not None and profile not in INFERENCE_PROFILES:
+        return f'Perfil de inferencia desconocido: {profile}'
+
+    if source_lang == target_lang:
+        return 'El idioma de origen y destino no pueden ser iguales'
+
+    # Validar idiomas soportados
+    if not ((source_lang == 'spanish' and target_lang == 'nasa_yuwe') or 
+            (source_lang == 'nasa_yuwe' and target_lang == 'spanish')):
+        return 'Solo se admite traducción entre Español y Nasa Yuwe'
+
+    return None
+
+def wants_timings(data):
+    """Tiempos por etapa en la respuesta: campo "timings": true o ?timings=1"""
+    return bool(data.get('timings')) or request.args.get('timings') in ('1', 'true')
+
+def format_translation_result(result):
+    """Respuesta JSON de una traducción"""
+    response = {
+        'translation': result['translation'],
+        'status': 'success',
+        'method': result['method'],
+        'confidence': result['confidence'],
+        'methods_tried': result.get('methods_tried', [])
+    }
+    if 'fuzzy_matches' in result:
+        response['fuzzy_matches'] = result['fuzzy_matches']
+    if 'memory_match' in result:
+        response['memory_match'] = result['memory_match']
+    return response
+
+def format_live_result(text, result):
+    """
+    Respuesta de la traducción en vivo (mientras se escribe): solo caché,
+    diccionario y gramática. `complete` es False cuando el texto solo puede
+    traducirlo NLLB; el cliente pide entonces la traducción completa cuando
+    se deja de escribir.
+    """
+    if isinstance(result, PendingTranslation):
+        return dict(format_translation_result({'translation': text, 'method': 'fallback', 'confidence': 0.1}),
+                    live=True, complete=False)
+    return dict(format_translation_result(result), live=True, complete=True)
+
 @app.route('/api/translate-text', methods=['POST'])
+@profiled
 def translate_text_endpoint():
     try:
         data = request.get_json()
         text = data.get('text', '').strip()
         source_lang = data.get('source_lang', 'spanish')
         target_lang = data.get('target_lang', 'nasa_yuwe')
+        profile = data.get('profile')
 
-        if not text:
-            return jsonify({'error': 'No se proporcionó texto para traducir'})
-
-        if source_lang == target_lang:
-            return jsonify({'error': 'El idioma de origen y destino no pueden ser iguales'})
-
-        # Validar idiomas soportados
-        if not ((source_lang == 'spanish' and target_lang == 'nasa_yuwe') or 
-                (source_lang == 'nasa_yuwe' and target_lang == 'spanish')):
-            return jsonify({
-                'error': 'Solo se admite traducción entre Español y Nasa Yuwe'
-            })
+        error = validate_translation_request(text, source_lang, target_lang, profile)
+        if error:
+            return jsonify({'error': error})
 
         # Usar el modelo de traducción avanzado
         model = get_translation_model()
-        result = model.translate(text, source_lang, target_lang)
+        timer = StageTimer() if wants_timings(data) else None
+        if data.get('live'):
+            # Traducción en vivo: nunca espera en la cola de NLLB
+            result = model.translate(text, source_lang, target_lang, timer=timer, allow_nllb=False)
+            response = format_live_result(text, result)
+        else:
+            result = model.translate(text, source_lang, target_lang, profile=profile, timer=timer)
+            response = format_translation_result(result)
+        if timer is not None:
+            response['timings'] = timer.as_dict()
+        return jsonify(response)
 
-        return jsonify({
-            'translation': result['translation'],
-            'status': 'success',
-            'method': result['method'],
-            'confidence': result['confidence'],
-            'methods_tried': result.get('methods_tried', [])
-        })
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/translate-batch', methods=['POST'])
+def translate_batch_endpoint():
+    """Traducir una lista de textos en una sola petición"""
+    try:
+        data = request.get_json()
+        default_source = data.get('source_lang', 'spanish')
+        default_target = data.get('target_lang', 'nasa_yuwe')
+        default_profile = data.get('profile')
+
+        # Se aceptan 'items' (texto e idiomas por elemento) o 'texts' (idiomas comunes)
+        items = data.get('items')
+        if items is None:
+            items = data.get('texts', [])
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'No se proporcionaron textos para traducir'})
+
+        if len(items) > MAX_BATCH_ITEMS:
+            return jsonify({'error': f'Se admiten como máximo {MAX_BATCH_ITEMS} textos por petición'})
+
+        requests_to_translate = []
+        responses = [None] * len(items)
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                item = {'text': item}
+            text = str(item.get('text') or '').strip()
+            source_lang = item.get('source_lang', default_source)
+            target_lang = item.get('target_lang', default_target)
+            profile = item.get('profile', default_profile)
+
+            error = validate_translation_request(text, source_lang, target_lang, profile)
+            if error:
+                responses[position] = {'error': error}
+            else:
+                requests_to_translate.append((position, {
+                    'text': text,
+                    'source_lang': source_lang,
+                    'target_lang': target_lang,
+                    'profile': profile
+                }))
+
+        if requests_to_translate:
+            model = get_translation_model()
+            results = model.translate_batch([item for _, item in requests_to_translate])
+            for (position, _), result in zip(requests_to_translate, results):
+                responses[position] = format_translation_result(result)
+
+        return jsonify({'status': 'success', 'results': responses})
+
+    except Exception as e:
+        return jsonify({'error': str(e)})
+
+@app.route('/api/translate-stream', methods=['POST'])
+def translate_stream_endpoint():
+    """
+    Traducir un texto largo oración por oración.
+
+    Responde con JSON por líneas (application/x-ndjson): una línea por
+    oración en cuanto está traducida y una línea final con 'done'. Las
+    oraciones se traducen y se envían de una en una, sin acumular el
+    resultado completo.
+    """
+    try:
+        data = request.get_json()
+        text = data.get('text', '').strip()
+        source_lang = data.get('source_lang', 'spanish')
+        target_lang = data.get('target_lang', 'nasa_yuwe')
+        profile = data.get('profile')
+
+        error = validate_translation_request(text, source_lang, target_lang, profile)
+        if error:
+            return jsonify({'error': error})
 
+        model = get_translation_model()
+        timings = wants_timings(data)
     except Exception as e:
         return jsonify({'error': str(e)})
 
+    def generate():
+        count = 0
+        for index, (sentence, separator) in enumerate(split_sentences(text)):
+            timer = StageTimer() if timings else None
+            try:
+                result = format_translation_result(
+                    model.translate(sentence, source_lang, target_lang, profile=profile, timer=timer))
+                if timer is not None:
+                    result['timings'] = timer.as_dict()
+            except Exception as e:
+                result = {'error': str(e)}
+            result.update({'index': index, 'source': sentence, 'separator': separator})
+            count += 1
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+        yield json.dumps({'status': 'success', 'done': True, 'sentences': count}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/model-info', methods=['GET'])
 def get_model_info():
     """Obtener información sobre el modelo de traducción"""
     try:
         model = get_translation_model()
         info = model.get_model_info()
+        # Memoria de este worker: PSS descuenta las páginas compartidas con el maestro y los demás
+        info['worker'] = dict(worker_info(), preloaded=model_preloaded)
         return jsonify({
             'status': 'success',
             'model_info': info
@@ -79,6 +398,88 @@ def get_model_info():
     except Exception as e:
         return jsonify({'error': str(e)})
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métricas del proceso en el formato de texto de Prometheus"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """Perfiles capturados (más recientes primero)"""
+    if request_profiler is None:
+        return jsonify({'error': 'El perfilado está desactivado (PROFILING_ENABLED)'}), 404
+    return jsonify({'status': 'success', 'mode': request_profiler.mode, 'profiles': request_profiler.list_profiles()})
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """Descargar un perfil (pstats o pilas colapsadas); ?format=text da un resumen de un pstats"""
+    if request_profiler is None:
+        return jsonify({'error': 'El perfilado está desactivado (PROFILING_ENABLED)'}), 404
+    name = request_profiler.profile_file(profile_id)
+    if name is None:
+        return jsonify({'error': f'Perfil no encontrado: {profile_id}'}), 404
+    if request.args.get('format') == 'text':
+        summary = request_profiler.summary(profile_id)
+        if summary is not None:
+            return Response(summary, mimetype='text/plain')
+    return send_from_directory(os.path.abspath(request_profiler.directory), name, as_attachment=True)
+
+def etag_matches(if_none_match, etag):
+    """Comparación débil de ETag (If-None-Match puede traer varias etiquetas o '*')"""
+    tags = [tag.strip() for tag in (if_none_match or '').split(',')]
+    return '*' in tags or any(tag.removeprefix('W/') == etag.removeprefix('W/') for tag in tags)
+
+@app.route('/api/lexicon', methods=['GET'])
+def lexicon_snapshot():
+    """Instantánea comprimida del léxico (pares español - Nasa Yuwe) para resolver palabras en el cliente"""
+    try:
+        lexicon = get_lexicon(os.path.join('data', 'nasa_yuwe_dictionary.json'))
+        snapshot = lexicon_snapshots.snapshot(lexicon)
+        headers = {
+            'ETag': snapshot.etag,
+            'X-Lexicon-Version': snapshot.version,
+            # El cliente puede guardarla, pero debe revalidarla antes de usarla
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding'
+        }
+        if etag_matches(request.headers.get('If-None-Match'), snapshot.etag):
+            return Response(status=304, headers=headers)
+
+        encoding, body = snapshot.negotiate(request.headers.get('Accept-Encoding'))
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(body, mimetype='application/json', headers=headers)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/lexicon/delta', methods=['GET'])
+def lexicon_delta():
+    """Cambios del léxico desde ?since=<versión>; con "full": true hay que descargar la instantánea"""
+    try:
+        lexicon = get_lexicon(os.path.join('data', 'nasa_yuwe_dictionary.json'))
+        delta = lexicon_snapshots.delta(request.args.get('since', ''), lexicon)
+        if delta is None:
+            return jsonify({'status': 'success', 'full': True,
+                            'version': lexicon_snapshots.version_id(lexicon.version)})
+        return jsonify(dict(delta, status='success', full=False))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Estado de preparación por componente (503 mientras el servicio no está listo)"""
+    try:
+        model = get_translation_model()
+        readiness_info = model.get_readiness()
+        # Con ?require=nllb el servicio solo se considera listo cuando NLLB terminó de cargar
+        ready = readiness_info['ready']
+        if request.args.get('require') == 'nllb':
+            ready = ready and readiness_info['nllb_settled']
+        readiness_info['ready'] = ready
+        return jsonify(readiness_info), 200 if ready else 503
+    except Exception as e:
+        return jsonify({'ready': False, 'error': str(e)}), 503
+
 def translate_to_indigenous(text, dictionary):
     # Usar el motor de conjugación para mejorar la traducción
     engine = get_conjugation_engine()
@@ -109,20 +510,14 @@ def translate_to_spanish(text, dictionary):
     if enhanced_translation != text:
         return enhanced_translation
     
-    # Fallback al método original
+    # Fallback al método original, usando el índice inverso persistente del léxico
     words = text.split()
     translated_words = []
 
-    # Crear un diccionario inverso para buscar palabras en español
-    reverse_dict = {}
-    for spanish_word, data in dictionary.items():
-        indigenous_word = data['traduccion'].lower()
-        reverse_dict[indigenous_word] = spanish_word
-
     for word in words:
-        word_lower = word.lower()
-        if word_lower in reverse_dict:
-            translated_words.append(reverse_dict[word_lower])
+        spanish_word = engine.lexicon.reverse_lookup(word)
+        if spanish_word is not None:
+            translated_words.append(spanish_word)
         else:
             translated_words.append(word)
 
@@ -130,6 +525,7 @@ def translate_to_spanish(text, dictionary):
 
 @app.route('/add_word', methods=['POST'])
 def add_word():
+    timer = StageTimer()
     try:
         data = request.get_json()
         spanish_word = data.get('spanish_word', '').strip()
@@ -140,42 +536,36 @@ def add_word():
         if not spanish_word or not nasa_yuwe_translation or not context:
             return jsonify({'error': 'Todos los campos son obligatorios'}), 400
         
-        # Cargar el diccionario actual
         dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
         
-        try:
-            with open(dictionary_path, 'r', encoding='utf-8') as f:
-                dictionary = json.load(f)
-        except FileNotFoundError:
-            dictionary = {}
-        
-        # Verificar si la palabra ya existe (case-insensitive)
-        spanish_word_lower = spanish_word.lower()
-        existing_word = None
-        for word in dictionary.keys():
-            if word.lower() == spanish_word_lower:
-                existing_word = word
-                break
-        
-        if existing_word:
-            return jsonify({'error': f'La palabra "{existing_word}" ya existe en el diccionario'}), 409
-        
-        # Agregar la nueva palabra al diccionario
-        dictionary[spanish_word] = {
-            'traduccion': nasa_yuwe_translation,
-            'explanation': context
-        }
-        
-        # Guardar el diccionario actualizado
-        with open(dictionary_path, 'w', encoding='utf-8') as f:
-            json.dump(dictionary, f, ensure_ascii=False, indent=4)
+        with dictionary_write(timer):
+            # Comprobar duplicados (léxico publicado + diario) y anexar al diario bajo el mismo bloqueo
+            lexicon = get_lexicon(dictionary_path)
+            with timer.stage('journal'), get_lexicon_journal(dictionary_path).edit(lexicon) as edit:
+                # Verificar si la palabra ya existe (case-insensitive)
+                existing_word = edit.find_key(spanish_word)
+                if existing_word:
+                    observe_dictionary_write('add_word', 'conflict', timer)
+                    return jsonify({'error': f'La palabra "{existing_word}" ya existe en el diccionario'}), 409
+                
+                # Agregar la nueva palabra al diccionario
+                edit.set(spanish_word, {
+                    'traduccion': nasa_yuwe_translation,
+                    'explanation': context
+                })
+            
+            # Nueva versión del léxico en memoria (invalida la caché de traducciones)
+            with timer.stage('apply'):
+                apply_dictionary_changes(dictionary_path, edit.changes, edit.position)
         
+        observe_dictionary_write('add_word', 'success', timer)
         return jsonify({
             'status': 'success', 
             'message': f'Palabra "{spanish_word}" agregada exitosamente al diccionario'
         })
         
     except Exception as e:
+        observe_dictionary_write('add_word', 'error', timer)
         return jsonify({'error': f'Error al agregar la palabra: {str(e)}'}), 500
 
 @app.route('/api/feedback', methods=['POST'])
@@ -192,64 +582,72 @@ def receive_feedback():
 
         # Solo trabajamos con el diccionario de Nasa Yuwe
         dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
+        # Un texto de varias palabras que no es una entrada del diccionario es una oración:
+        # su corrección va a la memoria de traducción y no al léxico
+        is_sentence = len(original_text.split()) > 1
+        stored_in = 'lexicon'
 
+        timer = StageTimer()
         try:
-            # Cargar el diccionario existente
-            with open(dictionary_path, 'r', encoding='utf-8') as f:
-                dictionary = json.load(f)
-
-            # Normalizar textos
-            original_text_lower = original_text.lower()
-            corrected_translation_lower = corrected_translation.lower()
-
-            if source_lang == 'spanish' and target_lang == 'nasa_yuwe':
-                # Buscar si ya existe una entrada para esta palabra en español
-                entry_found = False
-                for key in dictionary.keys():
-                    if key.lower() == original_text_lower:
-                        # Actualizar la traducción existente
-                        dictionary[key]['traduccion'] = corrected_translation
-                        entry_found = True
-                        break
-                
-                # Si no se encontró, crear nueva entrada
-                if not entry_found:
-                    dictionary[original_text] = {
-                        'traduccion': corrected_translation,
-                        'explanation': 'Agregado por retroalimentación de usuario'
-                    }
-            
-            elif source_lang == 'nasa_yuwe' and target_lang == 'spanish':
-                # Buscar la entrada que tiene esta traducción en Nasa Yuwe
-                entry_found = False
-                for spanish_word, data in dictionary.items():
-                    if data['traduccion'].lower() == original_text_lower:
-                        # Actualizar la palabra en español (clave del diccionario)
-                        # Crear nueva entrada con la palabra corregida
-                        dictionary[corrected_translation] = {
-                            'traduccion': data['traduccion'],
-                            'explanation': data.get('explanation', '')
-                        }
-                        # Eliminar la entrada anterior si es diferente
-                        if spanish_word.lower() != corrected_translation.lower():
-                            del dictionary[spanish_word]
-                        entry_found = True
-                        break
-                
-                # Si no se encontró, crear nueva entrada
-                if not entry_found:
-                    dictionary[corrected_translation] = {
-                        'traduccion': original_text,
-                        'explanation': 'Agregado por retroalimentación de usuario'
-                    }
-
-            # Guardar el diccionario actualizado
-            with open(dictionary_path, 'w', encoding='utf-8') as f:
-                json.dump(dictionary, f, ensure_ascii=False, indent=4)
-
-            return jsonify({'status': 'success', 'message': 'Retroalimentación guardada exitosamente'})
+            with dictionary_write(timer):
+                # Las correcciones se anexan al diario bajo un bloqueo de archivo
+                lexicon = get_lexicon(dictionary_path)
+                with timer.stage('journal'), get_lexicon_journal(dictionary_path).edit(lexicon) as edit:
+                    if source_lang == 'spanish' and target_lang == 'nasa_yuwe':
+                        # Buscar si ya existe una entrada para esta palabra en español
+                        key = edit.find_key(original_text)
+                        if key:
+                            # Actualizar la traducción existente
+                            entry = dict(edit.get(key))
+                            entry['traduccion'] = corrected_translation
+                            edit.set(key, entry)
+                        elif is_sentence:
+                            stored_in = 'translation_memory'
+                        else:
+                            # Si no se encontró, crear nueva entrada
+                            edit.set(original_text, {
+                                'traduccion': corrected_translation,
+                                'explanation': 'Agregado por retroalimentación de usuario'
+                            })
+
+                    elif source_lang == 'nasa_yuwe' and target_lang == 'spanish':
+                        # Buscar la entrada que tiene esta traducción en Nasa Yuwe
+                        spanish_word = edit.find_by_translation(original_text)
+                        if spanish_word:
+                            data = edit.get(spanish_word)
+                            # Crear nueva entrada con la palabra corregida
+                            edit.set(corrected_translation, {
+                                'traduccion': data['traduccion'],
+                                'explanation': data.get('explanation', '')
+                            })
+                            # Eliminar la entrada anterior si es diferente
+                            if spanish_word.lower() != corrected_translation.lower():
+                                edit.delete(spanish_word)
+                        elif is_sentence:
+                            stored_in = 'translation_memory'
+                        else:
+                            # Si no se encontró, crear nueva entrada
+                            edit.set(corrected_translation, {
+                                'traduccion': original_text,
+                                'explanation': 'Agregado por retroalimentación de usuario'
+                            })
+
+                if stored_in == 'translation_memory':
+                    # Se anexa al archivo de la memoria y se publica en memoria (invalida la caché)
+                    with timer.stage('memory'):
+                        get_translation_memory(os.path.join('data', 'translation_memory.jsonl')).store(
+                            source_lang, target_lang, original_text, corrected_translation)
+                else:
+                    # Nueva versión del léxico en memoria (invalida la caché de traducciones)
+                    with timer.stage('apply'):
+                        apply_dictionary_changes(dictionary_path, edit.changes, edit.position)
+
+            observe_dictionary_write('feedback', 'success', timer)
+            return jsonify({'status': 'success', 'message': 'Retroalimentación guardada exitosamente',
+                            'stored_in': stored_in})
 
         except Exception as e:
+            observe_dictionary_write('feedback', 'error', timer)
             return jsonify({'error': f'Error al procesar la retroalimentación: {str(e)}'})
 
     except Exception as e:
@@ -258,4 +656,8 @@ def receive_feedback():
 if __name__ == '__main__':
     # Asegurarse de que el directorio de datos existe
     os.makedirs('data', exist_ok=True)
+    # Cargar diccionario y gramática e iniciar el calentamiento de NLLB antes del primer usuario
+    # (solo en el proceso que atiende peticiones, no en el vigilante del recargador)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_translation_model()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,341 @@
+"""
+Modo de servicio asíncrono (ASGI) del traductor.
+
+Uso (con cualquier servidor ASGI estándar):
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8000
+    gunicorn -k uvicorn.workers.UvicornWorker asgi_app:app
+
+`/api/translate-text` se atiende de forma nativa: la caché, el diccionario y
+el motor gramatical corren en un ejecutor rápido propio, y solo los textos que
+necesitan NLLB pasan al ejecutor del modelo, limitado a
+ASYNC_MODEL_CONCURRENCY traducciones simultáneas (con ASYNC_MODEL_QUEUE en
+espera como máximo; por encima se responde 503). El ejecutor del modelo
+continúa desde lo que calculó el camino rápido, sin repetir las etapas de
+reglas. Así las traducciones por diccionario nunca esperan detrás de una
+inferencia.
+
+El resto de rutas (`/api/model-info`, `/add_word`, `/api/feedback`, lotes,
+progresiva, métricas, estáticos...) se sirven con las mismas vistas de Flask,
+ejecutadas en un ejecutor de hilos a través de un puente WSGI mínimo, de modo
+que ninguna bloquea el bucle de eventos.
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+import app as server
+from metrics import StageTimer
+from translation_model import PendingTranslation
+
+logger = logging.getLogger(__name__)
+
+# Hilos para caché, diccionario y gramática (camino rápido)
+ASYNC_FAST_WORKERS = int(os.environ.get('ASYNC_FAST_WORKERS', 4))
+# Traducciones con NLLB simultáneas (el planificador las agrupa en micro-lotes) y máximo en espera
+ASYNC_MODEL_CONCURRENCY = int(os.environ.get('ASYNC_MODEL_CONCURRENCY', 8))
+ASYNC_MODEL_QUEUE = int(os.environ.get('ASYNC_MODEL_QUEUE', 64))
+# Hilos para las vistas de Flask servidas a través del puente WSGI y fragmentos de respuesta
+# en espera por petición (la vista se detiene hasta que el cliente lee los anteriores)
+ASYNC_WSGI_WORKERS = int(os.environ.get('ASYNC_WSGI_WORKERS', 8))
+ASYNC_WSGI_QUEUE = int(os.environ.get('ASYNC_WSGI_QUEUE', 16))
+# Tamaño máximo del cuerpo de una petición
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', 10 * 1024 * 1024))
+
+# Fin de la respuesta de una vista WSGI
+_DONE = object()
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class AsyncTranslationServer:
+    """Aplicación ASGI 3 con ejecutores separados para el camino rápido, el modelo y las vistas WSGI"""
+
+    def __init__(self, wsgi_app=None, fast_workers: int = ASYNC_FAST_WORKERS,
+                 model_concurrency: int = ASYNC_MODEL_CONCURRENCY, model_queue: int = ASYNC_MODEL_QUEUE,
+                 wsgi_workers: int = ASYNC_WSGI_WORKERS, wsgi_queue: int = ASYNC_WSGI_QUEUE,
+                 max_body_bytes: int = ASYNC_MAX_BODY_BYTES):
+        self.wsgi_app = wsgi_app or server.app
+        self.fast_executor = ThreadPoolExecutor(fast_workers, thread_name_prefix='translate-fast')
+        self.model_executor = ThreadPoolExecutor(model_concurrency, thread_name_prefix='translate-model')
+        self.wsgi_executor = ThreadPoolExecutor(wsgi_workers, thread_name_prefix='wsgi')
+        self.model_concurrency = model_concurrency
+        self.model_queue = model_queue
+        self.wsgi_queue = wsgi_queue
+        self.max_body_bytes = max_body_bytes
+        # El semáforo se crea dentro del bucle de eventos que atiende las peticiones
+        self._model_slots = None
+        self._model_waiting = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    # Diccionario y gramática listos antes de la primera petición; NLLB carga según NLLB_LOADING
+                    await loop.run_in_executor(self.fast_executor, server.get_translation_model)
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for executor in (self.fast_executor, self.model_executor, self.wsgi_executor):
+                    executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        try:
+            body = await self.read_body(receive)
+        except RequestTooLarge:
+            await self.send_json(send, {'error': 'La petición es demasiado grande'}, 413)
+            return
+
+        if (scope['path'] == '/api/translate-text' and scope['method'] == 'POST'
+                and not self.profiling_requested(scope)):
+            await self.translate_text(scope, body, send)
+        else:
+            await self.call_wsgi(scope, body, send)
+
+    async def read_body(self, receive) -> bytes:
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                raise RequestTooLarge()
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    @staticmethod
+    def query(scope) -> Dict[str, List[str]]:
+        return parse_qs(scope.get('query_string', b'').decode('latin-1'))
+
+    def profiling_requested(self, scope) -> bool:
+        """Las peticiones a perfilar pasan por la vista de Flask, que es la que envuelve el perfilador"""
+        if server.request_profiler is None:
+            return False
+        headers = dict(scope.get('headers') or [])
+        return (headers.get(b'x-profile') in (b'1', b'true')
+                or self.query(scope).get('profiling', [''])[0] in ('1', 'true'))
+
+    @staticmethod
+    async def send_json(send, payload: Dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode('latin-1'))]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def translate_text(self, scope, body: bytes, send):
+        """Misma petición y respuesta que la vista de Flask, con NLLB fuera del camino rápido"""
+        try:
+            data = json.loads(body or b'null')
+            if not isinstance(data, dict):
+                await self.send_json(send, {'error': 'Se esperaba un objeto JSON'}, 400)
+                return
+            text = (data.get('text') or '').strip()
+            source_lang = data.get('source_lang', 'spanish')
+            target_lang = data.get('target_lang', 'nasa_yuwe')
+            profile = data.get('profile')
+
+            error = server.validate_translation_request(text, source_lang, target_lang, profile)
+            if error:
+                await self.send_json(send, {'error': error})
+                return
+
+            timer = None
+            if data.get('timings') or self.query(scope).get('timings', [''])[0] in ('1', 'true'):
+                timer = StageTimer()
+
+            loop = asyncio.get_running_loop()
+            model = server.translation_model
+            if model is None:
+                model = await loop.run_in_executor(self.fast_executor, server.get_translation_model)
+
+            # 1. Caché, diccionario y gramática: nunca esperan a NLLB
+            # (si el texto necesita el modelo devuelve una PendingTranslation)
+            result = await loop.run_in_executor(
+                self.fast_executor,
+                partial(self.translate_fast, model, text, source_lang, target_lang, profile=profile, timer=timer))
+            if data.get('live'):
+                # Traducción en vivo: se responde con lo que haya, sin pasar nunca al ejecutor del modelo
+                response = server.format_live_result(text, result)
+                if timer is not None:
+                    response['timings'] = timer.as_dict()
+                await self.send_json(send, response)
+                return
+            if isinstance(result, PendingTranslation):
+                # 2. El texto necesita NLLB: ejecutor del modelo, con concurrencia y espera limitadas
+                result = await self.translate_with_model(model, result, timer)
+                if result is None:
+                    await self.send_json(send, {'error': 'Servidor ocupado, inténtelo de nuevo'}, 503)
+                    return
+
+            response = server.format_translation_result(result)
+            if timer is not None:
+                response['timings'] = timer.as_dict()
+            await self.send_json(send, response)
+
+        except Exception as e:
+            await self.send_json(send, {'error': str(e)})
+
+    @staticmethod
+    def translate_fast(model, text: str, source_lang: str, target_lang: str, **kwargs):
+        """Camino rápido (sin NLLB), tras aplicar lo que otros workers escribieron; igual que before_request en Flask"""
+        server.sync_worker_state()
+        return model.translate(text, source_lang, target_lang, allow_nllb=False, **kwargs)
+
+    async def translate_with_model(self, model, pending: PendingTranslation,
+                                   timer: Optional[StageTimer]) -> Optional[Dict]:
+        """Completar con NLLB, en el ejecutor del modelo, lo que dejó el camino rápido; None si la cola está llena"""
+        if self._model_slots is None:
+            self._model_slots = asyncio.Semaphore(self.model_concurrency)
+        if self._model_slots.locked() and self._model_waiting >= self.model_queue:
+            return None
+
+        self._model_waiting += 1
+        try:
+            await self._model_slots.acquire()
+        finally:
+            self._model_waiting -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.model_executor, model.finish_translation, pending, timer)
+        finally:
+            self._model_slots.release()
+
+    @staticmethod
+    def wsgi_environ(scope, body: bytes) -> Dict:
+        """Entorno WSGI (PEP 3333) equivalente a una petición HTTP de ASGI"""
+        server_name, server_port = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server_name,
+            'SERVER_PORT': str(server_port),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False
+        }
+        for name, value in scope.get('headers') or []:
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = 'HTTP_' + name
+                environ[key] = environ[key] + ',' + value if key in environ else value
+        return environ
+
+    async def call_wsgi(self, scope, body: bytes, send):
+        """
+        Servir la petición con la aplicación Flask.
+
+        La vista y la iteración de su respuesta corren enteras en un mismo
+        hilo del ejecutor (las respuestas progresivas conservan su contexto de
+        Flask); los fragmentos llegan al bucle de eventos por una cola
+        limitada: si el cliente lee más despacio de lo que la vista produce,
+        la vista espera. Si la respuesta se abandona, la vista se detiene en
+        el siguiente fragmento.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(self.wsgi_queue)
+        response_start = {}
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            """Encolar desde el hilo de la vista esperando lugar; False si ya nadie lee la respuesta"""
+            if stopped.is_set():
+                return False
+            asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+            return True
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            response_start['status'] = int(status.split(' ', 1)[0])
+            response_start['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                         for name, value in headers]
+            return lambda data: put(data)
+
+        def run():
+            try:
+                iterable = self.wsgi_app(self.wsgi_environ(scope, body), start_response)
+                try:
+                    for chunk in iterable:
+                        if not put(chunk):
+                            break
+                finally:
+                    if hasattr(iterable, 'close'):
+                        iterable.close()
+            except BaseException as e:
+                put(e)
+            finally:
+                put(_DONE)
+
+        worker = loop.run_in_executor(self.wsgi_executor, run)
+        started = False
+        try:
+            while True:
+                item = await chunks.get()
+                if isinstance(item, BaseException):
+                    logger.error(f"Error en la vista WSGI {scope['path']}: {item}")
+                    if not started:
+                        await self.send_json(send, {'error': str(item)}, 500)
+                        started = True
+                        continue
+                    break
+                if item is _DONE:
+                    break
+                if not started:
+                    await send({'type': 'http.response.start', 'status': response_start['status'],
+                                'headers': response_start['headers']})
+                    started = True
+                if item:
+                    await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+            if not started:
+                await send({'type': 'http.response.start', 'status': response_start.get('status', 500),
+                            'headers': response_start.get('headers', [])})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            stopped.set()
+            # Vaciar la cola para liberar a la vista si espera lugar, hasta que termine
+            while not worker.done():
+                getter = asyncio.ensure_future(chunks.get())
+                await asyncio.wait({worker, getter}, return_when=asyncio.FIRST_COMPLETED)
+                getter.cancel()
+            await worker
+
+
+app = AsyncTranslationServer()
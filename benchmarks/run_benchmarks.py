@@ -0,0 +1,353 @@
+"""
+Banco de pruebas de rendimiento del traductor (sin red ni modelos descargados).
+
+Uso:
+    python benchmarks/run_benchmarks.py --sizes 1000,10000,100000 --output resultados.json
+    python benchmarks/run_benchmarks.py --compare resultados_base.json
+
+Para cada tamaño genera un léxico sintético con el esquema de
+`nasa_yuwe_dictionary.json` y una memoria de traducción con el mismo número
+de oraciones, mide la carga del léxico, del motor y de la memoria, las
+funciones principales de ConjugationEngine, las búsquedas en la memoria,
+AdvancedTranslationModel.translate en ambas direcciones y los endpoints de
+Flask con el cliente de pruebas.
+NLLB se reemplaza por un sustituto con latencia configurable. Los resultados
+se escriben en JSON; con --compare se comparan con una ejecución guardada y
+el proceso termina con código 1 si alguna medida empeora más que el umbral.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import random
+import logging
+import platform
+import argparse
+import tempfile
+from typing import Callable, Dict, List, Optional, Sequence
+
+# Ejecutable desde la raíz del repositorio o desde benchmarks/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_ITERATIONS = 200
+REGRESSION_THRESHOLD = 1.2
+
+SYLLABLES = ['ka', 'we', 'yu', 'nas', 'pa', 'lu', 'txi', 'me', 'wa', 'ki', 'ũus', 'sa', 'th', 'ne', 'kwe']
+LETTERS = 'abcdefghijlmnoprstuvz'
+FUNCTION_WORDS = ['el', 'la', 'los', 'las', 'de', 'en', 'y', 'que', 'con', 'por']
+MARKERS = ['ayer', 'mañana', 'hoy', 'ahora', 'siempre', 'dónde', 'cuándo', 'qué', 'cómo']
+
+
+class StubNLLB:
+    """Sustituto de NLLB: devuelve el texto marcado tras `latency` segundos por lote"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.texts = 0
+
+    def __call__(self, texts: List[str], source_lang: str, target_lang: str, profile: Optional[str] = None,
+                 timer=None) -> List[str]:
+        self.calls += 1
+        self.texts += len(texts)
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        if timer is not None:
+            timer.add('nllb.generate', time.perf_counter() - started)
+        return [f'[nllb] {text}' for text in texts]
+
+
+def generate_lexicon(size: int, seed: int = 0) -> Dict[str, Dict]:
+    """Léxico sintético: ~30% verbos, ~50% sustantivos, ~15% adjetivos, ~5% frases"""
+    rng = random.Random(seed)
+    lexicon = {}
+
+    def word(min_length=3, max_length=8):
+        return ''.join(rng.choice(LETTERS) for _ in range(rng.randint(min_length, max_length)))
+
+    def nasa_word():
+        return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))
+
+    while len(lexicon) < size:
+        kind = rng.random()
+        if kind < 0.30:
+            key = word() + rng.choice(['ar', 'er', 'ir'])
+            entry = {'traduccion': nasa_word() + '-',
+                     'explanation': rng.choice(['verbo transitivo', 'verbo intransitivo', 'verbo de acción'])}
+        elif kind < 0.80:
+            key = word() + rng.choice(['o', 'a', 'ción', 'dad', 'e'])
+            entry = {'traduccion': nasa_word(), 'explanation': 'sustantivo'}
+        elif kind < 0.95:
+            key = word() + rng.choice(['oso', 'iva', 'able', 'ente'])
+            entry = {'traduccion': nasa_word(), 'explanation': 'adjetivo'}
+        else:
+            key = f'{word()} {word()}'
+            entry = {'traduccion': f'{nasa_word()} {nasa_word()}', 'explanation': 'expresión'}
+        lexicon.setdefault(key, entry)
+    return lexicon
+
+
+def conjugate(verb: str, rng: random.Random) -> str:
+    """Forma conjugada simple de un verbo regular en español"""
+    endings = {'ar': ['o', 'as', 'a', 'amos', 'an'], 'er': ['o', 'es', 'e', 'emos', 'en'],
+               'ir': ['o', 'es', 'e', 'imos', 'en']}
+    return verb[:-2] + rng.choice(endings[verb[-2:]])
+
+
+def generate_sentences(lexicon: Dict[str, Dict], count: int, seed: int = 1) -> Dict[str, List]:
+    """Oraciones de prueba en ambas direcciones y formas conjugadas"""
+    rng = random.Random(seed)
+    keys = list(lexicon)
+    verbs = [key for key in keys if lexicon[key]['traduccion'].endswith('-')] or keys
+    spanish, nasa_yuwe, conjugated = [], [], []
+
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(4, 12)):
+            roll = rng.random()
+            if roll < 0.45:
+                words.append(rng.choice(keys))
+            elif roll < 0.60:
+                words.append(conjugate(rng.choice(verbs), rng))
+            elif roll < 0.80:
+                words.append(rng.choice(FUNCTION_WORDS))
+            elif roll < 0.90:
+                words.append(rng.choice(MARKERS))
+            else:
+                words.append(''.join(rng.choice(LETTERS) for _ in range(6)))  # palabra desconocida
+        sentence = ' '.join(words)
+        spanish.append(sentence[0].upper() + sentence[1:] + rng.choice(['.', '?', '!']))
+        nasa_yuwe.append(' '.join(lexicon[rng.choice(keys)]['traduccion'] for _ in range(rng.randint(3, 8))))
+        conjugated.append(conjugate(rng.choice(verbs), rng))
+
+    return {'spanish': spanish, 'nasa_yuwe': nasa_yuwe, 'conjugated': conjugated}
+
+
+def misspell(sentence: str, rng: random.Random) -> str:
+    """La oración con una letra sustituida (coincidencia aproximada en la memoria de traducción)"""
+    position = rng.randrange(len(sentence))
+    return sentence[:position] + rng.choice(LETTERS) + sentence[position + 1:]
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss: kilobytes en Linux, bytes en macOS
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure(function: Callable, inputs: Sequence, iterations: int) -> Dict:
+    """Latencia de cada llamada sobre `iterations` entradas (cíclicas)"""
+    timings = []
+    for i in range(iterations):
+        argument = inputs[i % len(inputs)]
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    total = sum(timings)
+    return {
+        'iterations': iterations,
+        'mean_ms': round(1000 * total / iterations, 4),
+        'p50_ms': round(1000 * timings[len(timings) // 2], 4),
+        'p95_ms': round(1000 * timings[min(len(timings) - 1, int(len(timings) * 0.95))], 4),
+        'max_ms': round(1000 * timings[-1], 4),
+        'ops_per_second': round(iterations / total, 1) if total else None
+    }
+
+
+def post(client, url: str, payload: Dict):
+    """POST con el cliente de pruebas; un error invalidaría la medida"""
+    response = client.post(url, json=payload)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{url} respondió {response.status_code}: {response.get_data(as_text=True)}")
+    return response
+
+
+def timed(function: Callable) -> Dict:
+    """Duración de una operación única (carga, construcción)"""
+    gc.collect()
+    started = time.perf_counter()
+    function()
+    return {'seconds': round(time.perf_counter() - started, 4)}
+
+
+def run_size(size: int, iterations: int, nllb_latency: float, seed: int) -> Dict:
+    """Todas las medidas para un léxico de `size` entradas (en un directorio temporal)"""
+    import app as flask_app
+    import lexicon as lexicon_module
+    import translation_memory as memory_module
+    from grammar_engine import ConjugationEngine
+    from lexicon import Lexicon
+    from translation_model import AdvancedTranslationModel
+
+    results = {}
+    entries = generate_lexicon(size, seed)
+    samples = generate_sentences(entries, max(50, min(iterations, 500)), seed + 1)
+    memory_sentences = generate_sentences(entries, size, seed + 2)['spanish']
+    original_cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            os.makedirs('data')
+            dictionary_path = os.path.join('data', 'nasa_yuwe_dictionary.json')
+            with open(dictionary_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=4)
+            del entries
+            memory_path = os.path.join('data', 'translation_memory.jsonl')
+            with open(memory_path, 'w', encoding='utf-8') as f:
+                for sentence in memory_sentences:
+                    f.write(json.dumps({'source_lang': 'spanish', 'target_lang': 'nasa_yuwe', 'source': sentence,
+                                        'translation': f'[tm] {sentence}'}, ensure_ascii=False) + '\n')
+
+            # Cada tamaño empieza con los singletons vacíos
+            lexicon_module._lexicons.clear()
+            lexicon_module._journals.clear()
+            memory_module._memories.clear()
+            flask_app.translation_model = None
+            flask_app.conjugation_engine = None
+
+            lexicon_holder = {}
+            results['load_lexicon'] = timed(lambda: lexicon_holder.update(lexicon=Lexicon.from_file(dictionary_path)))
+            lexicon = lexicon_holder['lexicon']
+            engine_holder = {}
+            results['build_engine'] = timed(lambda: engine_holder.update(engine=ConjugationEngine(dictionary_path, lexicon=lexicon)))
+            engine = engine_holder['engine']
+
+            results['enhance_translation'] = measure(
+                lambda text: engine.enhance_translation(text, 'spanish', 'nasa_yuwe'), samples['spanish'], iterations)
+            results['enhanced_contextual_translation'] = measure(
+                lambda text: engine.enhanced_contextual_translation(text, 'spanish', 'nasa_yuwe'), samples['spanish'], iterations)
+            results['detect_conjugated_form'] = measure(engine.detect_conjugated_form, samples['conjugated'], iterations)
+
+            # Memoria de traducción (el modelo usa la misma instancia): exactas, aproximadas y ausentes
+            memory_holder = {}
+            results['load_translation_memory'] = timed(
+                lambda: memory_holder.update(memory=memory_module.get_translation_memory(memory_path)))
+            memory = memory_holder['memory']
+            rng = random.Random(seed + 3)
+            stored = [rng.choice(memory_sentences) for _ in range(max(50, min(iterations, 500)))]
+            del memory_sentences
+            results['memory_lookup_exact'] = measure(
+                lambda text: memory.lookup(text.lower(), 'spanish', 'nasa_yuwe'), stored, iterations)
+            results['memory_lookup_similar'] = measure(
+                lambda text: memory.lookup(text, 'spanish', 'nasa_yuwe'), [misspell(text, rng) for text in stored], iterations)
+            results['memory_lookup_miss'] = measure(
+                lambda text: memory.lookup(text, 'spanish', 'nasa_yuwe'), samples['spanish'], iterations)
+
+            # Modelo completo sin caché (mide la tubería) y con NLLB sustituido
+            stub = StubNLLB(nllb_latency)
+            model = AdvancedTranslationModel(dictionary_path, cache_size=0, nllb_loading=None)
+            model._generate = stub
+            model.model_loaded = True
+            results['translate_spanish_to_nasa_yuwe'] = measure(
+                lambda text: model.translate(text, 'spanish', 'nasa_yuwe'), samples['spanish'], iterations)
+            results['translate_nasa_yuwe_to_spanish'] = measure(
+                lambda text: model.translate(text, 'nasa_yuwe', 'spanish'), samples['nasa_yuwe'], iterations)
+
+            # Endpoints de Flask con el mismo modelo
+            flask_app.translation_model = model
+            client = flask_app.app.test_client()
+            results['endpoint_translate_text'] = measure(
+                lambda text: post(client, '/api/translate-text', {'text': text}), samples['spanish'], iterations)
+            batch = [{'text': text} for text in samples['spanish'][:50]]
+            results['endpoint_translate_batch_50'] = measure(
+                lambda items: post(client, '/api/translate-batch', {'items': items}), [batch], max(1, iterations // 20))
+            new_words = [{'spanish_word': f'palabra{size}x{i}', 'nasa_yuwe_translation': f'wala{i}', 'context': 'prueba'}
+                         for i in range(iterations)]
+            results['endpoint_add_word'] = measure(lambda word: post(client, '/add_word', word), new_words, iterations)
+
+            results['nllb_stub'] = {'calls': stub.calls, 'texts': stub.texts, 'latency_seconds': nllb_latency}
+            results['peak_rss_mb'] = peak_rss_mb()
+        finally:
+            os.chdir(original_cwd)
+            flask_app.translation_model = None
+            flask_app.conjugation_engine = None
+            lexicon_module._lexicons.clear()
+            lexicon_module._journals.clear()
+            memory_module._memories.clear()
+
+    return results
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """Cocientes actual/base de cada medida común; marca las que superan el umbral"""
+    rows = []
+    for size, benchmarks in current['results'].items():
+        for name, values in benchmarks.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if not isinstance(values, dict) or not isinstance(base, dict):
+                continue
+            metric = 'p50_ms' if 'p50_ms' in values else 'seconds' if 'seconds' in values else None
+            if metric is None or not base.get(metric):
+                continue
+            ratio = values[metric] / base[metric]
+            rows.append({'size': size, 'benchmark': name, 'metric': metric, 'baseline': base[metric],
+                         'current': values[metric], 'ratio': round(ratio, 3), 'regression': ratio > threshold})
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Banco de pruebas de rendimiento del traductor Nasa Yuwe')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='tamaños de léxico separados por comas (p. ej. 1000,10000,100000,1000000)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help='llamadas por medida')
+    parser.add_argument('--nllb-latency', type=float, default=0.0, help='latencia del sustituto de NLLB (segundos por lote)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto, salida estándar)')
+    parser.add_argument('--compare', help='resultados base con los que comparar')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='cociente actual/base a partir del cual se considera regresión')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'iterations': args.iterations,
+            'nllb_latency': args.nllb_latency,
+            'seed': args.seed
+        },
+        'results': {}
+    }
+    for size in sizes:
+        print(f"Léxico de {size} entradas...", file=sys.stderr)
+        report['results'][str(size)] = run_size(size, args.iterations, args.nllb_latency, args.seed)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.threshold)
+        report['comparison'] = {'baseline': args.compare, 'threshold': args.threshold, 'rows': rows}
+        for row in rows:
+            flag = '  REGRESIÓN' if row['regression'] else ''
+            print(f"{row['size']:>8} {row['benchmark']:<36} {row['baseline']:>10} -> {row['current']:>10} "
+                  f"({row['ratio']}x){flag}", file=sys.stderr)
+        if any(row['regression'] for row in rows):
+            exit_code = 1
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
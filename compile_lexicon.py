@@ -0,0 +1,187 @@
+"""
+Compilar el diccionario JSON de Nasa Yuwe al formato binario de MappedLexicon.
+
+Uso:
+    python compile_lexicon.py [data/nasa_yuwe_dictionary.json] [-o data/nasa_yuwe_dictionary.bin]
+
+El artefacto incluye las entradas (instantánea + diario), los índices
+directo e inverso, las formas derivadas del Nasa Yuwe, las flexiones del
+español y la clase verbal de cada entrada. Guarda además la huella del
+diccionario del que proviene: si el diccionario cambia después, el servidor
+vuelve a cargar el JSON hasta que se compile de nuevo.
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Tuple
+from grammar_engine import ConjugationEngine
+from lexicon import Lexicon
+from lexicon_journal import LexiconJournal
+from mapped_lexicon import HEADER, ENTRY, MAGIC, FORMAT_VERSION, compiled_path, index_hash
+
+logger = logging.getLogger(__name__)
+
+# Clases verbales en el orden de identify_verb_patterns (el valor 0 = no es verbo)
+VERB_PATTERNS = ['transitive_verbs', 'intransitive_verbs', 'action_verbs']
+
+
+def _u32_bytes(values: List[int]) -> bytes:
+    data = array('I', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _build_hash_index(table: Dict[str, List[Tuple[int, ...]]], string_ids: Dict[str, int]) -> Tuple[List[int], List[int]]:
+    """Tabla de sondeo lineal (posición + 1 en el área de listas) y listas de valores"""
+    slots = 8
+    while slots < 2 * len(table):
+        slots *= 2
+    mask = slots - 1
+    slot_table = [0] * slots
+    postings = []
+
+    for key, values in table.items():
+        position = len(postings)
+        postings.append(string_ids[key])
+        postings.append(len(values))
+        for value in values:
+            postings.extend(value)
+
+        slot = index_hash(key.encode('utf-8')) & mask
+        while slot_table[slot]:
+            slot = (slot + 1) & mask
+        slot_table[slot] = position + 1
+
+    return slot_table, postings
+
+
+def compile_lexicon(dictionary_path: str, output_path: Optional[str] = None) -> str:
+    """Compilar el diccionario (instantánea + diario) y escribirlo de forma atómica"""
+    output_path = output_path or compiled_path(dictionary_path)
+    entries, journal_position, source = LexiconJournal(dictionary_path, normalize=Lexicon.normalize).load_with_state()
+
+    # Las tablas derivadas se calculan con las mismas reglas que usa el motor en memoria
+    lexicon = Lexicon(entries)
+    engine = ConjugationEngine(dictionary_path, lexicon=lexicon)
+
+    keys = list(entries)
+    entry_ids = {spanish_word: entry_id for entry_id, spanish_word in enumerate(keys)}
+    entry_json = [json.dumps(entries[spanish_word], ensure_ascii=False, sort_keys=True) for spanish_word in keys]
+
+    forms = sorted({form for values in engine.nasa_yuwe_forms.values() for _, form in values})
+    form_ids = {form: form_id for form_id, form in enumerate(forms)}
+    features = []
+    feature_ids = {}
+    for values in engine.inflection_table.values():
+        for _, _, feature in values:
+            feature_key = json.dumps(feature, sort_keys=True)
+            if feature_key not in feature_ids:
+                feature_ids[feature_key] = len(features)
+                features.append(feature)
+
+    indexes = {
+        'forward': {key: [(entry_ids[k],) for k in values] for key, values in lexicon.forward_index.items()},
+        'reverse': {key: [(entry_ids[k],) for k in values] for key, values in lexicon.reverse_index.items()},
+        'forms': {key: [(entry_ids[k], form_ids[form]) for k, form in values]
+                  for key, values in engine.nasa_yuwe_forms.items()},
+        'inflections': {key: [(entry_ids[k], rank[0], rank[1], feature_ids[json.dumps(feature, sort_keys=True)])
+                              for rank, k, feature in values]
+                        for key, values in engine.inflection_table.items()}
+    }
+    widths = {'forward': 1, 'reverse': 1, 'forms': 2, 'inflections': 4}
+
+    # Tabla de cadenas única y ordenada
+    strings = set(keys)
+    strings.update(entry_json)
+    strings.update(data['traduccion'] for data in entries.values())
+    for table in indexes.values():
+        strings.update(table)
+    strings = sorted(strings)
+    string_ids = {string: string_id for string_id, string in enumerate(strings)}
+
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    phrase_ids = [entry_ids[k] for k in keys if Lexicon._is_phrase(k, entries[k])]
+
+    sections = [
+        ('string_offsets', _u32_bytes(offsets)),
+        ('string_data', b''.join(encoded)),
+        ('entries', b''.join(ENTRY.pack(string_ids[spanish_word], string_ids[entries[spanish_word]['traduccion']],
+                                        string_ids[entry_json[entry_id]])
+                             for entry_id, spanish_word in enumerate(keys))),
+        ('verb_flags', bytes(VERB_PATTERNS.index(pattern) + 1 if pattern else 0
+                             for pattern in (engine.classify_verb_pattern(entries[k]) for k in keys))),
+        ('phrases', _u32_bytes(phrase_ids))
+    ]
+    index_metadata = {}
+    for name, table in indexes.items():
+        slot_table, postings = _build_hash_index(table, string_ids)
+        sections.append((name + '_slots', _u32_bytes(slot_table)))
+        sections.append((name + '_postings', _u32_bytes(postings)))
+        index_metadata[name] = {'slots': len(slot_table), 'width': widths[name], 'keys': len(table)}
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(b'\0' * HEADER.size)
+            section_metadata = {}
+            for name, data in sections:
+                # Alinear cada sección a 4 bytes
+                f.write(b'\0' * (-f.tell() % 4))
+                section_metadata[name] = [f.tell(), len(data)]
+                f.write(data)
+
+            metadata = json.dumps({
+                'format': FORMAT_VERSION,
+                'entries': len(keys),
+                'strings': len(strings),
+                'phrases': len(phrase_ids),
+                'sections': section_metadata,
+                'indexes': index_metadata,
+                'verb_patterns': VERB_PATTERNS,
+                'forms': forms,
+                'features': features,
+                'source': source,
+                'journal_position': journal_position
+            }, ensure_ascii=False).encode('utf-8')
+            metadata_offset = f.tell()
+            f.write(metadata)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, metadata_offset, len(metadata)))
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crea el archivo solo para el dueño; el léxico lo leen todos los procesos
+        os.chmod(temp_path, 0o644)
+        # Los procesos que ya tienen proyectado el archivo anterior lo conservan
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    logger.info(f"Léxico compilado: {len(keys)} entradas -> {output_path}")
+    return output_path
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Compilar el diccionario de Nasa Yuwe a formato binario (mmap)')
+    parser.add_argument('dictionary', nargs='?', default=os.path.join('data', 'nasa_yuwe_dictionary.json'),
+                        help='diccionario JSON de origen')
+    parser.add_argument('-o', '--output', help='archivo de salida (por defecto, el mismo nombre con extensión .bin)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    output_path = compile_lexicon(args.dictionary, args.output)
+    print(f"{output_path}: {os.path.getsize(output_path)} bytes")
+
+
+if __name__ == '__main__':
+    main()
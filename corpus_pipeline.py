@@ -0,0 +1,291 @@
+"""
+Traducción por lotes de archivos grandes (archivos comunitarios, corpus).
+
+Uso:
+    python corpus_pipeline.py entrada.jsonl salida.jsonl [--source-lang spanish] [--workers 8] [--nllb]
+
+La entrada puede ser texto plano (una línea por documento) o JSONL (un
+objeto por línea con el texto en `--text-field`). El archivo se recorre como
+una cadena de generadores: lectura -> división en oraciones -> reglas
+(diccionario y gramática, repartidas en un grupo de procesos que cargan el
+léxico una vez cada uno) -> NLLB por lotes en el proceso principal ->
+escritura en el orden de entrada. Tras cada bloque escrito se guarda un
+punto de control, y una ejecución interrumpida continúa desde ahí.
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import multiprocessing
+from collections import Counter, deque
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from tokenizer import split_sentences
+from translation_model import AdvancedTranslationModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DICTIONARY_PATH = os.path.join('data', 'nasa_yuwe_dictionary.json')
+
+# Registros por bloque enviado a un proceso de trabajo
+CHUNK_SIZE = 64
+
+# Modelo de reglas de cada proceso de trabajo (se crea una vez en el inicializador)
+_worker_model = None
+
+
+def _init_worker(dictionary_path: str):
+    global _worker_model
+    logging.getLogger('translation_model').setLevel(logging.WARNING)
+    _worker_model = AdvancedTranslationModel(dictionary_path, cache_size=0, nllb_loading=None)
+
+
+def _translate_rules_chunk(chunk: List[List[str]], source_lang: str, target_lang: str) -> List[List[Optional[Dict]]]:
+    """Etapas de diccionario y gramática para un bloque; None = requiere NLLB o respaldo"""
+    return [[_worker_model._translate_with_rules(sentence, source_lang, target_lang) for sentence in sentences]
+            for sentences in chunk]
+
+
+def read_records(input_path: str, text_field: str = 'text') -> Iterator[Dict]:
+    """Leer registros de un archivo JSONL o de texto plano (una línea por registro)"""
+    is_jsonl = input_path.endswith(('.jsonl', '.ndjson'))
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if is_jsonl:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if text_field not in record:
+                    raise ValueError(f"Línea {line_number}: falta el campo '{text_field}'")
+                yield record
+            else:
+                yield {'line': line_number, text_field: line.rstrip('\n')}
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _ordered_map(pool, function, chunks: Iterable[Tuple[Any, Any]], window: int, args: Tuple) -> Iterator[Tuple]:
+    """
+    Aplicar `function` a la carga de cada bloque (chunk, carga) en el grupo de
+    procesos y devolver (chunk, resultado) en orden, con a lo sumo `window`
+    bloques en curso (Pool.imap consumiría toda la entrada de antemano).
+    """
+    pending = deque()
+    for chunk, payload in chunks:
+        pending.append((chunk, pool.apply_async(function, (payload,) + args)))
+        if len(pending) >= window:
+            chunk, result = pending.popleft()
+            yield chunk, result.get()
+    while pending:
+        chunk, result = pending.popleft()
+        yield chunk, result.get()
+
+
+class CorpusTranslator:
+    """
+    Tubería de traducción de registros en orden de entrada.
+
+    Las etapas de reglas se reparten en `workers` procesos (0 = en el
+    proceso actual). Con `use_nllb`, las oraciones que las reglas no
+    resuelven se traducen en el proceso principal a través del planificador
+    de micro-lotes de NLLB, mientras los procesos siguen con los bloques
+    siguientes.
+    """
+
+    def __init__(self, dictionary_path: str = DEFAULT_DICTIONARY_PATH, source_lang: str = 'spanish',
+                 target_lang: str = 'nasa_yuwe', workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                 use_nllb: bool = False, profile: Optional[str] = None, text_field: str = 'text',
+                 translation_field: str = 'translation', details: bool = False):
+        self.dictionary_path = dictionary_path
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.profile = profile
+        self.text_field = text_field
+        self.translation_field = translation_field
+        self.details = details
+        self.stats = Counter()
+
+        # Modelo del proceso principal: reglas (si no hay procesos de trabajo) y NLLB
+        self.model = AdvancedTranslationModel(dictionary_path, cache_size=0,
+                                              nllb_loading='sync' if use_nllb else None)
+        self.profile = self.model.resolve_profile(profile)
+
+    def _split(self, records: Iterable[Dict]) -> Iterator[Tuple[Tuple[List[Dict], List[List[str]]], List[List[str]]]]:
+        """Dividir cada registro en oraciones, por bloques: ((registros, separadores), oraciones)"""
+        for chunk in _chunks(records, self.chunk_size):
+            segments = [list(split_sentences(record.get(self.text_field) or '')) for record in chunk]
+            sentences = [[sentence for sentence, _ in record_segments] for record_segments in segments]
+            separators = [[separator for _, separator in record_segments] for record_segments in segments]
+            yield (chunk, separators), sentences
+
+    def _rules(self, chunks: Iterable[Tuple]) -> Iterator[Tuple]:
+        """Etapa de reglas: en paralelo si hay procesos de trabajo"""
+        args = (self.source_lang, self.target_lang)
+        if self.workers <= 0:
+            global _worker_model
+            _worker_model = self.model
+            for chunk, sentences in chunks:
+                yield (chunk, sentences), _translate_rules_chunk(sentences, *args)
+            return
+
+        # Las oraciones viajan a los procesos; los registros se quedan en el proceso principal
+        chunks = (((chunk, sentences), sentences) for chunk, sentences in chunks)
+        with multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                  initargs=(self.dictionary_path,)) as pool:
+            yield from _ordered_map(pool, _translate_rules_chunk, chunks, 2 * self.workers, args)
+
+    def _nllb(self, chunk_results: Iterable[Tuple]) -> Iterator[Tuple[List[Dict], List[List[str]], List[List[str]], List[List[Dict]]]]:
+        """Etapa NLLB: un lote por bloque con las oraciones que las reglas no tradujeron"""
+        for ((records, separators), sentences), results in chunk_results:
+            pending = [(i, j) for i, record_results in enumerate(results)
+                       for j, result in enumerate(record_results) if result is None]
+            translations = [None] * len(pending)
+            if pending and self.model._needs_nllb(self.source_lang):
+                translations = self.model._translate_with_nllb_batch(
+                    [sentences[i][j] for i, j in pending], self.source_lang, 'spanish', self.profile)
+            for (i, j), nllb_translation in zip(pending, translations):
+                results[i][j] = self.model._finish_translation(sentences[i][j], nllb_translation)
+            yield records, sentences, separators, results
+
+    def _assemble(self, record: Dict, sentences: List[str], separators: List[str], results: List[Dict]) -> Dict:
+        """Registro de salida con la traducción completa (separadores originales)"""
+        parts = []
+        for separator, result in zip(separators, results):
+            parts.append(result['translation'] + separator)
+            self.stats['sentences'] += 1
+            self.stats['method:' + result['method']] += 1
+
+        output = dict(record)
+        output[self.translation_field] = ''.join(parts).strip()
+        if self.details:
+            output['sentences'] = [
+                {'source': sentence, 'translation': result['translation'],
+                 'method': result['method'], 'confidence': result['confidence']}
+                for sentence, result in zip(sentences, results)
+            ]
+        return output
+
+    def translate_chunks(self, records: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """Traducir registros y devolverlos por bloques, en el orden de entrada"""
+        for records_chunk, sentences, separators, results in self._nllb(self._rules(self._split(records))):
+            self.stats['records'] += len(records_chunk)
+            yield [self._assemble(*record_data)
+                   for record_data in zip(records_chunk, sentences, separators, results)]
+
+    def translate_records(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Traducir registros uno a uno (API de biblioteca)"""
+        for chunk in self.translate_chunks(records):
+            yield from chunk
+
+
+def _checkpoint_path(output_path: str) -> str:
+    return output_path + '.checkpoint'
+
+
+def _load_checkpoint(input_path: str, output_path: str) -> Optional[Dict]:
+    """Punto de control de una ejecución anterior sobre la misma entrada"""
+    try:
+        with open(_checkpoint_path(output_path), 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if checkpoint.get('input') != os.path.abspath(input_path) or not os.path.exists(output_path):
+        return None
+    return checkpoint
+
+
+def _save_checkpoint(output_path: str, checkpoint: Dict):
+    """Guardar el punto de control de forma atómica"""
+    path = _checkpoint_path(output_path)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def translate_corpus(input_path: str, output_path: str, resume: bool = True, **options) -> Dict:
+    """
+    Traducir un archivo completo y escribir el resultado en JSONL.
+
+    `options` se pasan a CorpusTranslator. Con `resume`, si existe un punto
+    de control de la misma entrada, se descarta lo escrito después de él y
+    se continúa con el registro siguiente. Devuelve las estadísticas.
+    """
+    started = time.monotonic()
+    checkpoint = _load_checkpoint(input_path, output_path) if resume else None
+    done = checkpoint['records'] if checkpoint else 0
+
+    translator = CorpusTranslator(**options)
+    records = islice(read_records(input_path, translator.text_field), done, None)
+
+    with open(output_path, 'r+b' if checkpoint else 'wb') as output:
+        if checkpoint:
+            logger.info(f"Reanudando desde el registro {done}")
+            output.truncate(checkpoint['output_bytes'])
+            output.seek(checkpoint['output_bytes'])
+
+        for chunk in translator.translate_chunks(records):
+            for record in chunk:
+                output.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            output.flush()
+            os.fsync(output.fileno())
+            done += len(chunk)
+            _save_checkpoint(output_path, {'input': os.path.abspath(input_path), 'records': done,
+                                           'output_bytes': output.tell()})
+            logger.info(f"{done} registros traducidos")
+
+    # Trabajo completo: el punto de control ya no hace falta
+    if os.path.exists(_checkpoint_path(output_path)):
+        os.remove(_checkpoint_path(output_path))
+
+    elapsed = time.monotonic() - started
+    stats = dict(translator.stats)
+    stats.update({
+        'records_total': done,
+        'elapsed_seconds': round(elapsed, 3),
+        'sentences_per_second': round(translator.stats['sentences'] / elapsed, 1) if elapsed else 0.0
+    })
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Traducir un archivo de texto o JSONL completo')
+    parser.add_argument('input', help='archivo de entrada (.txt: una línea por documento; .jsonl: un objeto por línea)')
+    parser.add_argument('output', help='archivo de salida JSONL')
+    parser.add_argument('--dictionary', default=DEFAULT_DICTIONARY_PATH, help='diccionario de Nasa Yuwe')
+    parser.add_argument('--source-lang', default='spanish', choices=['spanish', 'nasa_yuwe'])
+    parser.add_argument('--target-lang', default=None, choices=['spanish', 'nasa_yuwe'])
+    parser.add_argument('--workers', type=int, default=None, help='procesos para las reglas (por defecto, uno por núcleo; 0 = sin procesos)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='registros por bloque')
+    parser.add_argument('--nllb', action='store_true', help='cargar NLLB para las oraciones que las reglas no resuelven')
+    parser.add_argument('--profile', default=None, help='perfil de inferencia de NLLB')
+    parser.add_argument('--text-field', default='text', help='campo con el texto en la entrada JSONL')
+    parser.add_argument('--details', action='store_true', help='incluir el resultado de cada oración')
+    parser.add_argument('--restart', action='store_true', help='ignorar el punto de control y empezar de nuevo')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    target_lang = args.target_lang or ('spanish' if args.source_lang == 'nasa_yuwe' else 'nasa_yuwe')
+    stats = translate_corpus(
+        args.input, args.output, resume=not args.restart,
+        dictionary_path=args.dictionary, source_lang=args.source_lang, target_lang=target_lang,
+        workers=args.workers, chunk_size=args.chunk_size, use_nllb=args.nllb, profile=args.profile,
+        text_field=args.text_field, details=args.details
+    )
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import unicodedata
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+# Distancia máxima de edición y longitud del prefijo sobre el que se generan los borrados
+MAX_EDIT_DISTANCE = 2
+PREFIX_LENGTH = 8
+
+
+def fold(word: str) -> str:
+    """Forma sin tildes ni diacríticos (ñ -> n, ü -> u) en minúsculas"""
+    decomposed = unicodedata.normalize('NFD', word.casefold())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def allowed_distance(length: int, max_distance: int = MAX_EDIT_DISTANCE) -> int:
+    """Distancia tolerada según la longitud: las palabras cortas solo admiten diferencias de tildes"""
+    if length <= 3:
+        return 0
+    if length <= 6:
+        return min(1, max_distance)
+    return max_distance
+
+
+def index_depth(length: int, max_distance: int = MAX_EDIT_DISTANCE) -> int:
+    """
+    Borrados que necesita una clave de esta longitud para que la encuentre
+    cualquier consulta que la tolere: una consulta más corta (o igual) llega
+    con su distancia completa; una más larga gasta en inserciones parte de
+    la suya y al lado de la clave solo le quedan las sustituciones.
+    """
+    depth = 0
+    for query_length in range(max(0, length - max_distance), length + max_distance + 1):
+        allowed = allowed_distance(query_length, max_distance)
+        depth = max(depth, allowed - max(0, query_length - length))
+    return depth
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Distancia de Damerau-Levenshtein restringida (transposiciones adyacentes)
+    acotada: devuelve max_distance + 1 en cuanto se sabe que la supera.
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    # Los candidatos suelen compartir prefijo (y a menudo sufijo): solo se compara el resto
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    if start:
+        # Se conserva un carácter común para no perder una transposición en el borde
+        start -= 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if not a or not b:
+        return min(len(a) + len(b), max_distance + 1)
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_minimum = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and j > 1 and a[i - 1] == b[j - 2]
+                    and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_minimum = min(row_minimum, value)
+        if row_minimum > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+
+class FuzzyIndex:
+    """
+    Índice de borrado simétrico (SymSpell) para buscar las claves más cercanas
+    a una palabra que no está en el léxico.
+
+    Cada clave se indexa por su forma sin tildes (fold) y por todas las
+    cadenas que resultan de borrar caracteres de su prefijo (tantos como
+    pueda necesitar una consulta tolerada, ver index_depth). Una consulta genera los mismos borrados de la palabra buscada y
+    solo calcula la distancia de edición con los candidatos que comparten
+    alguno, así que su costo no depende del tamaño del léxico.
+
+    Las claves se agregan y eliminan de forma incremental (las escrituras
+    deben serializarse); las tuplas del índice se reemplazan en lugar de
+    modificarse, de modo que copy solo copia los diccionarios.
+    """
+
+    def __init__(self, max_distance: int = MAX_EDIT_DISTANCE, prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._deletes = {}  # borrado -> formas sin tildes que lo generan
+        self._terms = {}    # forma sin tildes -> (orden de inserción, claves normalizadas)
+        self._inserted = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._terms.get(fold(key))
+        return entry is not None and key in entry[1]
+
+    def copy(self) -> 'FuzzyIndex':
+        index = FuzzyIndex(self.max_distance, self.prefix_length)
+        index._deletes = dict(self._deletes)
+        index._terms = dict(self._terms)
+        index._inserted = self._inserted
+        return index
+
+    @staticmethod
+    def _delete_levels(term: str, distance: int) -> Iterator[Set[str]]:
+        """Cadenas que resultan de borrarle 0, 1, ..., `distance` caracteres, por niveles"""
+        level = {term}
+        yield level
+        for _ in range(distance):
+            level = {word[:i] + word[i + 1:] for word in level if len(word) > 1 for i in range(len(word))}
+            yield level
+
+    def add(self, key: str):
+        """Agregar una clave ya normalizada (las de varias palabras no se indexan)"""
+        if not key or ' ' in key:
+            return
+        term = fold(key)
+        entry = self._terms.get(term)
+        if entry is not None:
+            if key not in entry[1]:
+                self._terms[term] = (entry[0], entry[1] + (key,))
+            return
+        self._terms[term] = (self._inserted, (key,))
+        self._inserted += 1
+        for delete in self._term_deletes(term):
+            self._deletes[delete] = self._deletes.get(delete, ()) + (term,)
+
+    def remove(self, key: str):
+        """Eliminar una clave ya normalizada junto con los borrados que solo ella generaba"""
+        term = fold(key)
+        entry = self._terms.get(term)
+        if entry is None or key not in entry[1]:
+            return
+        keys = tuple(k for k in entry[1] if k != key)
+        if keys:
+            self._terms[term] = (entry[0], keys)
+            return
+        del self._terms[term]
+        for delete in self._term_deletes(term):
+            terms = tuple(t for t in self._deletes.get(delete, ()) if t != term)
+            if terms:
+                self._deletes[delete] = terms
+            else:
+                self._deletes.pop(delete, None)
+
+    def _term_deletes(self, term: str) -> Set[str]:
+        depth = index_depth(len(term), self.max_distance)
+        return set().union(*self._delete_levels(term[:self.prefix_length], depth))
+
+    def search(self, word: str, max_distance: Optional[int] = None, closest: bool = False) -> List[Tuple[str, int]]:
+        """
+        Claves dentro de la distancia tolerada para la palabra, como
+        (clave, distancia sin tildes), de la más cercana a la más lejana y,
+        a igual distancia, en orden de inserción.
+
+        Un candidato a distancia d aparece a más tardar entre los borrados de
+        nivel d de la palabra; con `closest` la búsqueda se detiene en cuanto
+        ningún nivel siguiente puede dar uno más cercano y devuelve solo los
+        de la distancia mínima.
+        """
+        term = fold(word)
+        limit = allowed_distance(len(term), self.max_distance if max_distance is None else min(max_distance, self.max_distance))
+        seen = set()
+        matches = []
+        for level, deletes in enumerate(self._delete_levels(term[:self.prefix_length], limit)):
+            for delete in deletes:
+                for candidate in self._deletes.get(delete, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = edit_distance(term, candidate, limit)
+                    if distance <= limit:
+                        order, keys = self._terms[candidate]
+                        matches.append((distance, order, keys))
+            if closest and matches and min(match[0] for match in matches) <= level:
+                break
+        matches.sort(key=lambda match: (match[0], match[1]))
+        if closest and matches:
+            matches = [match for match in matches if match[0] == matches[0][0]]
+        return [(key, distance) for distance, _, keys in matches for key in keys]
+
+
+class LayeredFuzzyIndex:
+    """
+    Índice aproximado de una versión del léxico.
+
+    Combina un índice base, compartido por todas las versiones y que no se
+    modifica después de construirse, con una capa propia de la versión: las
+    claves agregadas desde entonces y las claves de la base que ya no
+    existen. Cada versión nueva copia solo la capa.
+    """
+
+    def __init__(self, base: FuzzyIndex, added: Optional[FuzzyIndex] = None, removed: Optional[Set[str]] = None):
+        self.base = base
+        self.added = added if added is not None else FuzzyIndex(base.max_distance, base.prefix_length)
+        self.removed = removed if removed is not None else set()
+
+    def copy(self) -> 'LayeredFuzzyIndex':
+        return LayeredFuzzyIndex(self.base, self.added.copy(), set(self.removed))
+
+    def add(self, key: str):
+        if key in self.base:
+            self.removed.discard(key)
+        else:
+            self.added.add(key)
+
+    def remove(self, key: str):
+        if key in self.base:
+            self.removed.add(key)
+        else:
+            self.added.remove(key)
+
+    def search(self, word: str, max_distance: Optional[int] = None, closest: bool = False) -> List[Tuple[str, int]]:
+        """Misma semántica que FuzzyIndex.search sobre las claves de esta versión"""
+        removed = self.removed
+        matches = [match for match in self.base.search(word, max_distance, closest) if match[0] not in removed]
+        if closest and removed and not matches:
+            # Las más cercanas de la base ya no existen en esta versión: seguir con las demás
+            matches = [match for match in self.base.search(word, max_distance) if match[0] not in removed]
+        if len(self.added):
+            # Orden estable: a igual distancia, las claves de la base antes que las agregadas
+            matches = sorted(matches + self.added.search(word, max_distance), key=lambda match: match[1])
+        if closest and matches:
+            matches = [match for match in matches if match[1] == matches[0][1]]
+        return matches
+
+
+def build_fuzzy_indexes(pairs: Iterable[Tuple[str, str]], normalize) -> Tuple[FuzzyIndex, FuzzyIndex]:
+    """Índices (español, Nasa Yuwe) a partir de pares (clave en español, traducción)"""
+    forward, reverse = FuzzyIndex(), FuzzyIndex()
+    for spanish_word, translation in pairs:
+        forward.add(normalize(spanish_word))
+        reverse.add(normalize(translation))
+    return forward, reverse
@@ -1,27 +1,167 @@
 import re
-import json
+import copy
 from typing import Dict, List, Tuple, Optional
+from lexicon import Lexicon, get_lexicon
+from mapped_lexicon import MappedLexicon
+from phrase_matcher import PhraseMatcher
+from text_analysis import TextAnalysis
+from tokenizer import VERB_ENDING_PATTERN, NOUN_ENDING_PATTERN, ADJECTIVE_ENDING_PATTERN
+
+# Límite de formas distintas memorizadas por el clasificador de palabras
+WORD_TYPE_CACHE_SIZE = 50000
 
 class ConjugationEngine:
-    def __init__(self, dictionary_path: str):
+    def __init__(self, dictionary_path: str, lexicon: Optional[Lexicon] = None):
         self.dictionary_path = dictionary_path
-        self.dictionary = self.load_dictionary()
+        self.lexicon = lexicon if lexicon is not None else self.load_lexicon()
+        self.dictionary = self.lexicon.entries
         self.verb_patterns = self.identify_verb_patterns()
         self.spanish_conjugations = self.load_spanish_conjugations()
         self.noun_patterns = self.load_noun_patterns()
         self.adjective_patterns = self.load_adjective_patterns()
         self.nasa_yuwe_grammar = self.load_nasa_yuwe_grammar()
-        
-    def load_dictionary(self) -> Dict:
-        """Cargar el diccionario de Nasa Yuwe"""
-        try:
-            with open(self.dictionary_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return {}
+        self.spanish_context_markers = self.load_spanish_context_markers()
+        self.context_matcher = self.build_context_matcher()
+        self.nasa_yuwe_forms = self.build_nasa_yuwe_forms()
+        self.spanish_endings = self.get_spanish_endings()
+        self.inflection_table = self.build_inflection_table()
+        self.word_type_cache = {}
+        
+    def load_lexicon(self) -> Lexicon:
+        """Obtener el léxico compartido de Nasa Yuwe (se carga una vez por proceso)"""
+        return get_lexicon(self.dictionary_path)
+    
+    def build_nasa_yuwe_forms(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Construir el índice de formas derivadas del Nasa Yuwe hacia su lema en español"""
+        if isinstance(self.lexicon, MappedLexicon):
+            # Precalculado en el léxico compilado
+            return self.lexicon.nasa_yuwe_forms
+        self.nasa_yuwe_forms = {}
+        for spanish_word, data in self.dictionary.items():
+            self.index_nasa_yuwe_forms(spanish_word, data)
+        return self.nasa_yuwe_forms
+    
+    def derive_nasa_yuwe_forms(self, nasa_word: str) -> List[Tuple[str, str]]:
+        """Formas derivadas de una palabra en Nasa Yuwe: raíz y conjugaciones o plural"""
+        if nasa_word.endswith('-'):
+            forms = [(nasa_word[:-1], 'root')]
+            forms += [(self.conjugate_nasa_yuwe_verb(nasa_word, context), context)
+                      for context in ('present', 'past', 'future')]
+            return forms
+        return [(self.pluralize_nasa_yuwe_noun(nasa_word), 'plural')]
+    
+    def index_nasa_yuwe_forms(self, spanish_word: str, data: Dict):
+        """Registrar las formas derivadas de una entrada del diccionario"""
+        for surface, form in self.derive_nasa_yuwe_forms(data['traduccion']):
+            key = Lexicon.normalize(surface)
+            # Las listas se reemplazan (no se modifican) para poder copiar el índice por escritura
+            self.nasa_yuwe_forms[key] = self.nasa_yuwe_forms.get(key, []) + [(spanish_word, form)]
+    
+    def unindex_nasa_yuwe_forms(self, spanish_word: str, data: Dict):
+        """Eliminar las formas derivadas registradas para una entrada"""
+        for surface, form in self.derive_nasa_yuwe_forms(data['traduccion']):
+            key = Lexicon.normalize(surface)
+            forms = [f for f in self.nasa_yuwe_forms.get(key, []) if f != (spanish_word, form)]
+            if forms:
+                self.nasa_yuwe_forms[key] = forms
+            else:
+                self.nasa_yuwe_forms.pop(key, None)
+    
+    def build_inflection_table(self) -> Dict[str, List[Tuple[Tuple[int, int], str, Dict]]]:
+        """Construir la tabla forma flexionada -> lema a partir de las reglas de conjugación y plural"""
+        if isinstance(self.lexicon, MappedLexicon):
+            # Precalculado en el léxico compilado
+            return self.lexicon.inflection_table
+        self.inflection_table = {}
+        for spanish_word in self.dictionary:
+            self.index_inflections(spanish_word)
+        return self.inflection_table
+    
+    def get_spanish_endings(self) -> List[Tuple[str, str, str]]:
+        """Terminaciones de conjugación en orden de prioridad: (terminación, tipo, persona)"""
+        endings = []
+        seen = set()
+        for verb_type, rules in self.spanish_conjugations.items():
+            for person, ending in rules.items():
+                if ending not in seen:
+                    seen.add(ending)
+                    endings.append((ending, verb_type[:2], person))
+        return endings
+    
+    def derive_inflections(self, spanish_word: str) -> List[Tuple[str, Tuple[int, int], Dict]]:
+        """Formas flexionadas de un lema en español: (forma, prioridad, rasgos)"""
+        lemma = Lexicon.normalize(spanish_word)
+        inflections = []
+        
+        # Formas verbales: raíz + cada terminación conocida (mínimo 3 letras de raíz)
+        root, verb_type = self.get_verb_root(lemma)
+        if verb_type != 'irregular' and len(root) > 2:
+            inf_rank = ['ar', 'er', 'ir'].index(verb_type)
+            for ending_rank, (ending, ending_type, person) in enumerate(self.spanish_endings):
+                features = {'pos': 'verb', 'verb_type': verb_type,
+                            'person': person if ending_type == verb_type else None}
+                inflections.append((root + ending, (ending_rank, inf_rank), features))
+        
+        # Formas plurales según las reglas de sustantivos (y el plural simple en -s)
+        plural_features = {'pos': 'noun', 'number': 'plural'}
+        inflections.append((self.pluralize_spanish_noun(lemma), (0, 0), plural_features))
+        inflections.append((lemma + 's', (1, 0), plural_features))
+        return inflections
+    
+    def index_inflections(self, spanish_word: str):
+        """Registrar las formas flexionadas de una entrada del diccionario"""
+        for surface, rank, features in self.derive_inflections(spanish_word):
+            self.inflection_table[surface] = self.inflection_table.get(surface, []) + [(rank, spanish_word, features)]
+    
+    def unindex_inflections(self, spanish_word: str):
+        """Eliminar las formas flexionadas registradas para una entrada"""
+        for surface, rank, features in self.derive_inflections(spanish_word):
+            candidates = [c for c in self.inflection_table.get(surface, []) if c[1] != spanish_word]
+            if candidates:
+                self.inflection_table[surface] = candidates
+            else:
+                self.inflection_table.pop(surface, None)
+    
+    def lookup_inflection(self, word: str, pos: Optional[str] = None) -> Optional[Tuple[str, Dict]]:
+        """Buscar el lema de una forma flexionada; devuelve (palabra en español, rasgos) o None"""
+        candidates = self.inflection_table.get(Lexicon.normalize(word))
+        if not candidates:
+            return None
+        if pos is not None:
+            candidates = [c for c in candidates if c[2]['pos'] == pos]
+            if not candidates:
+                return None
+        # Ante formas ambiguas gana la de menor prioridad (y la primera en el diccionario)
+        rank, spanish_word, features = min(candidates, key=lambda c: c[0])
+        return spanish_word, features
+    
+    def lookup_translation(self, word: str, source_lang: str, analysis: Optional[TextAnalysis] = None) -> str:
+        """Buscar la traducción de una palabra; devuelve la palabra si no se encuentra"""
+        if source_lang == 'spanish':
+            translation = analysis.lookup(word) if analysis else self.lexicon.translate(word)
+        elif source_lang == 'nasa_yuwe':
+            translation = analysis.lookup(word, reverse=True) if analysis else self.lexicon.reverse_lookup(word)
+            if translation is None:
+                # Conjugaciones, raíces verbales y plurales de las entradas del diccionario
+                translation = (analysis.inflected_lookup(word, True, self.translate_nasa_yuwe_form) if analysis
+                               else self.translate_nasa_yuwe_form(word))
+        else:
+            translation = None
+        return translation if translation is not None else word
+    
+    def analyze(self, text: str, source_lang: str, analysis: Optional[TextAnalysis] = None) -> TextAnalysis:
+        """Reutilizar el análisis recibido si corresponde a este texto y a este léxico; si no, crear uno"""
+        if (analysis is not None and analysis.lexicon is self.lexicon
+                and analysis.text == text and analysis.source_lang == source_lang):
+            return analysis
+        return TextAnalysis(text, source_lang, self.lexicon)
     
     def identify_verb_patterns(self) -> Dict[str, List[str]]:
         """Identificar patrones de verbos en Nasa Yuwe"""
+        if isinstance(self.lexicon, MappedLexicon):
+            # Clases verbales precalculadas en el léxico compilado
+            return self.lexicon.verb_patterns()
+        
         patterns = {
             'transitive_verbs': [],  # verbos que terminan en -
             'intransitive_verbs': [], # verbos intransitivos
@@ -29,20 +169,71 @@ class ConjugationEngine:
         }
         
         for spanish_word, data in self.dictionary.items():
-            nasa_word = data['traduccion']
-            explanation = data.get('explanation', '').lower()
-            
-            # Identificar verbos transitivos (terminan en -)
-            if nasa_word.endswith('-'):
-                if 'transitivo' in explanation:
-                    patterns['transitive_verbs'].append((spanish_word, nasa_word))
-                elif 'intransitivo' in explanation:
-                    patterns['intransitive_verbs'].append((spanish_word, nasa_word))
-                else:
-                    patterns['action_verbs'].append((spanish_word, nasa_word))
+            pattern = self.classify_verb_pattern(data)
+            if pattern:
+                patterns[pattern].append((spanish_word, data['traduccion']))
         
         return patterns
     
+    def classify_verb_pattern(self, data: Dict) -> Optional[str]:
+        """Patrón verbal de una entrada del diccionario, o None si no es un verbo"""
+        nasa_word = data['traduccion']
+        explanation = data.get('explanation', '').lower()
+        
+        # Identificar verbos transitivos (terminan en -)
+        if not nasa_word.endswith('-'):
+            return None
+        if 'transitivo' in explanation:
+            return 'transitive_verbs'
+        if 'intransitivo' in explanation:
+            return 'intransitive_verbs'
+        return 'action_verbs'
+    
+    def with_lexicon(self, lexicon: Lexicon, operations: List[Dict]) -> 'ConjugationEngine':
+        """
+        Nueva versión del motor para un léxico modificado por `operations`.
+        
+        Copia por escritura: las tablas derivadas (formas del Nasa Yuwe,
+        flexiones, patrones verbales) se copian y se actualizan solo para las
+        entradas afectadas; las tablas de reglas se comparten. El motor actual
+        no cambia, así que las traducciones en curso terminan con él.
+        """
+        if isinstance(self.lexicon, MappedLexicon):
+            # Primer cambio sobre el léxico compilado: las tablas pasan a memoria
+            return ConjugationEngine(self.dictionary_path, lexicon=lexicon)
+        
+        engine = copy.copy(self)
+        engine.lexicon = lexicon
+        engine.dictionary = lexicon.entries
+        engine.nasa_yuwe_forms = dict(self.nasa_yuwe_forms)
+        engine.inflection_table = dict(self.inflection_table)
+        engine.verb_patterns = dict(self.verb_patterns)
+        engine.word_type_cache = {}
+        
+        # Estado de cada clave a medida que se aplican las operaciones
+        changed = {}
+        for operation in operations:
+            spanish_word = operation['key']
+            previous = changed[spanish_word] if spanish_word in changed else self.dictionary.get(spanish_word)
+            data = operation['value'] if operation['op'] == 'set' else None
+            changed[spanish_word] = data
+            
+            if previous is not None:
+                engine.unindex_nasa_yuwe_forms(spanish_word, previous)
+                engine.unindex_inflections(spanish_word)
+                pattern = self.classify_verb_pattern(previous)
+                if pattern:
+                    engine.verb_patterns[pattern] = [p for p in engine.verb_patterns[pattern]
+                                                     if p != (spanish_word, previous['traduccion'])]
+            if data is not None:
+                engine.index_nasa_yuwe_forms(spanish_word, data)
+                engine.index_inflections(spanish_word)
+                pattern = self.classify_verb_pattern(data)
+                if pattern:
+                    engine.verb_patterns[pattern] = engine.verb_patterns[pattern] + [(spanish_word, data['traduccion'])]
+        
+        return engine
+    
     def load_spanish_conjugations(self) -> Dict:
         """Reglas básicas de conjugación en español"""
         return {
@@ -77,19 +268,19 @@ class ConjugationEngine:
         return {
             'spanish': {
                 'plural_rules': [
-                    {'pattern': r'([aeiou])$', 'replacement': r'\1s'},  # casa -> casas
-                    {'pattern': r'([^aeiou])$', 'replacement': r'\1es'},  # árbol -> árboles
-                    {'pattern': r'z$', 'replacement': 'ces'},  # luz -> luces
+                    {'pattern': re.compile(r'([aeiou])$'), 'replacement': r'\1s'},  # casa -> casas
+                    {'pattern': re.compile(r'([^aeiou])$'), 'replacement': r'\1es'},  # árbol -> árboles
+                    {'pattern': re.compile(r'z$'), 'replacement': 'ces'},  # luz -> luces
                 ],
                 'gender_rules': [
-                    {'pattern': r'o$', 'gender': 'masculine'},
-                    {'pattern': r'a$', 'gender': 'feminine'},
-                    {'pattern': r'e$', 'gender': 'neutral'}
+                    {'pattern': re.compile(r'o$'), 'gender': 'masculine'},
+                    {'pattern': re.compile(r'a$'), 'gender': 'feminine'},
+                    {'pattern': re.compile(r'e$'), 'gender': 'neutral'}
                 ]
             },
             'nasa_yuwe': {
                 'plural_rules': [
-                    {'pattern': r'$', 'replacement': 'we'},  # Regla básica de pluralización
+                    {'pattern': re.compile(r'$'), 'replacement': 'we'},  # Regla básica de pluralización
                 ],
                 'collective_markers': ['txi', 'txiwe']  # Marcadores colectivos
             }
@@ -100,8 +291,8 @@ class ConjugationEngine:
         return {
             'spanish': {
                 'agreement_rules': [
-                    {'pattern': r'o$', 'feminine': 'a', 'plural_masc': 'os', 'plural_fem': 'as'},
-                    {'pattern': r'e$', 'feminine': 'e', 'plural_masc': 'es', 'plural_fem': 'es'},
+                    {'pattern': re.compile(r'o$'), 'feminine': 'a', 'plural_masc': 'os', 'plural_fem': 'as'},
+                    {'pattern': re.compile(r'e$'), 'feminine': 'e', 'plural_masc': 'es', 'plural_fem': 'es'},
                 ]
             },
             'nasa_yuwe': {
@@ -165,6 +356,45 @@ class ConjugationEngine:
             }
         }
     
+    def load_spanish_context_markers(self) -> Dict:
+        """Marcadores temporales y palabras interrogativas del español"""
+        return {
+            'temporal': {
+                'ayer': 'past',
+                'hoy': 'present', 
+                'mañana': 'future',
+                'ahora': 'present',
+                'antes': 'past',
+                'después': 'future',
+                'en la mañana': 'morning',
+                'en la tarde': 'afternoon',
+                'en la noche': 'night'
+            },
+            'question': {
+                'qué': 'what',
+                'quién': 'who', 
+                'dónde': 'where',
+                'cuándo': 'when',
+                'cómo': 'how',
+                'por qué': 'why'
+            }
+        }
+    
+    def build_context_matcher(self) -> PhraseMatcher:
+        """Compilar un único autómata con todos los marcadores de contexto"""
+        matcher = PhraseMatcher()
+        for kind, markers in self.spanish_context_markers.items():
+            # El orden en la tabla define la prioridad entre marcadores
+            for order, (marker, meaning) in enumerate(markers.items()):
+                matcher.add(marker, (kind, order, marker, meaning))
+        return matcher.build()
+    
+    def find_context_markers(self, text: str, kind: str) -> List[Tuple[str, str]]:
+        """Marcadores de un tipo presentes en el texto, en el orden de su tabla"""
+        found = {value for start, end, value in self.context_matcher.iter_matches(text.lower())
+                 if value[0] == kind}
+        return [(marker, meaning) for _, _, marker, meaning in sorted(found)]
+    
     def get_verb_root(self, verb: str) -> Tuple[str, str]:
         """Obtener la raíz del verbo y su tipo"""
         verb = verb.lower().strip()
@@ -211,25 +441,16 @@ class ConjugationEngine:
         word_lower = word.lower()
         
         # Buscar en el diccionario primero
-        for spanish_word, data in self.dictionary.items():
-            if spanish_word.lower() == word_lower:
-                return spanish_word, data['traduccion']
-        
-        # Intentar detectar conjugaciones en español
-        spanish_endings = ['o', 'as', 'a', 'amos', 'áis', 'an', 'es', 'e', 'emos', 'éis', 'en', 'imos', 'ís']
-        
-        for ending in spanish_endings:
-            if word_lower.endswith(ending) and len(word_lower) > len(ending) + 2:
-                possible_root = word_lower[:-len(ending)]
-                
-                # Probar diferentes terminaciones de infinitivo
-                for inf_ending in ['ar', 'er', 'ir']:
-                    infinitive = possible_root + inf_ending
-                    
-                    # Buscar el infinitivo en el diccionario
-                    for spanish_word, data in self.dictionary.items():
-                        if spanish_word.lower() == infinitive:
-                            return spanish_word, data['traduccion']
+        entry = self.lexicon.lookup(word_lower)
+        if entry:
+            spanish_word, data = entry
+            return spanish_word, data['traduccion']
+        
+        # Intentar detectar conjugaciones en español con la tabla de flexiones
+        inflection = self.lookup_inflection(word_lower, 'verb')
+        if inflection:
+            spanish_word, features = inflection
+            return spanish_word, self.dictionary[spanish_word]['traduccion']
         
         return None
     
@@ -255,8 +476,8 @@ class ConjugationEngine:
     def pluralize_spanish_noun(self, noun: str) -> str:
         """Pluralizar un sustantivo en español"""
         for rule in self.noun_patterns['spanish']['plural_rules']:
-            if re.search(rule['pattern'], noun):
-                return re.sub(rule['pattern'], rule['replacement'], noun)
+            if rule['pattern'].search(noun):
+                return rule['pattern'].sub(rule['replacement'], noun)
         return noun + 's'  # Regla por defecto
     
     def pluralize_nasa_yuwe_noun(self, noun: str) -> str:
@@ -267,15 +488,15 @@ class ConjugationEngine:
     def get_noun_gender(self, noun: str) -> str:
         """Determinar el género de un sustantivo español"""
         for rule in self.noun_patterns['spanish']['gender_rules']:
-            if re.search(rule['pattern'], noun):
+            if rule['pattern'].search(noun):
                 return rule['gender']
         return 'neutral'
     
     def conjugate_adjective_spanish(self, adjective: str, gender: str = 'masculine', number: str = 'singular') -> str:
         """Conjugar un adjetivo español según género y número"""
         for rule in self.adjective_patterns['spanish']['agreement_rules']:
-            if re.search(rule['pattern'], adjective):
-                root = re.sub(rule['pattern'], '', adjective)
+            if rule['pattern'].search(adjective):
+                root = rule['pattern'].sub('', adjective)
                 if gender == 'feminine' and number == 'singular':
                     return root + rule['feminine']
                 elif gender == 'masculine' and number == 'plural':
@@ -285,9 +506,18 @@ class ConjugationEngine:
         return adjective
     
     def detect_word_type(self, word: str) -> str:
-        """Detectar el tipo de palabra (verbo, sustantivo, adjetivo)"""
+        """Detectar el tipo de palabra (verbo, sustantivo, adjetivo), memorizando cada forma"""
+        word_type = self.word_type_cache.get(word)
+        if word_type is None:
+            if len(self.word_type_cache) >= WORD_TYPE_CACHE_SIZE:
+                self.word_type_cache.clear()
+            word_type = self.word_type_cache[word] = self.classify_word(word)
+        return word_type
+    
+    def classify_word(self, word: str) -> str:
+        """Clasificar una palabra por sus terminaciones y su entrada en el diccionario"""
         # Detectar verbos por terminaciones
-        if re.search(r'(ar|er|ir)$', word):
+        if VERB_ENDING_PATTERN.search(word):
             return 'verb'
         
         # Detectar sustantivos por contexto en el diccionario
@@ -301,14 +531,15 @@ class ConjugationEngine:
                 return 'verb'
         
         # Detectar por terminaciones comunes
-        if re.search(r'(ción|sión|dad|tad|eza|ura|ancia|encia)$', word):
+        if NOUN_ENDING_PATTERN.search(word):
             return 'noun'
-        elif re.search(r'(oso|osa|ivo|iva|able|ible|ante|ente)$', word):
+        elif ADJECTIVE_ENDING_PATTERN.search(word):
             return 'adjective'
         
         return 'unknown'
     
-    def translate_noun_with_features(self, noun: str, source_lang: str, target_lang: str) -> str:
+    def translate_noun_with_features(self, noun: str, source_lang: str, target_lang: str,
+                                     analysis: Optional[TextAnalysis] = None) -> str:
         """Traducir sustantivo considerando plural y género"""
         # Detectar si es plural
         is_plural = False
@@ -316,7 +547,11 @@ class ConjugationEngine:
         
         if source_lang == 'spanish':
             # Detectar plural en español
-            if noun.endswith('s') and len(noun) > 1:
+            inflection = self.lookup_inflection(noun, 'noun')
+            if inflection:
+                is_plural = True
+                base_noun = inflection[0]
+            elif noun.endswith('s') and len(noun) > 1:
                 is_plural = True
                 # Intentar obtener la forma singular
                 if noun.endswith('es'):
@@ -325,22 +560,7 @@ class ConjugationEngine:
                     base_noun = noun[:-1]
         
         # Buscar traducción de la forma base
-        if source_lang == 'spanish':
-            # Buscar con insensibilidad a mayúsculas/minúsculas
-            translation = base_noun
-            for spanish_word, data in self.dictionary.items():
-                if spanish_word.lower() == base_noun.lower():
-                    translation = data['traduccion']
-                    break
-        elif source_lang == 'nasa_yuwe':
-            # Buscar en el diccionario inverso
-            translation = base_noun
-            for spanish_word, data in self.dictionary.items():
-                if data['traduccion'].lower() == base_noun.lower():
-                    translation = spanish_word
-                    break
-        else:
-            translation = base_noun
+        translation = self.lookup_translation(base_noun, source_lang, analysis)
         
         # Aplicar pluralización si es necesario
         if is_plural and target_lang == 'nasa_yuwe':
@@ -350,25 +570,11 @@ class ConjugationEngine:
         
         return translation
     
-    def translate_adjective_with_agreement(self, adjective: str, source_lang: str, target_lang: str, context_words: List[str], position: int) -> str:
+    def translate_adjective_with_agreement(self, adjective: str, source_lang: str, target_lang: str, context_words: List[str], position: int,
+                                           analysis: Optional[TextAnalysis] = None) -> str:
         """Traducir adjetivo considerando concordancia"""
         # Obtener traducción base
-        if source_lang == 'spanish':
-            # Buscar con insensibilidad a mayúsculas/minúsculas
-            translation = adjective
-            for spanish_word, data in self.dictionary.items():
-                if spanish_word.lower() == adjective.lower():
-                    translation = data['traduccion']
-                    break
-        elif source_lang == 'nasa_yuwe':
-            # Buscar en el diccionario inverso
-            translation = adjective
-            for spanish_word, data in self.dictionary.items():
-                if data['traduccion'].lower() == adjective.lower():
-                    translation = spanish_word
-                    break
-        else:
-            translation = adjective
+        translation = self.lookup_translation(adjective, source_lang, analysis)
         
         # En Nasa Yuwe, los adjetivos generalmente no cambian por género/número
         # pero pueden tener sufijos descriptivos
@@ -379,87 +585,56 @@ class ConjugationEngine:
         
         return translation
     
-    def enhance_translation(self, text: str, source_lang: str, target_lang: str) -> str:
-        """Mejorar traducción con conjugaciones y reglas gramaticales"""
-        words = text.split()
+    def enhance_translation(self, text: str, source_lang: str, target_lang: str,
+                            analysis: Optional[TextAnalysis] = None) -> str:
+        """
+        Mejorar traducción con conjugaciones y reglas gramaticales.
+        
+        Con `analysis` se reutilizan sus tokens y búsquedas, y el resultado
+        queda guardado en él: una segunda llamada con el mismo análisis no
+        repite el trabajo.
+        """
+        analysis = self.analyze(text, source_lang, analysis)
+        enhanced = analysis.enhanced.get(target_lang)
+        if enhanced is not None:
+            return enhanced
+        
+        # Tokens ya separados: forma limpia, puntuación y clase de cada palabra
+        tokens = analysis.classify(self.detect_word_type)
+        words = [token.surface for token in tokens]
         translated_words = []
         
-        for i, word in enumerate(words):
-            # Limpiar puntuación
-            clean_word = re.sub(r'[^\w\s]', '', word)
-            punctuation = word[len(clean_word):] if len(word) > len(clean_word) else ''
-            
-            word_type = self.detect_word_type(clean_word)
+        for token in tokens:
+            clean_word = token.clean
+            word_type = token.word_class
             
             # Manejar diferentes tipos de palabras
             if word_type == 'verb':
-                if source_lang == 'spanish':
-                    # Buscar con insensibilidad a mayúsculas/minúsculas
-                    translation = clean_word
-                    for spanish_word, data in self.dictionary.items():
-                        if spanish_word.lower() == clean_word.lower():
-                            translation = data['traduccion']
-                            break
-                elif source_lang == 'nasa_yuwe':
-                    # Buscar en el diccionario inverso
-                    translation = clean_word
-                    for spanish_word, data in self.dictionary.items():
-                        if data['traduccion'].lower() == clean_word.lower():
-                            translation = spanish_word
-                            break
-                else:
-                    translation = clean_word
+                translation = self.lookup_translation(clean_word, source_lang, analysis)
             elif word_type == 'noun':
-                translation = self.translate_noun_with_features(clean_word, source_lang, target_lang)
+                translation = self.translate_noun_with_features(clean_word, source_lang, target_lang, analysis)
             elif word_type == 'adjective':
-                translation = self.translate_adjective_with_agreement(clean_word, source_lang, target_lang, words, i)
+                translation = self.translate_adjective_with_agreement(clean_word, source_lang, target_lang, words, token.position,
+                                                                      analysis)
             else:
                 # Traducción básica para palabras no identificadas
-                if source_lang == 'spanish':
-                    # Buscar con insensibilidad a mayúsculas/minúsculas
-                    translation = clean_word
-                    for spanish_word, data in self.dictionary.items():
-                        if spanish_word.lower() == clean_word.lower():
-                            translation = data['traduccion']
-                            break
-                elif source_lang == 'nasa_yuwe':
-                    # Buscar en el diccionario inverso
-                    translation = clean_word
-                    for spanish_word, data in self.dictionary.items():
-                        if data['traduccion'].lower() == clean_word.lower():
-                            translation = spanish_word
-                            break
-                else:
-                    translation = clean_word
+                translation = self.lookup_translation(clean_word, source_lang, analysis)
             
-            translated_words.append(translation + punctuation)
+            translated_words.append(token.rebuild(translation))
         
-        return ' '.join(translated_words)
+        enhanced = analysis.enhanced[target_lang] = ' '.join(translated_words)
+        return enhanced
     
     def detect_temporal_context(self, text: str, source_lang: str) -> Dict:
         """Detectar contexto temporal en el texto"""
         temporal_info = {'markers': [], 'tense': 'present'}
         
         if source_lang == 'spanish':
-            # Detectar marcadores temporales en español
-            temporal_spanish = {
-                'ayer': 'past',
-                'hoy': 'present', 
-                'mañana': 'future',
-                'ahora': 'present',
-                'antes': 'past',
-                'después': 'future',
-                'en la mañana': 'morning',
-                'en la tarde': 'afternoon',
-                'en la noche': 'night'
-            }
-            
-            text_lower = text.lower()
-            for spanish_marker, tense in temporal_spanish.items():
-                if spanish_marker in text_lower:
-                    temporal_info['markers'].append(spanish_marker)
-                    if tense in ['past', 'present', 'future']:
-                        temporal_info['tense'] = tense
+            # Detectar marcadores temporales en español (una pasada del autómata)
+            for spanish_marker, tense in self.find_context_markers(text, 'temporal'):
+                temporal_info['markers'].append(spanish_marker)
+                if tense in ['past', 'present', 'future']:
+                    temporal_info['tense'] = tense
         
         return temporal_info
     
@@ -468,28 +643,17 @@ class ConjugationEngine:
         question_info = {'is_question': False, 'type': None, 'particle': None}
         
         if source_lang == 'spanish':
-            question_words = {
-                'qué': 'what',
-                'quién': 'who', 
-                'dónde': 'where',
-                'cuándo': 'when',
-                'cómo': 'how',
-                'por qué': 'why'
-            }
-            
-            text_lower = text.lower()
-            
             # Detectar si termina en ?
             if text.strip().endswith('?'):
                 question_info['is_question'] = True
             
-            # Detectar tipo de pregunta
-            for spanish_q, q_type in question_words.items():
-                if spanish_q in text_lower:
-                    question_info['is_question'] = True
-                    question_info['type'] = q_type
-                    question_info['particle'] = self.nasa_yuwe_grammar['question_particles'][q_type]
-                    break
+            # Detectar tipo de pregunta (gana la primera palabra interrogativa de la tabla)
+            question_words = self.find_context_markers(text, 'question')
+            if question_words:
+                spanish_q, q_type = question_words[0]
+                question_info['is_question'] = True
+                question_info['type'] = q_type
+                question_info['particle'] = self.nasa_yuwe_grammar['question_particles'][q_type]
         
         return question_info
     
@@ -522,17 +686,23 @@ class ConjugationEngine:
         
         return result
     
-    def enhanced_contextual_translation(self, text: str, source_lang: str, target_lang: str) -> str:
+    def enhanced_contextual_translation(self, text: str, source_lang: str, target_lang: str,
+                                        analysis: Optional[TextAnalysis] = None) -> str:
         """Traducción contextual mejorada usando todos los patrones gramaticales"""
         if source_lang == target_lang:
             return text
         
-        # Detectar contexto
-        temporal_context = self.detect_temporal_context(text, source_lang)
-        question_context = self.detect_question_type(text, source_lang)
+        # Detectar contexto (una vez por análisis)
+        analysis = self.analyze(text, source_lang, analysis)
+        if analysis.temporal is None:
+            analysis.temporal = self.detect_temporal_context(text, source_lang)
+        if analysis.question is None:
+            analysis.question = self.detect_question_type(text, source_lang)
+        temporal_context = analysis.temporal
+        question_context = analysis.question
         
         # Traducción base
-        base_translation = self.enhance_translation(text, source_lang, target_lang)
+        base_translation = self.enhance_translation(text, source_lang, target_lang, analysis)
         
         if target_lang == 'nasa_yuwe':
             # Aplicar mejoras específicas para Nasa Yuwe
@@ -555,38 +725,61 @@ class ConjugationEngine:
     def translate_spanish_to_nasa_yuwe(self, word: str) -> str:
         """Traducir palabra del español al Nasa Yuwe con conjugaciones"""
         # Buscar traducción directa primero
-        for spanish_word, data in self.dictionary.items():
-            if spanish_word.lower() == word.lower():
-                return data['traduccion']
+        translation = self.lexicon.translate(word)
+        if translation is not None:
+            return translation
         
-        # Intentar detectar conjugación
-        conjugation_result = self.detect_conjugated_form(word)
-        if conjugation_result:
-            base_spanish, base_nasa = conjugation_result
+        # Intentar detectar conjugación o pluralización
+        translation = self.translate_spanish_form(word)
+        if translation is not None:
+            return translation
+        
+        return word  # Devolver sin cambios si no se encuentra
+    
+    def translate_spanish_form(self, word: str) -> Optional[str]:
+        """Traducción de una forma conjugada o plural del español a partir de su lema, o None"""
+        inflection = self.lookup_inflection(word, 'verb')
+        if inflection:
             # Aplicar conjugación en Nasa Yuwe
-            return self.conjugate_nasa_yuwe_verb(base_nasa, 'present')
+            return self.conjugate_nasa_yuwe_verb(self.dictionary[inflection[0]]['traduccion'], 'present')
         
-        # Intentar pluralización
-        if word.lower().endswith('s') and len(word) > 2:
-            singular = word[:-1]
-            for spanish_word, data in self.dictionary.items():
-                if spanish_word.lower() == singular.lower():
-                    return self.pluralize_nasa_yuwe(data['traduccion'])
+        inflection = self.lookup_inflection(word, 'noun')
+        if inflection:
+            return self.pluralize_nasa_yuwe(self.dictionary[inflection[0]]['traduccion'])
         
-        return word  # Devolver sin cambios si no se encuentra
+        return None
     
     def translate_nasa_yuwe_to_spanish(self, word: str) -> str:
         """Traducir palabra del Nasa Yuwe al español con conjugaciones"""
         # Buscar traducción directa (inversa)
-        for spanish_word, data in self.dictionary.items():
-            if data['traduccion'].lower() == word.lower():
-                return spanish_word
+        spanish_word = self.lexicon.reverse_lookup(word)
+        if spanish_word is not None:
+            return spanish_word
         
-        # Intentar detectar conjugación en Nasa Yuwe
-        if word.endswith('we') and len(word) > 3:
-            possible_root = word[:-2] + '-'
-            for spanish_word, data in self.dictionary.items():
-                if data['traduccion'].lower() == possible_root.lower():
-                    return self.conjugate_spanish_verb(spanish_word, 'él/ella')
+        # Intentar detectar conjugación, raíz verbal o plural en Nasa Yuwe
+        spanish_word = self.translate_nasa_yuwe_form(word)
+        if spanish_word is not None:
+            return spanish_word
         
-        return word  # Devolver sin cambios si no se encuentra
\ No newline at end of file
+        return word  # Devolver sin cambios si no se encuentra
+    
+    def translate_nasa_yuwe_form(self, word: str) -> Optional[str]:
+        """Traducción al español de una forma derivada del Nasa Yuwe (conjugación, raíz o plural), o None"""
+        forms = self.nasa_yuwe_forms.get(Lexicon.normalize(word))
+        if not forms:
+            return None
+        # Las formas verbales tienen prioridad sobre el plural nominal
+        spanish_word, form = min(forms, key=lambda entry: entry[1] == 'plural')
+        if form == 'present':
+            return self.conjugate_spanish_verb(spanish_word, 'él/ella')
+        elif form == 'plural':
+            return self.pluralize_spanish_noun(spanish_word)
+        return spanish_word
+    
+    def translate_inflected_form(self, word: str, source_lang: str) -> Optional[str]:
+        """Traducción de una forma flexionada de una entrada del diccionario en cualquier dirección, o None"""
+        if source_lang == 'spanish':
+            return self.translate_spanish_form(word)
+        if source_lang == 'nasa_yuwe':
+            return self.translate_nasa_yuwe_form(word)
+        return None
@@ -0,0 +1,21 @@
+# Despliegue pre-fork con gunicorn:
+#   gunicorn -c gunicorn.conf.py
+# El maestro construye el modelo (NLLB, léxico y motor gramatical) una sola vez
+# y los workers comparten sus páginas tras el fork.
+import os
+
+wsgi_app = 'app:create_app(preload=True)'
+preload_app = True
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Hilos por worker: las peticiones concurrentes de un worker comparten los micro-lotes de NLLB
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+
+
+def post_fork(server, worker):
+    import app
+    # Hilos de PyTorch por worker para no sobresuscribir los núcleos
+    app.init_worker(workers)
@@ -0,0 +1,355 @@
+import os
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from fuzzy_index import FuzzyIndex, LayeredFuzzyIndex, build_fuzzy_indexes
+from lexicon_journal import LexiconJournal
+from phrase_matcher import PhraseMatcher
+from tokenizer import split_punctuation
+
+logger = logging.getLogger(__name__)
+
+
+class Lexicon:
+    """
+    Léxico Español - Nasa Yuwe compartido por todos los motores de traducción.
+
+    Mantiene el diccionario original y dos índices hash normalizados
+    (minúsculas/casefold) para que cada búsqueda sea O(1):
+    - forward_index: palabra en español -> claves originales del diccionario
+    - reverse_index: traducción en Nasa Yuwe -> claves en español
+
+    Ambos índices son multivaluados (varias claves pueden compartir la misma
+    forma normalizada o la misma traducción) y se actualizan de forma
+    incremental con add_entry/remove_entry, sin reconstruirse. Las listas de
+    los índices se reemplazan en lugar de modificarse, de modo que with_changes
+    puede crear una versión nueva copiando solo los diccionarios.
+
+    Las entradas de varias palabras se buscan con un autómata por tokens
+    (uno por dirección) que se compila de nuevo solo cuando cambian.
+
+    Las palabras ausentes se aproximan con dos índices de borrado simétrico
+    (fuzzy_index.py), uno por dirección, sobre las formas sin tildes. Se
+    construyen la primera vez que una palabra no se encuentra; las versiones
+    nuevas comparten esa base y copian solo su capa de claves agregadas y
+    eliminadas.
+
+    `version` aumenta con cada modificación y permite invalidar los
+    resultados derivados (p. ej. la caché de traducciones);
+    `journal_position` es la posición del diario (generación, desplazamiento)
+    hasta la que el léxico incluye los cambios.
+    """
+
+    def __init__(self, entries: Optional[Dict] = None, journal_position: Tuple[Optional[str], int] = (None, 0)):
+        self.entries = entries if entries is not None else {}
+        self.forward_index = {}
+        self.reverse_index = {}
+        self._phrase_matchers = None
+        self._fuzzy_indexes = None
+        self.version = 0
+        self.journal_position = journal_position
+        self._build_indexes()
+
+    @classmethod
+    def from_file(cls, dictionary_path: str) -> 'Lexicon':
+        """Cargar el léxico desde el archivo JSON del diccionario y su diario de cambios"""
+        if not os.path.exists(dictionary_path) and not os.path.exists(dictionary_path + '.journal'):
+            logger.warning("Diccionario no encontrado, usando léxico vacío")
+            return cls({})
+        entries, journal_position = get_lexicon_journal(dictionary_path).load()
+        logger.info(f"Léxico cargado: {len(entries)} entradas")
+        return cls(entries, journal_position)
+
+    @staticmethod
+    def normalize(word: str) -> str:
+        """Normalizar una palabra para usarla como clave de los índices"""
+        return word.strip().casefold()
+
+    @classmethod
+    def phrase_key(cls, text: str) -> Tuple[str, ...]:
+        """Secuencia de palabras normalizadas (sin puntuación) de una frase"""
+        return tuple(cls.normalize(split_punctuation(word)[1]) for word in text.split())
+
+    def _build_indexes(self):
+        """Construir los índices directo e inverso en una sola pasada"""
+        for spanish_word, data in self.entries.items():
+            self._index_entry(spanish_word, data)
+
+    def _index_entry(self, spanish_word: str, data: Dict):
+        """Registrar una entrada en ambos índices"""
+        for index, key in ((self.forward_index, self.normalize(spanish_word)),
+                           (self.reverse_index, self.normalize(data['traduccion']))):
+            index[key] = index.get(key, []) + [spanish_word]
+        if self._fuzzy_indexes is not None:
+            self._fuzzy_indexes[0].add(self.normalize(spanish_word))
+            self._fuzzy_indexes[1].add(self.normalize(data['traduccion']))
+
+    def _unindex_entry(self, spanish_word: str, data: Dict):
+        """Eliminar una entrada de ambos índices"""
+        fuzzy_indexes = self._fuzzy_indexes or (None, None)
+        for index, fuzzy_index, key in ((self.forward_index, fuzzy_indexes[0], self.normalize(spanish_word)),
+                                        (self.reverse_index, fuzzy_indexes[1], self.normalize(data['traduccion']))):
+            keys = index.get(key)
+            if keys and spanish_word in keys:
+                remaining = [k for k in keys if k != spanish_word]
+                if remaining:
+                    index[key] = remaining
+                else:
+                    del index[key]
+                    if fuzzy_index is not None:
+                        fuzzy_index.remove(key)
+
+    @staticmethod
+    def _is_phrase(spanish_word: str, data: Dict) -> bool:
+        return len(spanish_word.split()) > 1 or len(data['traduccion'].split()) > 1
+
+    def mark_modified(self):
+        """Registrar que el diccionario cambió (en memoria o en disco)"""
+        self.version += 1
+
+    def add_entry(self, spanish_word: str, data: Dict):
+        """Agregar o reemplazar una entrada actualizando los índices"""
+        if spanish_word in self.entries:
+            self.remove_entry(spanish_word)
+        self.mark_modified()
+        self.entries[spanish_word] = data
+        self._index_entry(spanish_word, data)
+        if self._is_phrase(spanish_word, data):
+            self._phrase_matchers = None
+
+    def remove_entry(self, spanish_word: str) -> Optional[Dict]:
+        """Eliminar una entrada actualizando los índices; devuelve la entrada eliminada"""
+        data = self.entries.pop(spanish_word, None)
+        if data is not None:
+            self.mark_modified()
+            self._unindex_entry(spanish_word, data)
+            if self._is_phrase(spanish_word, data):
+                self._phrase_matchers = None
+        return data
+
+    def apply(self, operation: Dict):
+        """Aplicar una operación del diario ({'op': 'set'|'delete', 'key', 'value'})"""
+        if operation['op'] == 'set':
+            self.add_entry(operation['key'], operation['value'])
+        else:
+            self.remove_entry(operation['key'])
+
+    def with_changes(self, operations: Sequence[Dict],
+                     journal_position: Optional[Tuple[Optional[str], int]] = None) -> 'Lexicon':
+        """
+        Nueva versión del léxico con las operaciones aplicadas (y, si se
+        indica, la posición del diario hasta la que llegan).
+
+        El léxico actual no se modifica: los lectores que lo tengan siguen
+        viendo una instantánea coherente mientras se publica la nueva.
+        """
+        lexicon = type(self).__new__(type(self))
+        lexicon.entries = dict(self.entries)
+        lexicon.forward_index = dict(self.forward_index)
+        lexicon.reverse_index = dict(self.reverse_index)
+        # Los autómatas compilados no se modifican; se descartan si cambia una frase
+        lexicon._phrase_matchers = self._phrase_matchers
+        lexicon._fuzzy_indexes = copy_fuzzy_indexes(self._fuzzy_indexes)
+        lexicon.version = self.version
+        lexicon.journal_position = journal_position or self.journal_position
+        for operation in operations:
+            lexicon.apply(operation)
+        return lexicon
+
+    def _build_phrase_matchers(self) -> Tuple[PhraseMatcher, PhraseMatcher]:
+        """Compilar los autómatas de frases (español y Nasa Yuwe) de varias palabras"""
+        return build_phrase_matchers(((spanish_word, data['traduccion']) for spanish_word, data in self.entries.items()),
+                                     self.phrase_key)
+
+    def match_phrases(self, words: Sequence[str], reverse: bool = False) -> List[Tuple[int, int, str]]:
+        """
+        Buscar entradas de varias palabras en una secuencia de palabras normalizadas.
+
+        Devuelve las coincidencias más largas sin solapamiento como
+        (inicio, fin, clave en español), en una sola pasada lineal.
+        """
+        matchers = self._phrase_matchers
+        if matchers is None:
+            # Se publica la referencia completa para no exponer un autómata a medio construir
+            matchers = self._phrase_matchers = self._build_phrase_matchers()
+        matcher = matchers[1] if reverse else matchers[0]
+        if not len(matcher):
+            return []
+        return matcher.longest_matches(words)
+
+    def _build_fuzzy_indexes(self) -> Tuple[FuzzyIndex, FuzzyIndex]:
+        return build_fuzzy_indexes(((spanish_word, data['traduccion']) for spanish_word, data in self.entries.items()),
+                                   self.normalize)
+
+    def fuzzy_indexes(self) -> Tuple[LayeredFuzzyIndex, LayeredFuzzyIndex]:
+        """Índices aproximados (español, Nasa Yuwe), construidos la primera vez que se necesitan"""
+        indexes = self._fuzzy_indexes
+        if indexes is None:
+            with _fuzzy_indexes_lock:
+                indexes = self._fuzzy_indexes
+                if indexes is None:
+                    # Se publica la referencia completa para no exponer un índice a medio construir
+                    indexes = self._fuzzy_indexes = tuple(LayeredFuzzyIndex(index)
+                                                          for index in self._build_fuzzy_indexes())
+        return indexes
+
+    def fuzzy_lookup(self, word: str, reverse: bool = False) -> Optional[Tuple[str, str, int]]:
+        """
+        Entrada más cercana a una palabra que no está en el léxico.
+
+        Devuelve (palabra encontrada, traducción, distancia) o None; la
+        traducción es la palabra en español si `reverse`. La distancia se
+        mide sin tildes: 0 significa que solo difieren en tildes o en la ñ.
+        """
+        index = self.fuzzy_indexes()[1 if reverse else 0]
+        for key, distance in index.search(self.normalize(word), closest=True):
+            translation = self.reverse_lookup(key) if reverse else self.translate(key)
+            if translation is not None:
+                return key, translation, distance
+        return None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, word: str) -> bool:
+        return self.normalize(word) in self.forward_index
+
+    def lookup(self, word: str) -> Optional[Tuple[str, Dict]]:
+        """Buscar una palabra en español; devuelve (clave, entrada) o None"""
+        keys = self.forward_index.get(self.normalize(word))
+        if not keys:
+            return None
+        # La primera entrada gana, igual que los recorridos lineales anteriores
+        return keys[0], self.entries[keys[0]]
+
+    def lookup_all(self, word: str) -> List[str]:
+        """Todas las claves en español que coinciden con una palabra (sin distinguir mayúsculas)"""
+        return list(self.forward_index.get(self.normalize(word), ()))
+
+    def translate(self, word: str) -> Optional[str]:
+        """Traducción al Nasa Yuwe de una palabra en español, o None"""
+        entry = self.lookup(word)
+        return entry[1]['traduccion'] if entry else None
+
+    def reverse_lookup(self, word: str) -> Optional[str]:
+        """Palabra en español correspondiente a una traducción en Nasa Yuwe, o None"""
+        keys = self.reverse_index.get(self.normalize(word))
+        # La última entrada gana, igual que el diccionario inverso original
+        return keys[-1] if keys else None
+
+    def reverse_lookup_all(self, word: str) -> List[str]:
+        """Todas las palabras en español que comparten una traducción en Nasa Yuwe"""
+        return list(self.reverse_index.get(self.normalize(word), ()))
+
+
+def copy_fuzzy_indexes(indexes: Optional[Tuple[LayeredFuzzyIndex, LayeredFuzzyIndex]]):
+    """Índices aproximados para una versión nueva: base compartida y capa propia (None si no se construyeron)"""
+    return tuple(index.copy() for index in indexes) if indexes is not None else None
+
+
+def build_phrase_matchers(pairs: Iterable[Tuple[str, str]],
+                          phrase_key: Callable[[str], Tuple[str, ...]]) -> Tuple[PhraseMatcher, PhraseMatcher]:
+    """
+    Autómatas de frases (español, Nasa Yuwe) a partir de pares (clave, traducción).
+
+    Igual que en los índices de palabras, en español gana la primera entrada
+    y en Nasa Yuwe la última.
+    """
+    forward, reverse = {}, {}
+    for spanish_word, translation in pairs:
+        key = phrase_key(spanish_word)
+        if len(key) > 1:
+            forward.setdefault(key, spanish_word)
+        key = phrase_key(translation)
+        if len(key) > 1:
+            reverse[key] = spanish_word
+    matchers = PhraseMatcher(), PhraseMatcher()
+    for matcher, phrases in zip(matchers, (forward, reverse)):
+        for key, spanish_word in phrases.items():
+            matcher.add(key, spanish_word)
+    return matchers[0].build(), matchers[1].build()
+
+
+# Un único léxico y un único diario por proceso y por archivo de diccionario
+_lexicons = {}
+_lexicons_lock = threading.Lock()
+_journals = {}
+_journals_lock = threading.Lock()
+# Serializa la construcción diferida de los índices aproximados
+_fuzzy_indexes_lock = threading.Lock()
+
+
+def get_lexicon_journal(dictionary_path: str = os.path.join('data', 'nasa_yuwe_dictionary.json')) -> LexiconJournal:
+    """Obtener el diario de escritura del diccionario"""
+    key = os.path.abspath(dictionary_path)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            journal = LexiconJournal(dictionary_path, normalize=Lexicon.normalize)
+            _journals[key] = journal
+        return journal
+
+
+def update_lexicon(dictionary_path: str, operations: Sequence[Dict],
+                   journal_position: Optional[Tuple[Optional[str], int]] = None) -> Optional[Lexicon]:
+    """
+    Publicar una nueva versión del léxico compartido con las operaciones
+    aplicadas, que llegan hasta `journal_position` en el diario.
+
+    Devuelve el léxico publicado, o None si aún no se había cargado (al
+    cargarse leerá la instantánea y el diario completos).
+    """
+    key = os.path.abspath(dictionary_path)
+    with _lexicons_lock:
+        current = _lexicons.get(key)
+        if current is None:
+            return None
+        if not operations:
+            # Solo avanzó la posición (p. ej. tras una compactación): no hay versión nueva
+            if journal_position is not None:
+                current.journal_position = journal_position
+            return current
+        lexicon = current.with_changes(operations, journal_position)
+        _lexicons[key] = lexicon
+        return lexicon
+
+
+def get_loaded_lexicon(dictionary_path: str = os.path.join('data', 'nasa_yuwe_dictionary.json')) -> Optional[Lexicon]:
+    """Léxico compartido publicado, o None si aún no se cargó (no lo carga)"""
+    with _lexicons_lock:
+        return _lexicons.get(os.path.abspath(dictionary_path))
+
+
+def get_lexicon(dictionary_path: str = os.path.join('data', 'nasa_yuwe_dictionary.json')) -> Lexicon:
+    """Obtener el léxico compartido, cargándolo la primera vez que se solicita"""
+    key = os.path.abspath(dictionary_path)
+    with _lexicons_lock:
+        lexicon = _lexicons.get(key)
+        if lexicon is None:
+            lexicon = load_lexicon(dictionary_path)
+            _lexicons[key] = lexicon
+        return lexicon
+
+
+def load_lexicon(dictionary_path: str):
+    """
+    Cargar el léxico compilado (mmap) si existe y corresponde al diccionario
+    actual; si no, el diccionario JSON con su diario.
+    """
+    # Importación diferida: mapped_lexicon depende de este módulo
+    from mapped_lexicon import MappedLexicon, compiled_path
+
+    binary_path = compiled_path(dictionary_path)
+    if os.path.exists(binary_path):
+        try:
+            lexicon = MappedLexicon(binary_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo abrir el léxico compilado: {e}")
+        else:
+            if lexicon.source == get_lexicon_journal(dictionary_path).source_state():
+                logger.info(f"Léxico compilado proyectado en memoria: {len(lexicon)} entradas")
+                return lexicon
+            logger.warning("El léxico compilado no corresponde al diccionario actual; "
+                           "se usa el JSON (vuelva a ejecutar compile_lexicon.py)")
+            lexicon.close()
+    return Lexicon.from_file(dictionary_path)
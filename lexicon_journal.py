@@ -0,0 +1,442 @@
+import os
+import json
+import stat
+import uuid
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializan los hilos del proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Número de operaciones en el diario a partir del cual se compacta en segundo plano
+COMPACT_THRESHOLD = 500
+
+
+class LexiconEdit:
+    """
+    Cambios pendientes dentro de LexiconJournal.edit().
+
+    Las consultas ven el léxico publicado más las operaciones del diario que
+    aún no tiene (`pending`) y las de este mismo bloque; las operaciones se
+    escriben juntas al salir del bloque `with`.
+    """
+
+    def __init__(self, journal: 'LexiconJournal', base, pending: List[Dict]):
+        self.journal = journal
+        self.base = base
+        self.pending = pending
+        self.operations = []
+        self.position = base.journal_position
+        # Clave -> entrada (None si se eliminó), en el orden de la última escritura
+        self._overlay = {}
+        for operation in pending:
+            self._record(operation)
+
+    @property
+    def changes(self) -> List[Dict]:
+        """Operaciones que el léxico publicado debe aplicar: las pendientes y las de este bloque"""
+        return self.pending + self.operations
+
+    def _record(self, operation: Dict):
+        self._overlay.pop(operation['key'], None)
+        self._overlay[operation['key']] = operation['value'] if operation['op'] == 'set' else None
+
+    def _first_key(self, base_keys: List[str], word: str, field: Callable[[str, Dict], str]) -> Optional[str]:
+        """Primera clave vigente entre las del léxico publicado y las modificadas después"""
+        for spanish_word in base_keys:
+            if spanish_word not in self._overlay:
+                return spanish_word
+        # Como en el índice del léxico, una clave reescrita pasa al final
+        normalized = self.journal.normalize(word)
+        for spanish_word, data in self._overlay.items():
+            if data is not None and self.journal.normalize(field(spanish_word, data)) == normalized:
+                return spanish_word
+        return None
+
+    def find_key(self, word: str) -> Optional[str]:
+        """Clave existente que coincide con una palabra en español (sin distinguir mayúsculas)"""
+        return self._first_key(self.base.lookup_all(word), word, lambda spanish_word, data: spanish_word)
+
+    def find_by_translation(self, word: str) -> Optional[str]:
+        """Primera clave en español cuya traducción coincide con una palabra en Nasa Yuwe"""
+        return self._first_key(self.base.reverse_lookup_all(word), word, lambda spanish_word, data: data['traduccion'])
+
+    def get(self, spanish_word: str) -> Optional[Dict]:
+        if spanish_word in self._overlay:
+            return self._overlay[spanish_word]
+        return self.base.entries[spanish_word] if spanish_word in self.base.entries else None
+
+    def set(self, spanish_word: str, data: Dict):
+        operation = {'op': 'set', 'key': spanish_word, 'value': data}
+        self.operations.append(operation)
+        self._record(operation)
+
+    def delete(self, spanish_word: str):
+        operation = {'op': 'delete', 'key': spanish_word}
+        self.operations.append(operation)
+        self._record(operation)
+
+
+class LexiconJournal:
+    """
+    Diario de solo anexado para las modificaciones del diccionario.
+
+    El diccionario en disco es la instantánea `nasa_yuwe_dictionary.json`
+    más el diario `nasa_yuwe_dictionary.json.journal` (una operación JSON por
+    línea). Cada escritura anexa sus operaciones bajo un bloqueo de archivo y
+    hace fsync, así que su costo no depende del tamaño del léxico y las
+    escrituras concurrentes (hilos o procesos) no se pisan.
+
+    El diario no guarda una copia del diccionario: cada léxico publicado
+    recuerda su posición en el diario (generación, desplazamiento) y las
+    ediciones leen solo las operaciones posteriores a esa posición.
+
+    Al acumular `compact_threshold` operaciones, un hilo en segundo plano
+    reescribe la instantánea de forma atómica (archivo temporal + rename) y
+    deja en el diario solo lo anexado mientras tanto. Las operaciones son
+    idempotentes (la última escritura de cada clave gana), por lo que una
+    interrupción entre ambos renombrados no pierde ni corrompe datos.
+
+    La primera línea del diario identifica su generación y, tras una
+    compactación, la generación anterior y el desplazamiento hasta el que se
+    incorporó a la instantánea, de modo que una posición de la generación
+    anterior sigue siendo válida. Si no lo es (el léxico publicado quedó
+    detrás de dos compactaciones), los cambios se obtienen comparando el
+    léxico con el estado completo en disco.
+    """
+
+    def __init__(self, snapshot_path: str, normalize: Callable[[str], str] = str.casefold,
+                 compact_threshold: int = COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + '.journal'
+        self.lock_path = snapshot_path + '.lock'
+        self.normalize = normalize
+        self.compact_threshold = compact_threshold
+        # Operaciones contadas en el diario actual: (generación, desplazamiento, operaciones)
+        self._counted = (None, 0, 0)
+        # Última posición confirmada como actual y la huella del archivo en ese momento
+        self._verified = None
+        self._lock = threading.Lock()
+        self._compacting = False
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusión entre hilos y, con fcntl, entre procesos"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            directory = os.path.dirname(self.lock_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _parse_header(line: bytes) -> Dict:
+        """Cabecera del diario ({} si falta o está incompleta)"""
+        try:
+            header = json.loads(line)
+        except ValueError:
+            return {}
+        return header if isinstance(header, dict) and 'generation' in header else {}
+
+    @staticmethod
+    def _parse_operations(data: bytes, offset: int) -> Tuple[List[Dict], int]:
+        """Operaciones completas de `data` leído desde `offset`; devuelve (operaciones, nuevo offset)"""
+        operations = []
+        for line in data.splitlines(keepends=True):
+            # Una línea sin salto final es una escritura interrumpida: se descarta
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            try:
+                operation = json.loads(line)
+            except ValueError:
+                logger.warning("Línea inválida en el diario del léxico, se ignora")
+                continue
+            if isinstance(operation, dict) and operation.get('op') in ('set', 'delete'):
+                operations.append(operation)
+        return operations, offset
+
+    def _read_generation(self) -> Optional[str]:
+        """Generación del diario actual (None si no existe)"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                return self._parse_header(f.readline()).get('generation')
+        except FileNotFoundError:
+            return None
+
+    def _load(self) -> Tuple[Dict, Tuple[Optional[str], int]]:
+        """Instantánea con el diario completo reproducido y la posición final (requiere el bloqueo)"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = {}
+        try:
+            with open(self.journal_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return entries, (None, 0)
+
+        operations, offset = self._parse_operations(data, 0)
+        for operation in operations:
+            if operation['op'] == 'set':
+                # La clave reescrita pasa al final, igual que en los índices del léxico
+                entries.pop(operation['key'], None)
+                entries[operation['key']] = operation['value']
+            else:
+                entries.pop(operation['key'], None)
+        return entries, (self._parse_header(data.split(b'\n', 1)[0]).get('generation'), offset)
+
+    def _read_tail(self, base) -> Tuple[List[Dict], Tuple[Optional[str], int]]:
+        """
+        Operaciones del diario que `base` (un léxico publicado) aún no aplicó
+        y la posición hasta la que llegan (requiere el bloqueo).
+        """
+        generation, offset = base.journal_position
+        start = None
+        try:
+            with open(self.journal_path, 'rb') as f:
+                header_line = f.readline()
+                header = self._parse_header(header_line)
+                current = header.get('generation')
+                if current == generation:
+                    start = offset
+                elif generation is None and 'previous' not in header:
+                    # Diario creado después de cargar la instantánea
+                    start = 0
+                elif generation is not None and header.get('previous') == generation and offset >= header['folded']:
+                    # Otro proceso compactó: la posición se traslada al nuevo diario
+                    start = len(header_line) + offset - header['folded']
+                if start is not None:
+                    f.seek(start)
+                    data = f.read()
+        except FileNotFoundError:
+            if generation is None:
+                return [], (None, 0)
+        if start is None:
+            return self._diff(base)
+        operations, offset = self._parse_operations(data, start)
+        return operations, (current, offset)
+
+    def _diff(self, base) -> Tuple[List[Dict], Tuple[Optional[str], int]]:
+        """Operaciones que llevan `base` al estado completo en disco (requiere el bloqueo)"""
+        logger.info("El léxico publicado quedó detrás de la compactación del diario; se compara con el disco")
+        entries, position = self._load()
+        operations = [{'op': 'set', 'key': spanish_word, 'value': data}
+                      for spanish_word, data in entries.items()
+                      if spanish_word not in base.entries or base.entries[spanish_word] != data]
+        operations.extend({'op': 'delete', 'key': spanish_word}
+                          for spanish_word in base.entries if spanish_word not in entries)
+        return operations, position
+
+    def _append(self, position: Tuple[Optional[str], int], operations: List[Dict]) -> Tuple[str, int]:
+        """Anexar operaciones al diario en `position` y forzarlas a disco (requiere el bloqueo)"""
+        generation, offset = position
+        lines = [json.dumps(operation, ensure_ascii=False) + '\n' for operation in operations]
+        created = generation is None
+        if created:
+            generation = uuid.uuid4().hex
+            lines.insert(0, json.dumps({'generation': generation}) + '\n')
+            offset = 0
+        data = ''.join(lines).encode('utf-8')
+
+        with open(self.journal_path, 'ab') as f:
+            # Descartar una línea incompleta que haya dejado una escritura interrumpida
+            if f.tell() > offset:
+                f.truncate(offset)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if created:
+            self._fsync_directory()
+        return generation, offset + len(data)
+
+    def _count_operations(self, position: Tuple[str, int]) -> int:
+        """Operaciones en el diario hasta `position`, leyendo solo lo que no se contó antes"""
+        generation, offset = position
+        counted_generation, counted_offset, count = self._counted
+        if counted_generation != generation or counted_offset > offset:
+            # La cabecera ocupa la primera línea
+            counted_offset, count = 0, -1
+        if counted_offset < offset:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(counted_offset)
+                count += f.read(offset - counted_offset).count(b'\n')
+        self._counted = (generation, offset, count)
+        return count
+
+    def _fsync_directory(self):
+        """Hacer persistente la creación o el renombrado de archivos del directorio"""
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.snapshot_path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def load(self) -> Tuple[Dict, Tuple[Optional[str], int]]:
+        """Estado actual del diccionario (instantánea + diario) y su posición en el diario"""
+        with self._locked():
+            return self._load()
+
+    def load_with_state(self) -> Tuple[Dict, Tuple[Optional[str], int], Dict]:
+        """Estado actual del diccionario y su posición, junto con la huella de los archivos de los que proviene"""
+        with self._locked():
+            entries, position = self._load()
+            return entries, position, self.source_state()
+
+    def source_state(self) -> Dict:
+        """
+        Huella de la instantánea y del diario en disco.
+
+        Permite saber si un artefacto derivado (p. ej. el léxico compilado)
+        corresponde todavía al contenido actual del diccionario.
+        """
+        try:
+            snapshot_stat = os.stat(self.snapshot_path)
+            snapshot = [snapshot_stat.st_size, snapshot_stat.st_mtime_ns]
+        except FileNotFoundError:
+            snapshot = None
+        try:
+            journal = [self._read_generation(), os.path.getsize(self.journal_path)]
+        except FileNotFoundError:
+            journal = None
+        return {'snapshot': snapshot, 'journal': journal}
+
+    def changed_since(self, position: Tuple[Optional[str], int]) -> bool:
+        """
+        Si el diario avanzó (u otro proceso lo compactó) desde `position`.
+
+        Solo consulta el tamaño del archivo; la cabecera se lee únicamente
+        cuando el tamaño coincide y el archivo cambió desde la última
+        comprobación, así que puede llamarse antes de cada petición.
+        """
+        generation, offset = position
+        try:
+            journal_stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return generation is not None
+        if journal_stat.st_size != offset:
+            return True
+        signature = (journal_stat.st_ino, journal_stat.st_size, journal_stat.st_mtime_ns)
+        if self._verified == (position, signature):
+            return False
+        if self._read_generation() != generation:
+            return True
+        self._verified = (position, signature)
+        return False
+
+    def read_since(self, base) -> Tuple[List[Dict], Tuple[Optional[str], int]]:
+        """Operaciones del diario que el léxico publicado `base` aún no aplicó y la posición hasta la que llegan"""
+        with self._locked():
+            return self._read_tail(base)
+
+    @contextmanager
+    def edit(self, base) -> Iterator[LexiconEdit]:
+        """
+        Modificar el diccionario de forma atómica sobre el léxico publicado `base`.
+
+        Las consultas y las operaciones del bloque se hacen bajo el mismo
+        bloqueo, así que una comprobación de duplicados seguida de un `set`
+        no compite con otros escritores. Al salir, `edit.changes` son las
+        operaciones a publicar y `edit.position` la nueva posición del léxico.
+        """
+        with self._locked():
+            pending, position = self._read_tail(base)
+            edit = LexiconEdit(self, base, pending)
+            edit.position = position
+            yield edit
+            if edit.operations:
+                edit.position = self._append(position, edit.operations)
+                count = self._count_operations(edit.position)
+
+        if edit.operations and count >= self.compact_threshold:
+            self.compact_in_background()
+
+    def compact_in_background(self):
+        """Compactar en un hilo aparte si no hay otra compactación en curso"""
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact_safely, name='lexicon-compaction', daemon=True).start()
+
+    def _compact_safely(self):
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Error al compactar el diario del léxico: {e}")
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self):
+        """Reescribir la instantánea con el estado actual y vaciar el diario"""
+        with self._locked():
+            entries, (generation, offset) = self._load()
+        if generation is None:
+            return
+
+        # La escritura de la instantánea (la parte costosa) no bloquea a los escritores
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        snapshot_fd, snapshot_tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        journal_tmp = None
+        try:
+            with os.fdopen(snapshot_fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self._locked():
+                with open(self.journal_path, 'rb') as f:
+                    if self._parse_header(f.readline()).get('generation') != generation:
+                        # Otro proceso compactó mientras tanto
+                        os.remove(snapshot_tmp)
+                        return
+                    # Lo anexado durante la escritura pasa al nuevo diario
+                    f.seek(offset)
+                    tail = f.read()
+                tail = tail[:tail.rfind(b'\n') + 1]
+                new_generation = uuid.uuid4().hex
+                header = (json.dumps({'generation': new_generation, 'previous': generation,
+                                      'folded': offset}) + '\n').encode('utf-8')
+
+                journal_fd, journal_tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                with os.fdopen(journal_fd, 'wb') as f:
+                    f.write(header + tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                # Conservar los permisos de los archivos originales (mkstemp usa 0600)
+                for temp_path, path in ((snapshot_tmp, self.snapshot_path), (journal_tmp, self.journal_path)):
+                    try:
+                        os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+                    except FileNotFoundError:
+                        os.chmod(temp_path, 0o644)
+
+                os.replace(snapshot_tmp, self.snapshot_path)
+                os.replace(journal_tmp, self.journal_path)
+                self._fsync_directory()
+
+                self._counted = (new_generation, len(header) + len(tail), tail.count(b'\n'))
+                logger.info(f"Diario del léxico compactado: {len(entries)} entradas en la instantánea")
+        except BaseException:
+            for temp_path in (snapshot_tmp, journal_tmp):
+                if temp_path is not None and os.path.exists(temp_path):
+                    os.remove(temp_path)
+            raise
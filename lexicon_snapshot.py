@@ -0,0 +1,124 @@
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # Sin brotli se sirve gzip (o sin comprimir)
+    brotli = None
+
+# Cambios del léxico que se conservan para responder deltas
+MAX_CHANGES = 1000
+
+
+class Snapshot:
+    """Instantánea serializada de una versión del léxico con sus codificaciones precalculadas"""
+
+    __slots__ = ('version', 'etag', 'body', 'encoded')
+
+    def __init__(self, version: str, body: bytes):
+        self.version = version
+        self.body = body
+        # La etiqueta depende solo del contenido: dos procesos con el mismo léxico dan la misma
+        self.etag = 'W/"' + hashlib.sha256(body).hexdigest()[:20] + '"'
+        self.encoded = {'gzip': gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(body)
+
+    def negotiate(self, accept_encoding: str):
+        """(codificación, cuerpo) según Accept-Encoding: brotli, luego gzip, luego sin comprimir"""
+        accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in self.encoded:
+                return encoding, self.encoded[encoding]
+        return None, self.body
+
+
+class LexiconSnapshots:
+    """
+    Instantáneas del léxico para resolver en el cliente las palabras del
+    diccionario, más un registro acotado de cambios para enviar solo deltas.
+
+    Una versión es '<época>.<número>': la época identifica al proceso (se
+    renueva tras un fork, porque cada worker publica sus propias versiones) y
+    el número es Lexicon.version. La etiqueta ETag de la instantánea es el
+    hash de su contenido, así que una revalidación responde 304 en cualquier
+    worker que tenga el mismo léxico.
+    """
+
+    def __init__(self, max_changes: int = MAX_CHANGES):
+        self.max_changes = max_changes
+        self._lock = threading.Lock()
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._changes = deque()  # (versión anterior, versión nueva, operaciones)
+        self._snapshot = None
+        self._snapshot_key = None
+
+    def version_id(self, version: int) -> str:
+        return f'{self.epoch}.{version}'
+
+    def record(self, previous_version: int, version: int, operations: List[Dict]):
+        """Registrar las operaciones que llevaron el léxico de una versión a la siguiente"""
+        with self._lock:
+            self._changes.append((previous_version, version, operations))
+            while len(self._changes) > self.max_changes:
+                self._changes.popleft()
+
+    def snapshot(self, lexicon) -> Snapshot:
+        """Instantánea de la versión publicada del léxico (se serializa una vez por versión)"""
+        key = (id(lexicon), lexicon.version)
+        with self._lock:
+            if self._snapshot_key != key:
+                # Pares [español, Nasa Yuwe] en el orden del léxico: la primera entrada gana
+                entries = [[spanish_word, data['traduccion']] for spanish_word, data in lexicon.entries.items()]
+                body = json.dumps({'version': self.version_id(lexicon.version), 'entries': entries},
+                                  ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                self._snapshot = Snapshot(self.version_id(lexicon.version), body)
+                self._snapshot_key = key
+            return self._snapshot
+
+    def delta(self, since: str, lexicon) -> Optional[Dict]:
+        """
+        Cambios desde la versión `since`, colapsados por clave (la última
+        operación de cada una), o None si esa versión ya no se conserva o es
+        de otro proceso y el cliente necesita la instantánea completa.
+        """
+        epoch, _, number = (since or '').partition('.')
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        since_version = int(number)
+        current = lexicon.version
+        if since_version == current:
+            return {'version': self.version_id(current), 'set': [], 'delete': []}
+
+        with self._lock:
+            changes = list(self._changes)
+        # El registro debe cubrir sin huecos desde `since` hasta la versión publicada
+        if (not changes or since_version > current or changes[-1][1] != current
+                or not any(previous == since_version for previous, _, _ in changes)):
+            return None
+
+        final = {}
+        for previous, version, operations in changes:
+            if previous < since_version:
+                continue
+            for operation in operations:
+                # Una clave modificada pasa al final, igual que en Lexicon.add_entry
+                final.pop(operation['key'], None)
+                final[operation['key']] = operation
+        return {
+            'version': self.version_id(current),
+            'set': [[key, operation['value']['traduccion']] for key, operation in final.items()
+                    if operation['op'] == 'set'],
+            'delete': [key for key, operation in final.items() if operation['op'] == 'delete']
+        }
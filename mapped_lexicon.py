@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import mmap
+import zlib
+import struct
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from fuzzy_index import FuzzyIndex, build_fuzzy_indexes
+from lexicon import Lexicon, build_phrase_matchers, copy_fuzzy_indexes
+from phrase_matcher import PhraseMatcher
+
+# Formato del léxico compilado (little-endian):
+#   cabecera: magia, versión del formato, posición y longitud de los metadatos JSON
+#   secciones de enteros u32: tabla de cadenas, entradas, frases, índices hash
+#   una sección de bytes con la clase verbal de cada entrada
+MAGIC = b'NYLX'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sIQQ')
+U32 = struct.Struct('<I')
+ENTRY = struct.Struct('<III')  # (clave, traducción, entrada JSON) como ids de cadena
+
+VERB_FLAG_PATTERN = re.compile(b'[^\x00]')
+
+
+def compiled_path(dictionary_path: str) -> str:
+    """Ruta del léxico compilado correspondiente a un diccionario JSON"""
+    return os.path.splitext(dictionary_path)[0] + '.bin'
+
+
+def index_hash(key: bytes) -> int:
+    """Hash estable entre procesos (a diferencia de hash())"""
+    return zlib.crc32(key)
+
+
+class MappedTable(Mapping):
+    """Vista de solo lectura de un índice hash multivaluado del léxico compilado"""
+
+    def __init__(self, lexicon: 'MappedLexicon', name: str, decode: Callable[[Tuple[int, ...]], Any]):
+        self.lexicon = lexicon
+        self.name = name
+        self.decode = decode
+
+    def __getitem__(self, key: str) -> List:
+        values = self.lexicon._find(self.name, key)
+        if not values:
+            raise KeyError(key)
+        return [self.decode(value) for value in values]
+
+    def __iter__(self) -> Iterator[str]:
+        return self.lexicon._iter_index_keys(self.name)
+
+    def __len__(self) -> int:
+        return self.lexicon.metadata['indexes'][self.name]['keys']
+
+
+class MappedEntries(Mapping):
+    """Vista de solo lectura de las entradas: clave en español -> datos de la entrada"""
+
+    def __init__(self, lexicon: 'MappedLexicon'):
+        self.lexicon = lexicon
+
+    def __getitem__(self, spanish_word: str) -> Dict:
+        entry_id = self.lexicon._entry_id(spanish_word)
+        if entry_id is None:
+            raise KeyError(spanish_word)
+        return self.lexicon._entry_data(entry_id)
+
+    def __contains__(self, spanish_word) -> bool:
+        return isinstance(spanish_word, str) and self.lexicon._entry_id(spanish_word) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        for entry_id in range(len(self)):
+            yield self.lexicon._entry_key(entry_id)
+
+    def __len__(self) -> int:
+        return self.lexicon.metadata['entries']
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        for entry_id in range(len(self)):
+            yield self.lexicon._entry_key(entry_id), self.lexicon._entry_data(entry_id)
+
+
+class MappedLexicon:
+    """
+    Léxico de solo lectura sobre el archivo compilado por compile_lexicon.py.
+
+    El archivo se proyecta en memoria con mmap y cada búsqueda lee solo los
+    bytes que necesita, sin deserializar el diccionario completo; varios
+    procesos que abren el mismo archivo comparten las páginas de la caché del
+    sistema. Ofrece la misma interfaz de consulta que Lexicon, y además las
+    tablas derivadas del motor gramatical (formas del Nasa Yuwe, flexiones y
+    clases verbales) ya calculadas.
+
+    La primera modificación (with_changes) devuelve un Lexicon en memoria con
+    el contenido completo más los cambios.
+    """
+
+    normalize = staticmethod(Lexicon.normalize)
+    phrase_key = Lexicon.phrase_key
+    fuzzy_indexes = Lexicon.fuzzy_indexes
+    fuzzy_lookup = Lexicon.fuzzy_lookup
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mm) < HEADER.size:
+            self._mm.close()
+            raise ValueError(f"Léxico compilado truncado: {path}")
+        magic, version, metadata_offset, metadata_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Formato de léxico compilado no reconocido: {path}")
+        self.metadata = json.loads(self._mm[metadata_offset:metadata_offset + metadata_length])
+        self._sections = {name: offset for name, (offset, length) in self.metadata['sections'].items()}
+        self.source = self.metadata['source']
+        self.version = 0
+        self.journal_position = tuple(self.metadata.get('journal_position', (None, 0)))
+        self._phrase_matchers = None
+        self._fuzzy_indexes = None
+
+        self.entries = MappedEntries(self)
+        forms = self.metadata['forms']
+        features = self.metadata['features']
+        self.nasa_yuwe_forms = MappedTable(
+            self, 'forms', lambda value: (self._entry_key(value[0]), forms[value[1]]))
+        self.inflection_table = MappedTable(
+            self, 'inflections',
+            lambda value: ((value[1], value[2]), self._entry_key(value[0]), features[value[3]]))
+
+    def close(self):
+        self._mm.close()
+
+    def _u32(self, section: str, position: int) -> int:
+        return U32.unpack_from(self._mm, self._sections[section] + 4 * position)[0]
+
+    def _string_bytes(self, string_id: int) -> bytes:
+        base = self._sections['string_offsets'] + 4 * string_id
+        start, end = struct.unpack_from('<II', self._mm, base)
+        data = self._sections['string_data']
+        return self._mm[data + start:data + end]
+
+    def _string(self, string_id: int) -> str:
+        return self._string_bytes(string_id).decode('utf-8')
+
+    def _entry_key(self, entry_id: int) -> str:
+        return self._string(ENTRY.unpack_from(self._mm, self._sections['entries'] + ENTRY.size * entry_id)[0])
+
+    def _entry_translation(self, entry_id: int) -> str:
+        return self._string(ENTRY.unpack_from(self._mm, self._sections['entries'] + ENTRY.size * entry_id)[1])
+
+    def _entry_data(self, entry_id: int) -> Dict:
+        return json.loads(self._string_bytes(
+            ENTRY.unpack_from(self._mm, self._sections['entries'] + ENTRY.size * entry_id)[2]))
+
+    def _find(self, index: str, key: str) -> List[Tuple[int, ...]]:
+        """Valores de una clave (ya normalizada) en un índice hash; sondeo lineal"""
+        info = self.metadata['indexes'][index]
+        width = info['width']
+        mask = info['slots'] - 1
+        slots, postings = index + '_slots', index + '_postings'
+        encoded = key.encode('utf-8')
+
+        slot = index_hash(encoded) & mask
+        while True:
+            position = self._u32(slots, slot)
+            if not position:
+                return []
+            position -= 1
+            if self._string_bytes(self._u32(postings, position)) == encoded:
+                count = self._u32(postings, position + 1)
+                base = self._sections[postings] + 4 * (position + 2)
+                values = struct.unpack_from(f'<{count * width}I', self._mm, base)
+                return [values[i:i + width] for i in range(0, len(values), width)]
+            slot = (slot + 1) & mask
+
+    def _iter_index_keys(self, index: str) -> Iterator[str]:
+        info = self.metadata['indexes'][index]
+        postings = index + '_postings'
+        for slot in range(info['slots']):
+            position = self._u32(index + '_slots', slot)
+            if position:
+                yield self._string(self._u32(postings, position - 1))
+
+    def _entry_id(self, spanish_word: str) -> Optional[int]:
+        """Id de la entrada con esta clave exacta"""
+        for (entry_id,) in self._find('forward', self.normalize(spanish_word)):
+            if self._entry_key(entry_id) == spanish_word:
+                return entry_id
+        return None
+
+    def mark_modified(self):
+        self.version += 1
+
+    def with_changes(self, operations: Sequence[Dict],
+                     journal_position: Optional[Tuple[Optional[str], int]] = None) -> Lexicon:
+        """Léxico en memoria con el contenido completo y las operaciones aplicadas"""
+        lexicon = Lexicon(dict(self.entries.items()), journal_position or self.journal_position)
+        lexicon.version = self.version
+        lexicon._fuzzy_indexes = copy_fuzzy_indexes(self._fuzzy_indexes)
+        for operation in operations:
+            lexicon.apply(operation)
+        return lexicon
+
+    def verb_patterns(self) -> Dict[str, List[Tuple[str, str]]]:
+        """Patrones verbales precalculados (equivalentes a identify_verb_patterns)"""
+        names = self.metadata['verb_patterns']
+        patterns = {name: [] for name in names}
+        flags = self._sections['verb_flags']
+        data = self._mm[flags:flags + len(self.entries)]
+        for match in VERB_FLAG_PATTERN.finditer(data):
+            entry_id = match.start()
+            patterns[names[data[entry_id] - 1]].append(
+                (self._entry_key(entry_id), self._entry_translation(entry_id)))
+        return patterns
+
+    def _build_phrase_matchers(self) -> Tuple[PhraseMatcher, PhraseMatcher]:
+        """Compilar los autómatas de frases a partir de la lista de entradas de varias palabras"""
+        entry_ids = (self._u32('phrases', position) for position in range(self.metadata['phrases']))
+        return build_phrase_matchers(((self._entry_key(entry_id), self._entry_translation(entry_id))
+                                      for entry_id in entry_ids), self.phrase_key)
+
+    def match_phrases(self, words: Sequence[str], reverse: bool = False) -> List[Tuple[int, int, str]]:
+        """Buscar entradas de varias palabras (misma semántica que Lexicon.match_phrases)"""
+        matchers = self._phrase_matchers
+        if matchers is None:
+            matchers = self._phrase_matchers = self._build_phrase_matchers()
+        matcher = matchers[1] if reverse else matchers[0]
+        if not len(matcher):
+            return []
+        return matcher.longest_matches(words)
+
+    def _build_fuzzy_indexes(self) -> Tuple[FuzzyIndex, FuzzyIndex]:
+        """Índices aproximados en el orden de las entradas del archivo"""
+        return build_fuzzy_indexes(((self._entry_key(entry_id), self._entry_translation(entry_id))
+                                    for entry_id in range(self.metadata['entries'])), self.normalize)
+
+    def __len__(self) -> int:
+        return self.metadata['entries']
+
+    def __contains__(self, word: str) -> bool:
+        return bool(self._find('forward', self.normalize(word)))
+
+    def lookup(self, word: str) -> Optional[Tuple[str, Dict]]:
+        """Buscar una palabra en español; devuelve (clave, entrada) o None"""
+        values = self._find('forward', self.normalize(word))
+        if not values:
+            return None
+        entry_id = values[0][0]
+        return self._entry_key(entry_id), self._entry_data(entry_id)
+
+    def lookup_all(self, word: str) -> List[str]:
+        """Todas las claves en español que coinciden con una palabra (sin distinguir mayúsculas)"""
+        return [self._entry_key(entry_id) for (entry_id,) in self._find('forward', self.normalize(word))]
+
+    def translate(self, word: str) -> Optional[str]:
+        """Traducción al Nasa Yuwe de una palabra en español, o None"""
+        values = self._find('forward', self.normalize(word))
+        return self._entry_translation(values[0][0]) if values else None
+
+    def reverse_lookup(self, word: str) -> Optional[str]:
+        """Palabra en español correspondiente a una traducción en Nasa Yuwe, o None"""
+        values = self._find('reverse', self.normalize(word))
+        return self._entry_key(values[-1][0]) if values else None
+
+    def reverse_lookup_all(self, word: str) -> List[str]:
+        """Todas las palabras en español que comparten una traducción en Nasa Yuwe"""
+        return [self._entry_key(entry_id) for (entry_id,) in self._find('reverse', self.normalize(word))]
@@ -0,0 +1,202 @@
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+# Cubetas de latencia (segundos): de 0.1 ms a 10 s
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = []
+    for name, value in zip(labelnames, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f'{self.name}_total{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+
+
+class Histogram:
+    """Histograma de latencias con etiquetas (formato de Prometheus: cubetas acumuladas, suma y cuenta)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [conteos por cubeta (+Inf al final), suma, cuenta]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted((labels, [list(state[0]), state[1], state[2]]) for labels, state in self._values.items())
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}'
+
+
+class MetricsRegistry:
+    """Conjunto de métricas del proceso, exportadas en el formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+class _Stage:
+    __slots__ = ('timer', 'name', 'started')
+
+    def __init__(self, timer: 'StageTimer', name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.timer.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class StageTimer:
+    """
+    Tiempos de las etapas de una traducción (segundos acumulados por etapa).
+
+    Las subetapas usan nombres con punto ('grammar.contextual', 'nllb.generate');
+    una etapa que se repite (varias oraciones, varios intentos) suma sus tiempos.
+    """
+
+    __slots__ = ('timings', 'started')
+
+    def __init__(self):
+        self.timings = {}
+        self.started = time.perf_counter()
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def add(self, name: str, seconds: float):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def merge(self, other: 'StageTimer'):
+        for name, seconds in other.timings.items():
+            self.add(name, seconds)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, float]:
+        """Tiempos en milisegundos, más el total desde que se creó el temporizador"""
+        timings = {name: round(1000 * seconds, 3) for name, seconds in self.timings.items()}
+        timings['total'] = round(1000 * self.elapsed(), 3)
+        return timings
+
+
+def direction_label(source_lang: str, target_lang: str) -> str:
+    return f'{source_lang}_to_{target_lang}'
+
+
+REGISTRY = MetricsRegistry()
+
+TRANSLATION_SECONDS = REGISTRY.histogram(
+    'translation_seconds', 'Duración de AdvancedTranslationModel.translate por método y dirección',
+    ('method', 'direction'))
+TRANSLATIONS = REGISTRY.counter(
+    'translations', 'Traducciones completadas por método y dirección', ('method', 'direction'))
+STAGE_SECONDS = REGISTRY.histogram(
+    'translation_stage_seconds', 'Duración de cada etapa de traducción por dirección', ('stage', 'direction'))
+NLLB_BATCH_SECONDS = REGISTRY.histogram(
+    'nllb_batch_stage_seconds', 'Duración de cada fase de un lote de NLLB (tokenize, generate, decode)',
+    ('stage', 'profile'))
+DICTIONARY_WRITE_SECONDS = REGISTRY.histogram(
+    'dictionary_write_seconds', 'Latencia de las escrituras del diccionario por endpoint y fase',
+    ('endpoint', 'stage'))
+DICTIONARY_WRITES = REGISTRY.counter(
+    'dictionary_writes', 'Escrituras del diccionario por endpoint y resultado', ('endpoint', 'status'))
+
+
+def observe_translation(timer: StageTimer, method: str, direction: str, seconds: Optional[float] = None):
+    """Registrar una traducción terminada y los tiempos de sus etapas"""
+    TRANSLATION_SECONDS.observe(timer.elapsed() if seconds is None else seconds, (method, direction))
+    TRANSLATIONS.inc((method, direction))
+    for stage, stage_seconds in timer.timings.items():
+        STAGE_SECONDS.observe(stage_seconds, (stage, direction))
+
+
+def observe_dictionary_write(endpoint: str, status: str, timer: StageTimer):
+    """Registrar la latencia total y por fase de una escritura del diccionario"""
+    DICTIONARY_WRITES.inc((endpoint, status))
+    DICTIONARY_WRITE_SECONDS.observe(timer.elapsed(), (endpoint, 'total'))
+    for stage, seconds in timer.timings.items():
+        DICTIONARY_WRITE_SECONDS.observe(seconds, (endpoint, stage))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
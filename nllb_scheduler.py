@@ -0,0 +1,193 @@
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Señal para detener el hilo del planificador
+_STOP = object()
+
+
+class _InferenceRequest:
+    __slots__ = ('text', 'source_lang', 'target_lang', 'profile', 'future', 'enqueued_at', 'timings')
+
+    def __init__(self, text: str, source_lang: str, target_lang: str, profile: Optional[str]):
+        self.text = text
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.profile = profile
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        # Espera en cola y fases del lote que lo procesó (segundos)
+        self.timings = {}
+
+
+class InferenceScheduler:
+    """
+    Planificador de micro-lotes para la inferencia con NLLB.
+
+    Los hilos de las peticiones encolan sus textos y esperan el resultado. Un
+    único hilo de trabajo agrupa lo que llega hasta `max_batch_size` textos o
+    hasta `max_wait` segundos desde el primero, ejecuta un solo `generate` por
+    par de idiomas y perfil de inferencia y reparte los resultados a cada
+    llamador.
+
+    `run_batch(textos, origen, destino, perfil, temporizador)` anota en el
+    StageTimer del lote la duración de sus fases; cada petición recibe esos
+    tiempos junto con su espera en la cola.
+    """
+
+    def __init__(self, run_batch: Callable[[List[str], str, str, Optional[str], StageTimer], List[Optional[str]]],
+                 max_batch_size: int = 32, max_wait: float = 0.01):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # Métricas: cubetas del histograma de tamaños de lote (potencias de 2)
+        buckets = [size for size in (1, 2, 4, 8, 16, 32, 64, 128) if size < self.max_batch_size]
+        self.batch_size_buckets = buckets + [self.max_batch_size]
+        self._batch_size_counts = [0] * len(self.batch_size_buckets)
+        self.requests = 0
+        self.processed = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+
+    def _ensure_worker(self):
+        """Iniciar el hilo de trabajo la primera vez que se encola algo"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='nllb-scheduler', daemon=True)
+                self._thread.start()
+
+    def _enqueue(self, text: str, source_lang: str, target_lang: str, profile: Optional[str]) -> _InferenceRequest:
+        request = _InferenceRequest(text, source_lang, target_lang, profile)
+        self._ensure_worker()
+        self._queue.put(request)
+        with self._stats_lock:
+            self.requests += 1
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return request
+
+    def submit(self, text: str, source_lang: str, target_lang: str, profile: Optional[str] = None) -> Future:
+        """Encolar un texto; devuelve un Future con la traducción (o None)"""
+        return self._enqueue(text, source_lang, target_lang, profile).future
+
+    def translate(self, text: str, source_lang: str, target_lang: str,
+                  profile: Optional[str] = None) -> Optional[str]:
+        """Traducir un texto esperando a que su lote se procese"""
+        return self.submit(text, source_lang, target_lang, profile).result()
+
+    def translate_many(self, texts: List[str], source_lang: str, target_lang: str,
+                       profile: Optional[str] = None, timer: Optional[StageTimer] = None) -> List[Optional[str]]:
+        """
+        Encolar varios textos a la vez y esperar todos sus resultados.
+
+        Con `timer`, se le suman la espera en cola y las fases de NLLB (el
+        máximo entre los lotes que procesaron estos textos).
+        """
+        requests = [self._enqueue(text, source_lang, target_lang, profile) for text in texts]
+        results = [request.future.result() for request in requests]
+        if timer is not None:
+            stages = {}
+            for request in requests:
+                for stage, seconds in request.timings.items():
+                    stages[stage] = max(stages.get(stage, 0.0), seconds)
+            for stage, seconds in stages.items():
+                timer.add(stage, seconds)
+        return results
+
+    def stop(self):
+        """Detener el hilo de trabajo tras procesar lo ya encolado"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _collect_batch(self, first) -> List[_InferenceRequest]:
+        """Reunir peticiones hasta llenar el lote o agotar la espera máxima"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                # Reencolar la señal para salir después de este lote
+                self._queue.put(_STOP)
+                break
+            batch.append(request)
+        return batch
+
+    def _worker(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+
+            batch = self._collect_batch(first)
+
+            # Un generate por cada par de idiomas y perfil presente en el lote
+            groups = {}
+            for request in batch:
+                groups.setdefault((request.source_lang, request.target_lang, request.profile), []).append(request)
+
+            for (source_lang, target_lang, profile), requests in groups.items():
+                self._run_group(requests, source_lang, target_lang, profile)
+
+    def _run_group(self, requests: List[_InferenceRequest], source_lang: str, target_lang: str,
+                   profile: Optional[str]):
+        started = time.monotonic()
+        with self._stats_lock:
+            self.batches += 1
+            self.processed += len(requests)
+            self.total_wait += sum(started - request.enqueued_at for request in requests)
+            for index, size in enumerate(self.batch_size_buckets):
+                if len(requests) <= size:
+                    self._batch_size_counts[index] += 1
+                    break
+
+        timer = StageTimer()
+        try:
+            results = self.run_batch([request.text for request in requests], source_lang, target_lang, profile, timer)
+        except Exception as e:
+            logger.error(f"Error en lote de inferencia NLLB: {e}")
+            for request in requests:
+                request.future.set_exception(e)
+            return
+
+        for request, result in zip(requests, results):
+            request.timings = dict(timer.timings, **{'nllb.queue': started - request.enqueued_at})
+            request.future.set_result(result)
+
+    def stats(self) -> Dict:
+        """Profundidad de la cola e histograma de tamaños de lote"""
+        with self._stats_lock:
+            cumulative = 0
+            histogram = {}
+            for size, count in zip(self.batch_size_buckets, self._batch_size_counts):
+                cumulative += count
+                histogram[str(size)] = cumulative
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self.max_queue_depth,
+                'requests': self.requests,
+                'batches': self.batches,
+                'average_batch_size': round(self.processed / self.batches, 2) if self.batches else 0.0,
+                'average_queue_wait_ms': round(1000 * self.total_wait / self.processed, 3) if self.processed else 0.0,
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                # Histograma acumulado (lotes con tamaño <= cubeta)
+                'batch_size_histogram': histogram
+            }
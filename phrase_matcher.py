@@ -0,0 +1,90 @@
+from collections import deque
+from typing import Any, Hashable, Iterator, List, Sequence, Tuple
+
+
+class PhraseMatcher:
+    """
+    Autómata Aho-Corasick para buscar muchos patrones en una sola pasada.
+
+    Los patrones son secuencias de símbolos: cadenas (búsqueda por caracteres,
+    p. ej. marcadores temporales) o tuplas de palabras (búsqueda por tokens,
+    p. ej. entradas de varias palabras del diccionario). El costo de una
+    búsqueda es lineal en la longitud del texto más el número de coincidencias,
+    sin importar cuántos patrones contenga el autómata.
+    """
+
+    def __init__(self):
+        self._goto = [{}]      # transiciones de cada estado
+        self._fail = [0]       # enlaces de fallo
+        self._terminal = [[]]  # (longitud, valor) de los patrones que terminan en cada estado
+        self._output = [[]]    # salidas de cada estado, incluidas las heredadas por fallo
+        self._patterns = 0
+        self._built = True
+
+    def __len__(self) -> int:
+        return self._patterns
+
+    def add(self, pattern: Sequence[Hashable], value: Any):
+        """Agregar un patrón al autómata (requiere volver a compilar con build)"""
+        if not pattern:
+            return
+        state = 0
+        for symbol in pattern:
+            next_state = self._goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append([])
+                self._goto[state][symbol] = next_state
+            state = next_state
+        self._terminal[state].append((len(pattern), value))
+        self._patterns += 1
+        self._built = False
+
+    def build(self) -> 'PhraseMatcher':
+        """Calcular los enlaces de fallo en anchura (BFS)"""
+        self._output = [list(terminal) for terminal in self._terminal]
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(symbol, 0)
+                # Heredar las salidas del estado de fallo (ya está completo por el orden BFS)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+        self._built = True
+        return self
+
+    def iter_matches(self, sequence: Sequence[Hashable]) -> Iterator[Tuple[int, int, Any]]:
+        """Recorrer todas las coincidencias (incluso solapadas): (inicio, fin, valor)"""
+        if not self._built:
+            self.build()
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, symbol in enumerate(sequence):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            for length, value in output[state]:
+                yield position - length + 1, position + 1, value
+
+    def longest_matches(self, sequence: Sequence[Hashable]) -> List[Tuple[int, int, Any]]:
+        """Coincidencias más largas y sin solapamiento, de izquierda a derecha"""
+        matches = sorted(self.iter_matches(sequence), key=lambda match: (match[0], match[0] - match[1]))
+        selected = []
+        last_end = 0
+        for start, end, value in matches:
+            if start >= last_end:
+                selected.append((start, end, value))
+                last_end = end
+        return selected
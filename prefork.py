@@ -0,0 +1,80 @@
+import os
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Campos de /proc/self/smaps_rollup (kB) que se informan por proceso
+SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb',
+    'Swap': 'swap_mb'
+}
+
+# Hilos de PyTorch configurados en este proceso (None mientras no se configuren)
+_torch_threads = {'num_threads': None, 'interop_threads': None}
+
+
+def _read_kb_fields(path: str, fields: Dict[str, str]) -> Dict[str, float]:
+    values = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in fields:
+                    values[fields[name]] = round(int(rest.split()[0]) / 1024, 2)
+    except (OSError, ValueError, IndexError):
+        pass
+    return values
+
+
+def process_memory() -> Dict[str, Optional[float]]:
+    """
+    Memoria del proceso actual en MB.
+
+    RSS cuenta todas las páginas residentes, también las compartidas con el
+    maestro y los demás workers; PSS reparte cada página compartida entre los
+    procesos que la usan, así que la suma de los PSS de todos los workers es
+    la memoria real del despliegue. Fuera de Linux los campos quedan en None.
+    """
+    memory = {name: None for name in SMAPS_FIELDS.values()}
+    memory.update(_read_kb_fields('/proc/self/status', {'VmRSS': 'rss_mb', 'VmHWM': 'peak_rss_mb'}))
+    # smaps_rollup (Linux >= 4.14) incluye PSS y el desglose de páginas compartidas y privadas
+    memory.update(_read_kb_fields('/proc/self/smaps_rollup', SMAPS_FIELDS))
+    return memory
+
+
+def default_torch_threads(workers: int) -> int:
+    """Hilos de PyTorch por worker para no sobresuscribir los núcleos"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def set_torch_threads(num_threads: int, interop_threads: Optional[int] = None):
+    """Fijar los hilos intra-op (e inter-op) de PyTorch en este proceso; sin torch no hace nada"""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+    _torch_threads['num_threads'] = num_threads
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+            _torch_threads['interop_threads'] = interop_threads
+        except RuntimeError as e:
+            # Solo puede fijarse antes del primer trabajo inter-op del proceso
+            logger.warning(f"No se pudieron fijar los hilos inter-op de PyTorch: {e}")
+
+
+def worker_info() -> Dict:
+    """Proceso, hilos de PyTorch y memoria de este worker para /api/model-info"""
+    return {
+        'pid': os.getpid(),
+        'parent_pid': os.getppid(),
+        'torch_threads': dict(_torch_threads),
+        'memory': process_memory()
+    }
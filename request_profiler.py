@@ -0,0 +1,175 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Perfiladores disponibles: determinista (cProfile, volcado pstats) o por muestreo (pilas colapsadas)
+PROFILING_MODES = {'cprofile': '.pstats', 'sampling': '.collapsed'}
+PROFILE_ID_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-f]{12}$')
+
+# Hilos que también se muestrean además del de la petición (NLLB genera en su propio hilo)
+SAMPLED_THREAD_NAMES = ('nllb-scheduler',)
+
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo: cada `interval` segundos lee la pila de los hilos
+    observados con sys._current_frames() y cuenta cada pila en formato
+    colapsado ('hilo;módulo:función;...'), el que usan flamegraph.pl y speedscope.
+    """
+
+    def __init__(self, thread_ids: List[int], thread_names: Tuple[str, ...] = (), interval: float = 0.001):
+        self.thread_ids = set(thread_ids)
+        self.thread_names = thread_names
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            # Los hilos con nombre observado pueden arrancar durante la petición
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id not in self.thread_ids and names.get(thread_id) not in self.thread_names:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+class RequestProfiler:
+    """
+    Perfilado bajo demanda de peticiones individuales.
+
+    Cada perfil se guarda en `directory` como '<id>.pstats' (cProfile) o
+    '<id>.collapsed' (muestreo), junto con '<id>.json' con sus metadatos. Se
+    perfila una petición a la vez; si ya hay otra en curso, la nueva se
+    atiende sin perfilar. Se conservan los `max_profiles` más recientes.
+    """
+
+    def __init__(self, directory: str = 'profiles', mode: str = 'cprofile', interval: float = 0.001,
+                 max_profiles: int = 100):
+        if mode not in PROFILING_MODES:
+            raise ValueError(f"Modo de perfilado desconocido: {mode}")
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def new_profile_id() -> str:
+        return time.strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:12]
+
+    def profile(self, function: Callable, metadata: Optional[Dict] = None) -> Tuple[object, Optional[str]]:
+        """Ejecutar `function()` bajo el perfilador; devuelve (resultado, id del perfil o None)"""
+        if not self._lock.acquire(blocking=False):
+            logger.warning("Perfilado omitido: ya hay otra petición perfilándose")
+            return function(), None
+
+        try:
+            profile_id = self.new_profile_id()
+            path = os.path.join(self.directory, profile_id + PROFILING_MODES[self.mode])
+            started = time.perf_counter()
+            if self.mode == 'cprofile':
+                profiler = cProfile.Profile()
+                try:
+                    result = profiler.runcall(function)
+                finally:
+                    elapsed = time.perf_counter() - started
+                    profiler.dump_stats(path)
+            else:
+                profiler = SamplingProfiler([threading.get_ident()], SAMPLED_THREAD_NAMES, self.interval)
+                profiler.start()
+                try:
+                    result = function()
+                finally:
+                    profiler.stop()
+                    elapsed = time.perf_counter() - started
+                    profiler.dump(path)
+
+            self._write_metadata(profile_id, dict(metadata or {}, mode=self.mode, duration_ms=round(1000 * elapsed, 3),
+                                                  file=os.path.basename(path)))
+            self._prune()
+            return result, profile_id
+        finally:
+            self._lock.release()
+
+    def _write_metadata(self, profile_id: str, metadata: Dict):
+        metadata['id'] = profile_id
+        metadata['created'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        # El id solo tiene resolución de segundos; created_ns ordena los perfiles del mismo segundo
+        metadata['created_ns'] = time.time_ns()
+        with open(os.path.join(self.directory, profile_id + '.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False)
+
+    def list_profiles(self) -> List[Dict]:
+        """Metadatos de los perfiles guardados, del más reciente al más antiguo"""
+        profiles = []
+        for name in os.listdir(self.directory):
+            profile_id, extension = os.path.splitext(name)
+            if extension != '.json' or not PROFILE_ID_PATTERN.match(profile_id):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda metadata: (metadata['id'][:15], metadata.get('created_ns', 0)),
+                      reverse=True)
+
+    def profile_file(self, profile_id: str) -> Optional[str]:
+        """Nombre del archivo del perfil dentro del directorio, o None si no existe"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        for extension in PROFILING_MODES.values():
+            if os.path.exists(os.path.join(self.directory, profile_id + extension)):
+                return profile_id + extension
+        return None
+
+    def summary(self, profile_id: str, limit: int = 25) -> Optional[str]:
+        """Resumen de texto de un perfil pstats (funciones ordenadas por tiempo acumulado)"""
+        name = self.profile_file(profile_id)
+        if name is None or not name.endswith('.pstats'):
+            return None
+        output = io.StringIO()
+        pstats.Stats(os.path.join(self.directory, name), stream=output).sort_stats('cumulative').print_stats(limit)
+        return output.getvalue()
+
+    def _prune(self):
+        """Borrar los perfiles más antiguos por encima de max_profiles"""
+        for metadata in self.list_profiles()[self.max_profiles:]:
+            for extension in ('.json',) + tuple(PROFILING_MODES.values()):
+                path = os.path.join(self.directory, metadata['id'] + extension)
+                if os.path.exists(path):
+                    os.remove(path)
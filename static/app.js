@@ -268,6 +268,13 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Inicializar toggle de tema
     initializeThemeToggle();
+    
+    // Traducción en vivo mientras se escribe
+    initializeLiveTranslation();
+    
+    // Léxico local para resolver palabras del diccionario sin llamar al servidor
+    syncLocalLexicon();
+    setInterval(syncLocalLexicon, LEXICON_REFRESH_MS);
 });
 
 // Funcionalidad del toggle de tema
@@ -309,6 +316,182 @@ function applyTheme(theme) {
     }
 }
 
+// Léxico local: instantánea de /api/lexicon guardada con la Cache API y actualizada por deltas
+const LEXICON_CACHE = 'nasa-yuwe-lexicon';
+const LEXICON_CACHE_KEY = '/api/lexicon/local-state';
+const LEXICON_REFRESH_MS = 5 * 60 * 1000;
+
+let lexiconState = null;   // {version, etag, entries: [[español, nasa yuwe], ...]}
+let localLexicon = null;   // índices construidos a partir de lexiconState
+let lexiconSync = null;    // sincronización en curso
+
+// Mismas clases de caracteres que tokenizer.split_punctuation (\w de Python)
+const NON_WORD_PATTERN = /[^\p{L}\p{N}_\s]/gu;
+const LEADING_PUNCTUATION_PATTERN = /^[^\p{L}\p{N}_\s]+/u;
+const TRAILING_PUNCTUATION_PATTERN = /[^\p{L}\p{N}_\s]+$/u;
+
+function normalizeWord(word) {
+    return word.trim().toLowerCase();
+}
+
+function splitPunctuation(word) {
+    const clean = word.replace(NON_WORD_PATTERN, '');
+    if (!clean) {
+        return [word, '', ''];
+    }
+    const leading = word.match(LEADING_PUNCTUATION_PATTERN);
+    const trailing = word.match(TRAILING_PUNCTUATION_PATTERN);
+    return [leading ? leading[0] : '', clean, trailing ? trailing[0] : ''];
+}
+
+function phraseKey(text) {
+    return text.split(/\s+/).filter(Boolean).map(word => normalizeWord(splitPunctuation(word)[1])).join(' ');
+}
+
+// Índices como los del servidor: en español gana la primera entrada y en Nasa Yuwe la última
+function buildLocalLexicon(entries) {
+    const lexicon = {
+        forward: new Map(),
+        reverse: new Map(),
+        forwardPhrases: new Map(),
+        reversePhrases: new Map()
+    };
+    const addFirst = (index, key, value) => {
+        if (!index.has(key)) {
+            index.set(key, value);
+        }
+    };
+    for (const [spanishWord, translation] of entries) {
+        addFirst(lexicon.forward, normalizeWord(spanishWord), translation);
+        lexicon.reverse.set(normalizeWord(translation), spanishWord);
+        const spanishPhrase = phraseKey(spanishWord);
+        const translationPhrase = phraseKey(translation);
+        if (spanishPhrase.includes(' ')) {
+            addFirst(lexicon.forwardPhrases, spanishPhrase, translation);
+        }
+        if (translationPhrase.includes(' ')) {
+            lexicon.reversePhrases.set(translationPhrase, spanishWord);
+        }
+    }
+    return lexicon;
+}
+
+// Traducción de una palabra o frase completa del diccionario, o null si hace falta el servidor
+function resolveLocally(text, sourceLanguage, targetLanguage) {
+    if (!localLexicon) {
+        return null;
+    }
+    let reverse;
+    if (sourceLanguage === 'spanish' && targetLanguage === 'nasa_yuwe') {
+        reverse = false;
+    } else if (sourceLanguage === 'nasa_yuwe' && targetLanguage === 'spanish') {
+        reverse = true;
+    } else {
+        return null;
+    }
+
+    const words = text.trim().split(/\s+/);
+    if (words.length > 1) {
+        const phrases = reverse ? localLexicon.reversePhrases : localLexicon.forwardPhrases;
+        const translation = phrases.get(phraseKey(text));
+        if (translation === undefined) {
+            return null;
+        }
+        return splitPunctuation(words[0])[0] + translation + splitPunctuation(words[words.length - 1])[2];
+    }
+
+    // Igual que el servidor: la palabra completa y luego su forma sin puntuación
+    const index = reverse ? localLexicon.reverse : localLexicon.forward;
+    const translation = index.get(normalizeWord(words[0]));
+    if (translation !== undefined) {
+        return translation;
+    }
+    const [leading, clean, trailing] = splitPunctuation(words[0]);
+    const cleanTranslation = clean ? index.get(normalizeWord(clean)) : undefined;
+    return cleanTranslation === undefined ? null : leading + cleanTranslation + trailing;
+}
+
+// Ponerse al día: delta desde la versión guardada o, si no se conserva, la instantánea completa
+async function fetchLexiconState(state) {
+    if (state) {
+        const response = await fetch(`/api/lexicon/delta?since=${encodeURIComponent(state.version)}`);
+        const delta = await response.json();
+        if (delta.error) {
+            throw new Error(delta.error);
+        }
+        if (!delta.full) {
+            if (delta.set.length || delta.delete.length) {
+                const entries = new Map(state.entries);
+                delta.delete.forEach(key => entries.delete(key));
+                delta.set.forEach(([key, translation]) => {
+                    // Una clave modificada pasa al final, igual que en el servidor
+                    entries.delete(key);
+                    entries.set(key, translation);
+                });
+                return { version: delta.version, etag: null, entries: Array.from(entries) };
+            }
+            return { version: delta.version, etag: state.etag, entries: state.entries };
+        }
+    }
+
+    const headers = state && state.etag ? { 'If-None-Match': state.etag } : {};
+    const response = await fetch('/api/lexicon', { headers: headers });
+    if (response.status === 304) {
+        // Mismo contenido, publicado por otro proceso con otra versión
+        return { version: response.headers.get('X-Lexicon-Version'), etag: state.etag, entries: state.entries };
+    }
+    if (!response.ok) {
+        throw new Error(`Error al descargar el léxico (${response.status})`);
+    }
+    const snapshot = await response.json();
+    return { version: snapshot.version, etag: response.headers.get('ETag'), entries: snapshot.entries };
+}
+
+async function syncLocalLexicon() {
+    if (lexiconSync) {
+        return lexiconSync;
+    }
+    lexiconSync = (async () => {
+        try {
+            const cache = 'caches' in window ? await caches.open(LEXICON_CACHE) : null;
+            if (!lexiconState && cache) {
+                const cached = await cache.match(LEXICON_CACHE_KEY);
+                if (cached) {
+                    lexiconState = await cached.json();
+                    localLexicon = buildLocalLexicon(lexiconState.entries);
+                }
+            }
+
+            const state = await fetchLexiconState(lexiconState);
+            const changed = !lexiconState || state.entries !== lexiconState.entries;
+            if (!lexiconState || state.version !== lexiconState.version || changed) {
+                lexiconState = state;
+                if (changed) {
+                    localLexicon = buildLocalLexicon(state.entries);
+                }
+                if (cache) {
+                    await cache.put(LEXICON_CACHE_KEY, new Response(JSON.stringify(state), {
+                        headers: { 'Content-Type': 'application/json' }
+                    }));
+                }
+            }
+        } catch (error) {
+            // Sin léxico local todo se traduce en el servidor
+            console.error('Error al sincronizar el léxico local:', error);
+        } finally {
+            lexiconSync = null;
+        }
+    })();
+    return lexiconSync;
+}
+
+function showTranslation(text, translation, sourceLanguage, targetLanguage) {
+    document.getElementById('originalText').textContent = text;
+    document.getElementById('translatedText').textContent = translation;
+    document.getElementById('originalStatus').textContent = `(${sourceLanguage})`;
+    document.getElementById('translationStatus').textContent = `(${targetLanguage})`;
+}
+
 // Funciones principales de traducción
 document.getElementById('translateText').addEventListener('click', async () => {
     try {
@@ -326,9 +509,24 @@ document.getElementById('translateText').addEventListener('click', async () => {
             return;
         }
 
+        // Palabras y frases del diccionario: se resuelven en el navegador
+        const localTranslation = resolveLocally(text, sourceLanguage, targetLanguage);
+        if (localTranslation !== null) {
+            clearError();
+            showTranslation(text, localTranslation, sourceLanguage, targetLanguage);
+            return;
+        }
+
         showProgress();
         clearError();
 
+        // Los textos largos se traducen por oraciones y se muestran a medida que llegan
+        if (text.length >= STREAMING_MIN_LENGTH) {
+            await translateTextStreaming(text, sourceLanguage, targetLanguage);
+            hideProgress();
+            return;
+        }
+
         const response = await fetch('/api/translate-text', {
             method: 'POST',
             headers: {
@@ -360,6 +558,196 @@ document.getElementById('translateText').addEventListener('click', async () => {
     }
 });
 
+// Longitud a partir de la cual se usa la traducción progresiva por oraciones
+const STREAMING_MIN_LENGTH = 280;
+
+// Traducción progresiva: lee la respuesta JSON por líneas de /api/translate-stream
+async function translateTextStreaming(text, sourceLanguage, targetLanguage) {
+    const response = await fetch('/api/translate-stream', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            text: text,
+            source_lang: sourceLanguage,
+            target_lang: targetLanguage
+        })
+    });
+
+    // Los errores de validación llegan como JSON normal
+    if (!(response.headers.get('Content-Type') || '').includes('application/x-ndjson')) {
+        const data = await response.json();
+        if (data.error) {
+            showError(data.error);
+        }
+        return;
+    }
+
+    const translatedElement = document.getElementById('translatedText');
+    document.getElementById('originalText').textContent = text;
+    document.getElementById('originalStatus').textContent = `(${sourceLanguage})`;
+    document.getElementById('translationStatus').textContent = `(${targetLanguage})`;
+    translatedElement.textContent = '';
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    const renderLine = (line) => {
+        if (!line.trim()) {
+            return;
+        }
+        const data = JSON.parse(line);
+        if (data.done) {
+            return;
+        }
+        // Una oración que falla conserva el texto original y no detiene el resto
+        const sentence = data.error ? data.source : data.translation;
+        translatedElement.textContent += sentence + data.separator;
+        if (data.error) {
+            console.error('Error en oración', data.index, data.error);
+        }
+    };
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(renderLine);
+    }
+    renderLine(buffer + decoder.decode());
+}
+
+// Traducción en vivo: espera una pausa en la escritura antes de pedir la traducción
+const LIVE_DEBOUNCE_MS = 250;
+// Si el texto solo puede traducirlo NLLB, la traducción completa se pide tras una pausa más larga
+const LIVE_FULL_DELAY_MS = 1500;
+
+let liveDebounceTimer = null;
+let liveFullTimer = null;
+let liveController = null;
+let liveSequence = 0;   // número de la última petición enviada
+let liveRendered = 0;   // número de la última respuesta mostrada
+
+function initializeLiveTranslation() {
+    const liveToggle = document.getElementById('liveTranslation');
+    liveToggle.checked = localStorage.getItem('liveTranslation') === 'on';
+
+    liveToggle.addEventListener('change', function() {
+        localStorage.setItem('liveTranslation', liveToggle.checked ? 'on' : 'off');
+        if (liveToggle.checked) {
+            scheduleLiveTranslation();
+        } else {
+            cancelLiveTranslation();
+        }
+    });
+
+    document.getElementById('inputText').addEventListener('input', scheduleLiveTranslation);
+    document.getElementById('sourceLanguage').addEventListener('change', scheduleLiveTranslation);
+    document.getElementById('targetLanguage').addEventListener('change', scheduleLiveTranslation);
+}
+
+function scheduleLiveTranslation() {
+    if (!document.getElementById('liveTranslation').checked) {
+        return;
+    }
+    clearTimeout(liveDebounceTimer);
+    clearTimeout(liveFullTimer);
+    liveDebounceTimer = setTimeout(() => translateLive(false), LIVE_DEBOUNCE_MS);
+}
+
+function cancelLiveTranslation() {
+    clearTimeout(liveDebounceTimer);
+    clearTimeout(liveFullTimer);
+    if (liveController) {
+        liveController.abort();
+        liveController = null;
+    }
+}
+
+// `full`: traducción completa (con NLLB) en lugar del camino rápido del diccionario
+async function translateLive(full) {
+    const text = document.getElementById('inputText').value.trim();
+    const sourceLanguage = document.getElementById('sourceLanguage').value;
+    const targetLanguage = document.getElementById('targetLanguage').value;
+
+    // La petición anterior ya no sirve: se cancela en lugar de esperar su respuesta
+    if (liveController) {
+        liveController.abort();
+    }
+
+    if (!text || sourceLanguage === targetLanguage) {
+        liveController = null;
+        return;
+    }
+
+    const localTranslation = resolveLocally(text, sourceLanguage, targetLanguage);
+    if (localTranslation !== null) {
+        // Las respuestas de peticiones anteriores que aún lleguen se descartan
+        liveController = null;
+        liveRendered = ++liveSequence;
+        clearError();
+        showTranslation(text, localTranslation, sourceLanguage, targetLanguage);
+        return;
+    }
+
+    const controller = new AbortController();
+    liveController = controller;
+    const sequence = ++liveSequence;
+
+    try {
+        const response = await fetch('/api/translate-text', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                text: text,
+                source_lang: sourceLanguage,
+                target_lang: targetLanguage,
+                live: !full
+            }),
+            signal: controller.signal
+        });
+
+        const data = await response.json();
+
+        // Descartar respuestas que llegan después de otra más reciente
+        if (sequence < liveRendered) {
+            return;
+        }
+        liveRendered = sequence;
+
+        if (data.error) {
+            showError(data.error);
+            return;
+        }
+        clearError();
+
+        document.getElementById('originalText').textContent = text;
+        document.getElementById('translatedText').textContent = data.translation;
+        document.getElementById('originalStatus').textContent = `(${sourceLanguage})`;
+        document.getElementById('translationStatus').textContent = `(${targetLanguage})`;
+
+        if (!full && data.complete === false) {
+            liveFullTimer = setTimeout(() => translateLive(true), LIVE_FULL_DELAY_MS - LIVE_DEBOUNCE_MS);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error en traducción en vivo:', error);
+        }
+    } finally {
+        if (liveController === controller) {
+            liveController = null;
+        }
+    }
+}
+
 // Función para traducir automáticamente
 async function translateTextAutomatically() {
     try {
@@ -376,6 +764,13 @@ async function translateTextAutomatically() {
             return;
         }
 
+        const localTranslation = resolveLocally(text, sourceLanguage, targetLanguage);
+        if (localTranslation !== null) {
+            clearError();
+            showTranslation(text, localTranslation, sourceLanguage, targetLanguage);
+            return;
+        }
+
         showProgress();
         clearError();
 
@@ -468,6 +863,7 @@ async function addNewWord() {
             document.getElementById('wordContext').value = '';
             
             showAddWordStatus('¡Palabra agregada exitosamente al diccionario!', 'success');
+            syncLocalLexicon();
         } else {
             showAddWordStatus(result.error || 'Error al agregar la palabra', 'error');
         }
@@ -529,6 +925,9 @@ async function submitFeedback() {
             // Limpiar el campo de retroalimentación
             document.getElementById('correctedTranslation').value = '';
             
+            // La corrección puede haber cambiado el diccionario
+            syncLocalLexicon();
+            
             // Mostrar mensaje de éxito
             const successMessage = document.createElement('div');
             successMessage.className = 'success-message';
@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+
+import pytest
+
+# Los módulos viven en la raíz del repositorio; NLLB no se carga en las pruebas
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('NLLB_LOADING', 'none')
+
+import lexicon as lexicon_module
+import translation_memory as memory_module
+
+SAMPLE_DICTIONARY = {
+    'casa': {'traduccion': 'yat', 'explanation': 'Vivienda'},
+    'grande': {'traduccion': 'wala', 'explanation': 'De gran tamaño'},
+    'comer': {'traduccion': 'ũus-', 'explanation': 'Verbo comer'},
+    'agua': {'traduccion': 'yu\'', 'explanation': 'Líquido'},
+    'buenos días': {'traduccion': 'ewme kiwe', 'explanation': 'Saludo'},
+}
+
+
+def write_dictionary(directory, entries=None):
+    """Escribir un diccionario JSON de prueba en `directory` y devolver su ruta"""
+    path = os.path.join(str(directory), 'nasa_yuwe_dictionary.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(SAMPLE_DICTIONARY if entries is None else entries, f, ensure_ascii=False)
+    return path
+
+
+@pytest.fixture(autouse=True)
+def fresh_registries():
+    """Cada prueba parte sin léxicos, diarios ni memorias de traducción cargados"""
+    lexicon_module._lexicons.clear()
+    lexicon_module._journals.clear()
+    memory_module._memories.clear()
+    yield
+    lexicon_module._lexicons.clear()
+    lexicon_module._journals.clear()
+    memory_module._memories.clear()
+
+
+@pytest.fixture
+def dictionary_path(tmp_path):
+    return write_dictionary(tmp_path)
+
+
+@pytest.fixture
+def model(dictionary_path):
+    from translation_model import AdvancedTranslationModel
+    return AdvancedTranslationModel(dictionary_path, nllb_loading=None)
+
+
+@pytest.fixture
+def fake_nllb(monkeypatch):
+    """
+    Poner en un modelo un NLLB de prueba que traduce 'texto' como 'nllb texto'.
+    Devuelve una función que lo instala en el modelo dado y devuelve la lista
+    de lotes (textos, perfil) que recibe.
+    """
+    def install(model):
+        batches = []
+        monkeypatch.setattr(model, 'model_loaded', True)
+        monkeypatch.setattr(model, '_translate_with_nllb_batch',
+                            lambda texts, source_lang, target_lang, profile=None, timer=None:
+                            batches.append((tuple(texts), profile)) or [f'nllb {text}' for text in texts])
+        return batches
+    return install
+
+
+@pytest.fixture
+def nllb_calls(model, fake_nllb):
+    """Lotes (textos, perfil) que recibe el NLLB de prueba del fixture `model`"""
+    return fake_nllb(model)
+
+
+@pytest.fixture
+def app_client(tmp_path, monkeypatch):
+    """Cliente de prueba de Flask con el diccionario de ejemplo en data/ de un directorio temporal"""
+    import app as app_module
+    from lexicon_snapshot import LexiconSnapshots
+
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    write_dictionary(data_dir)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'translation_model', None)
+    monkeypatch.setattr(app_module, 'conjugation_engine', None)
+    monkeypatch.setattr(app_module, 'lexicon_snapshots', LexiconSnapshots())
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
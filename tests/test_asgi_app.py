@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi_app
+import app as server
+from translation_model import PendingTranslation
+
+
+async def call(application, method, path, payload=None, query=b''):
+    """Enviar una petición HTTP a la aplicación ASGI y devolver (estado, cabeceras, cuerpo)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    received = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    messages = []
+
+    async def receive():
+        return received.pop(0) if received else {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(b'content-type', b'application/json')]}
+    await application(scope, receive, send)
+    start = messages[0]
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in messages[1:])
+
+
+@pytest.fixture
+def application(app_client):
+    server_app = asgi_app.AsyncTranslationServer(fast_workers=2, model_concurrency=1, model_queue=0,
+                                                 wsgi_workers=2, wsgi_queue=2)
+    yield server_app
+    for executor in (server_app.fast_executor, server_app.model_executor, server_app.wsgi_executor):
+        executor.shutdown(wait=True)
+
+
+def test_translate_text_fast_path(application):
+    status, _, body = asyncio.run(call(application, 'POST', '/api/translate-text',
+                                       {'text': 'casa grande', 'timings': True}))
+    response = json.loads(body)
+    assert status == 200
+    assert response['translation'] == 'yat wala'
+    assert 'dictionary' in response['timings']
+
+
+def test_model_path_continues_from_rules_without_repeating_them(application, fake_nllb, monkeypatch):
+    model = server.get_translation_model()
+    fake_nllb(model)
+    calls = []
+    translate_with_rules = model._translate_with_rules
+    monkeypatch.setattr(model, '_translate_with_rules',
+                        lambda *args: calls.append(args[0]) or translate_with_rules(*args))
+
+    pending = model.translate('zzz qqq', allow_nllb=False)
+    assert isinstance(pending, PendingTranslation)
+    assert model.finish_translation(pending)['translation'] == 'nllb zzz qqq'
+    assert calls == ['zzz qqq']
+
+    status, _, body = asyncio.run(call(application, 'POST', '/api/translate-text', {'text': 'www eee'}))
+    assert status == 200
+    assert json.loads(body)['method'] == 'nllb'
+    assert calls == ['zzz qqq', 'www eee']
+    # La segunda vez sale de la caché
+    asyncio.run(call(application, 'POST', '/api/translate-text', {'text': 'www eee'}))
+    assert calls == ['zzz qqq', 'www eee']
+
+
+def test_live_mode_never_waits_for_the_model(application, fake_nllb):
+    nllb_batches = fake_nllb(server.get_translation_model())
+    status, _, body = asyncio.run(call(application, 'POST', '/api/translate-text', {'text': 'zzz', 'live': True}))
+    response = json.loads(body)
+    assert response['complete'] is False
+    assert response['translation'] == 'zzz'
+    assert nllb_batches == []
+
+
+def test_wsgi_bridge_streams_through_a_bounded_queue(application):
+    text = '. '.join(['Casa grande'] * 20) + '.'
+    status, headers, body = asyncio.run(call(application, 'POST', '/api/translate-stream', {'text': text}))
+    assert status == 200
+    lines = [line for line in body.decode('utf-8').splitlines() if line.strip()]
+    assert len(lines) >= 20
+
+    status, _, body = asyncio.run(call(application, 'GET', '/api/model-info'))
+    assert status == 200
+    assert json.loads(body)['model_info']['dictionary_entries'] == 5
+
+
+def test_wsgi_bridge_stops_the_view_when_the_client_goes_away(application):
+    produced = []
+
+    def endless_app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        for number in range(1000):
+            produced.append(number)
+            yield b'x'
+
+    application.wsgi_app = endless_app
+
+    async def run():
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+            if len(sent) > 3:
+                raise ConnectionResetError()
+
+        with pytest.raises(ConnectionResetError):
+            await application({'type': 'http', 'method': 'GET', 'path': '/x', 'headers': []}, receive, send)
+
+    asyncio.run(asyncio.wait_for(run(), 5))
+    assert len(produced) < 1000
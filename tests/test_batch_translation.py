@@ -0,0 +1,59 @@
+import app as app_module
+
+
+def test_batch_matches_single_translations(model):
+    items = [{'text': text, 'source_lang': source_lang, 'target_lang': target_lang}
+             for text, source_lang, target_lang in [('casa grande', 'spanish', 'nasa_yuwe'),
+                                                    ('yat', 'nasa_yuwe', 'spanish'),
+                                                    ('buenos días', 'spanish', 'nasa_yuwe')]]
+    batch = model.translate_batch(items)
+    model.cache.clear()
+    assert [result['translation'] for result in batch] == [
+        model.translate(item['text'], item['source_lang'], item['target_lang'])['translation'] for item in items]
+
+
+def test_duplicates_are_translated_once_and_copied(model, monkeypatch):
+    calls = []
+    translate_with_rules = model._translate_with_rules
+    monkeypatch.setattr(model, '_translate_with_rules',
+                        lambda text, *args: calls.append(text) or translate_with_rules(text, *args))
+    results = model.translate_batch([{'text': 'casa'}, {'text': ' casa '}, {'text': ''}, {'text': 'casa'}])
+    assert calls == ['casa']
+    assert [result['translation'] for result in results] == ['yat', 'yat', '', 'yat']
+    assert results[2]['method'] == 'empty'
+    results[0]['translation'] = 'modificado'
+    assert results[1]['translation'] == 'yat'
+    # La segunda vez sale de la caché
+    assert model.translate_batch([{'text': 'casa'}])[0]['translation'] == 'yat'
+    assert calls == ['casa']
+
+
+def test_texts_needing_nllb_share_one_batch_per_direction_and_profile(model, nllb_calls):
+    results = model.translate_batch([{'text': 'xqz uno'}, {'text': 'casa'}, {'text': 'xqz dos'},
+                                     {'text': 'xqz tres', 'profile': 'fast'}])
+    assert nllb_calls == [(('xqz uno', 'xqz dos'), 'quality'), (('xqz tres',), 'fast')]
+    assert [result['method'] for result in results] == ['nllb', 'dictionary', 'nllb', 'nllb']
+    assert results[2]['translation'] == 'nllb xqz dos'
+
+
+def test_batch_endpoint_keeps_order_and_reports_errors_per_item(app_client):
+    response = app_client.post('/api/translate-batch', json={
+        'items': ['casa', {'text': 'yat', 'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'},
+                  {'text': ''}, {'text': 'agua', 'target_lang': 'klingon'}]})
+    payload = response.get_json()
+    assert payload['status'] == 'success'
+    results = payload['results']
+    assert [result.get('translation') for result in results[:2]] == ['yat', 'casa']
+    assert 'error' in results[2] and 'error' in results[3]
+
+    payload = app_client.post('/api/translate-batch', json={
+        'texts': ['casa', 'grande'], 'source_lang': 'spanish', 'target_lang': 'nasa_yuwe'}).get_json()
+    assert [result['translation'] for result in payload['results']] == ['yat', 'wala']
+
+
+def test_batch_endpoint_rejects_empty_and_oversized_batches(app_client, monkeypatch):
+    assert 'error' in app_client.post('/api/translate-batch', json={'items': []}).get_json()
+    assert 'error' in app_client.post('/api/translate-batch', json={'texts': 'casa'}).get_json()
+    monkeypatch.setattr(app_module, 'MAX_BATCH_ITEMS', 2)
+    payload = app_client.post('/api/translate-batch', json={'texts': ['a', 'b', 'c']}).get_json()
+    assert 'como máximo 2' in payload['error']
@@ -0,0 +1,65 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import run_benchmarks
+from metrics import StageTimer
+
+
+def test_synthetic_lexicons_are_reproducible_and_follow_the_schema():
+    lexicon = run_benchmarks.generate_lexicon(300, seed=3)
+    assert lexicon == run_benchmarks.generate_lexicon(300, seed=3)
+    assert lexicon != run_benchmarks.generate_lexicon(300, seed=4)
+    assert len(lexicon) == 300
+    assert all(set(entry) == {'traduccion', 'explanation'} for entry in lexicon.values())
+    assert any(entry['traduccion'].endswith('-') for entry in lexicon.values())
+
+    sentences = run_benchmarks.generate_sentences(lexicon, 10)
+    assert {name: len(values) for name, values in sentences.items()} == {
+        'spanish': 10, 'nasa_yuwe': 10, 'conjugated': 10}
+
+
+def test_stub_nllb_reports_its_latency_as_generation_time():
+    stub = run_benchmarks.StubNLLB(latency=0.01)
+    timer = StageTimer()
+    assert stub(['a', 'b'], 'spanish', 'spanish', timer=timer) == ['[nllb] a', '[nllb] b']
+    assert (stub.calls, stub.texts) == (1, 2)
+    assert timer.timings['nllb.generate'] >= 0.01
+
+
+def test_compare_flags_measures_slower_than_the_threshold():
+    baseline = {'results': {'1000': {'translate': {'p50_ms': 1.0}, 'load': {'seconds': 2.0},
+                                     'only_in_baseline': {'p50_ms': 1.0}, 'peak_rss_mb': 50}}}
+    current = {'results': {'1000': {'translate': {'p50_ms': 1.5}, 'load': {'seconds': 2.2},
+                                    'new': {'p50_ms': 1.0}, 'peak_rss_mb': 60}}}
+    rows = run_benchmarks.compare(current, baseline, threshold=1.2)
+    assert [(row['benchmark'], row['metric'], row['ratio'], row['regression']) for row in rows] == [
+        ('translate', 'p50_ms', 1.5, True), ('load', 'seconds', 1.1, False)]
+
+
+def test_main_writes_results_and_fails_on_regressions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    output_path = str(tmp_path / 'resultados.json')
+    assert run_benchmarks.main(['--sizes', '50', '--iterations', '2', '--output', output_path]) == 0
+    with open(output_path, encoding='utf-8') as f:
+        report = json.load(f)
+    results = report['results']['50']
+    assert report['meta']['iterations'] == 2
+    assert {'load_lexicon', 'enhance_translation', 'enhanced_contextual_translation'} <= set(results)
+    assert os.getcwd() == str(tmp_path)
+
+    # Una base diez veces más rápida convierte cada medida en regresión
+    for values in results.values():
+        if isinstance(values, dict):
+            for metric in ('p50_ms', 'seconds'):
+                if values.get(metric):
+                    values[metric] /= 10
+    baseline_path = str(tmp_path / 'base.json')
+    with open(baseline_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f)
+    assert run_benchmarks.main(['--sizes', '50', '--iterations', '2', '--output', output_path,
+                                '--compare', baseline_path]) == 1
+    with open(output_path, encoding='utf-8') as f:
+        assert json.load(f)['comparison']['rows']
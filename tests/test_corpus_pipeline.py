@@ -0,0 +1,121 @@
+import json
+import os
+
+import pytest
+
+import corpus_pipeline
+from corpus_pipeline import CorpusTranslator, read_records, translate_corpus
+
+TEXTS = ['Casa grande. Agua.', '', 'buenos días\ncasa', 'xqz. Comer agua.'] * 5
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    input_path = tmp_path / 'entrada.jsonl'
+    with open(input_path, 'w', encoding='utf-8') as f:
+        for number, text in enumerate(TEXTS):
+            f.write(json.dumps({'id': number, 'text': text}, ensure_ascii=False) + '\n')
+        f.write('\n')
+    return str(input_path), str(tmp_path / 'salida.jsonl')
+
+
+def read_output(output_path):
+    with open(output_path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def expected_translation(model, text):
+    return ''.join(model.translate(sentence, 'spanish', 'nasa_yuwe')['translation'] + separator
+                   for sentence, separator in corpus_pipeline.split_sentences(text)).strip()
+
+
+def test_records_keep_their_order_fields_and_separators(dictionary_path, model, corpus):
+    input_path, _ = corpus
+    translator = CorpusTranslator(dictionary_path, workers=0, chunk_size=3, details=True)
+    records = list(translator.translate_records(read_records(input_path)))
+
+    assert [record['id'] for record in records] == list(range(len(TEXTS)))
+    assert [record['translation'] for record in records] == [expected_translation(model, text) for text in TEXTS]
+    assert records[2]['translation'].count('\n') == 1
+    assert [sentence['source'] for sentence in records[0]['sentences']] == ['Casa grande.', 'Agua.']
+    assert records[3]['sentences'][0]['method'] == 'fallback'
+    assert translator.stats['records'] == len(TEXTS)
+
+
+def test_worker_processes_produce_the_same_output(dictionary_path, corpus, tmp_path):
+    input_path, output_path = corpus
+    translate_corpus(input_path, output_path, dictionary_path=dictionary_path, workers=0, chunk_size=4)
+    parallel_path = str(tmp_path / 'paralelo.jsonl')
+    stats = translate_corpus(input_path, parallel_path, dictionary_path=dictionary_path, workers=2, chunk_size=4)
+    assert read_output(parallel_path) == read_output(output_path)
+    assert stats['records_total'] == len(TEXTS)
+    assert stats['sentences'] == sum(len(list(corpus_pipeline.split_sentences(text))) for text in TEXTS)
+
+
+def test_plain_text_and_invalid_jsonl_inputs(tmp_path):
+    text_path = tmp_path / 'entrada.txt'
+    text_path.write_text('casa\n\nagua\n', encoding='utf-8')
+    assert list(read_records(str(text_path))) == [
+        {'line': 1, 'text': 'casa'}, {'line': 2, 'text': ''}, {'line': 3, 'text': 'agua'}]
+
+    jsonl_path = tmp_path / 'entrada.jsonl'
+    jsonl_path.write_text('{"text": "casa"}\n{"texto": "agua"}\n', encoding='utf-8')
+    with pytest.raises(ValueError, match="Línea 2: falta el campo 'text'"):
+        list(read_records(str(jsonl_path)))
+
+
+def test_an_interrupted_run_resumes_from_its_checkpoint(dictionary_path, corpus, tmp_path, monkeypatch):
+    input_path, output_path = corpus
+    complete_path = str(tmp_path / 'completo.jsonl')
+    translate_corpus(input_path, complete_path, dictionary_path=dictionary_path, workers=0, chunk_size=3)
+
+    translate_chunks = CorpusTranslator.translate_chunks
+
+    def interrupted(self, records):
+        for number, chunk in enumerate(translate_chunks(self, records)):
+            if number == 2:
+                raise KeyboardInterrupt
+            yield chunk
+
+    monkeypatch.setattr(CorpusTranslator, 'translate_chunks', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        translate_corpus(input_path, output_path, dictionary_path=dictionary_path, workers=0, chunk_size=3)
+    with open(output_path + '.checkpoint', encoding='utf-8') as f:
+        assert json.load(f)['records'] == 6
+    # Un registro a medio escribir después del punto de control se descarta
+    with open(output_path, 'a', encoding='utf-8') as f:
+        f.write('{"id": 6, "transl')
+
+    monkeypatch.setattr(CorpusTranslator, 'translate_chunks', translate_chunks)
+    translated = []
+    monkeypatch.setattr(CorpusTranslator, '_split',
+                        lambda self, records, split=CorpusTranslator._split:
+                        split(self, (translated.append(record['id']) or record for record in records)))
+    stats = translate_corpus(input_path, output_path, dictionary_path=dictionary_path, workers=0, chunk_size=3)
+
+    assert translated == list(range(6, len(TEXTS)))
+    assert stats['records_total'] == len(TEXTS)
+    assert read_output(output_path) == read_output(complete_path)
+    assert not os.path.exists(output_path + '.checkpoint')
+
+
+def test_checkpoints_are_ignored_for_other_inputs_or_on_restart(dictionary_path, corpus, tmp_path):
+    input_path, output_path = corpus
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('{"id": "viejo"}\n')
+    for checkpoint_input, resume in [(str(tmp_path / 'otra.jsonl'), True), (input_path, False)]:
+        with open(output_path + '.checkpoint', 'w', encoding='utf-8') as f:
+            json.dump({'input': os.path.abspath(checkpoint_input), 'records': 2, 'output_bytes': 16}, f)
+        translate_corpus(input_path, output_path, resume=resume, dictionary_path=dictionary_path, workers=0)
+        assert [record['id'] for record in read_output(output_path)] == list(range(len(TEXTS)))
+
+
+def test_sentences_left_by_the_rules_share_one_nllb_batch_per_chunk(dictionary_path, fake_nllb):
+    translator = CorpusTranslator(dictionary_path, workers=0, chunk_size=2)
+    batches = fake_nllb(translator.model)
+
+    records = list(translator.translate_records(
+        [{'text': 'xqz. casa'}, {'text': 'wvk'}, {'text': 'agua'}]))
+    assert [texts for texts, _ in batches] == [('xqz.', 'wvk')]
+    assert [record['translation'] for record in records] == ['nllb xqz. yat', 'nllb wvk', 'yu\'']
+    assert translator.stats['method:nllb'] == 2
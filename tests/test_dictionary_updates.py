@@ -0,0 +1,105 @@
+import os
+import threading
+
+import app as app_module
+import lexicon as lexicon_module
+from lexicon import get_lexicon, get_loaded_lexicon
+
+DICTIONARY_PATH = os.path.join('data', 'nasa_yuwe_dictionary.json')
+
+
+def translate(client, text, source_lang='spanish', target_lang='nasa_yuwe'):
+    return client.post('/api/translate-text', json={
+        'text': text, 'source_lang': source_lang, 'target_lang': target_lang}).get_json()['translation']
+
+
+def add_word(client, spanish_word, translation, context='Prueba'):
+    return client.post('/add_word', json={
+        'spanish_word': spanish_word, 'nasa_yuwe_translation': translation, 'context': context})
+
+
+def test_added_word_is_served_without_restart(app_client):
+    assert translate(app_client, 'beber') == 'beber'
+    previous = get_loaded_lexicon(DICTIONARY_PATH)
+
+    response = add_word(app_client, 'beber', 'ĩ-')
+    assert response.status_code == 200 and response.get_json()['status'] == 'success'
+
+    # La caché no devuelve la traducción anterior y el motor gramatical conoce el verbo nuevo
+    assert translate(app_client, 'beber') == 'ĩ-'
+    assert translate(app_client, 'bebemos') == 'ĩwe'
+    assert translate(app_client, 'ĩwe', 'nasa_yuwe', 'spanish') == 'bebe'
+    current = get_loaded_lexicon(DICTIONARY_PATH)
+    assert current is not previous and current.version > previous.version
+    # La versión anterior sigue intacta para los lectores que aún la tengan
+    assert previous.lookup('beber') is None
+    assert app_module.get_translation_model().lexicon is current
+    assert app_module.get_conjugation_engine().lexicon is current
+
+
+def test_add_word_validates_and_rejects_duplicates(app_client):
+    assert add_word(app_client, 'perro', '', '').status_code == 400
+    response = add_word(app_client, 'CASA', 'otra')
+    assert response.status_code == 409
+    assert 'casa' in response.get_json()['error']
+    assert translate(app_client, 'casa') == 'yat'
+
+
+def test_feedback_updates_entries_in_both_directions(app_client):
+    response = app_client.post('/api/feedback', json={
+        'original_text': 'Casa', 'corrected_translation': 'yatx',
+        'source_lang': 'spanish', 'target_lang': 'nasa_yuwe'})
+    assert response.get_json()['stored_in'] == 'lexicon'
+    assert translate(app_client, 'casa') == 'yatx'
+
+    # Nasa Yuwe -> español: la entrada pasa a la palabra corregida
+    app_client.post('/api/feedback', json={
+        'original_text': 'wala', 'corrected_translation': 'enorme',
+        'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'})
+    lexicon = get_loaded_lexicon(DICTIONARY_PATH)
+    assert lexicon.translate('enorme') == 'wala'
+    assert lexicon.lookup('grande') is None
+    assert translate(app_client, 'wala', 'nasa_yuwe', 'spanish') == 'enorme'
+
+    # Palabra desconocida: entrada nueva
+    app_client.post('/api/feedback', json={
+        'original_text': 'misi', 'corrected_translation': 'gato',
+        'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'})
+    assert translate(app_client, 'gato') == 'misi'
+
+
+def test_sentence_feedback_goes_to_translation_memory(app_client):
+    response = app_client.post('/api/feedback', json={
+        'original_text': 'la casa del río', 'corrected_translation': 'yat river',
+        'source_lang': 'spanish', 'target_lang': 'nasa_yuwe'})
+    assert response.get_json()['stored_in'] == 'translation_memory'
+    assert get_loaded_lexicon(DICTIONARY_PATH).lookup('la casa del río') is None
+    assert translate(app_client, 'La casa del río') == 'yat river'
+
+
+def test_concurrent_writes_are_all_published_and_persisted(app_client):
+    translate(app_client, 'casa')
+    errors = []
+
+    def add_words(thread):
+        with app_module.app.test_client() as client:
+            for number in range(5):
+                response = add_word(client, f'palabra{thread}x{number}', f'nasa{thread}x{number}')
+                if response.status_code != 200:
+                    errors.append(response.get_json())
+
+    threads = [threading.Thread(target=add_words, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    lexicon = get_loaded_lexicon(DICTIONARY_PATH)
+    assert all(lexicon.translate(f'palabra{t}x{n}') == f'nasa{t}x{n}' for t in range(4) for n in range(5))
+
+    # Un proceso nuevo (registros vacíos) lee la instantánea más el diario
+    lexicon_module._lexicons.clear()
+    lexicon_module._journals.clear()
+    reloaded = get_lexicon(DICTIONARY_PATH)
+    assert reloaded.entries == lexicon.entries
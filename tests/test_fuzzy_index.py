@@ -0,0 +1,115 @@
+from fuzzy_index import FuzzyIndex, LayeredFuzzyIndex, allowed_distance, edit_distance, fold
+from lexicon import Lexicon
+
+
+def test_fold_and_allowed_distance():
+    assert fold('Canción') == 'cancion'
+    assert fold('mañana') == 'manana'
+    assert [allowed_distance(n) for n in (3, 4, 6, 7)] == [0, 1, 1, 2]
+
+
+def test_edit_distance_counts_transpositions_and_is_bounded():
+    assert edit_distance('casa', 'csaa', 2) == 1
+    assert edit_distance('casa', 'casas', 2) == 1
+    assert edit_distance('casa', 'perro', 1) == 2
+
+
+def test_search_orders_by_distance_then_insertion():
+    index = FuzzyIndex()
+    for key in ('canción', 'cancion', 'camión', 'cantina'):
+        index.add(key)
+    assert index.search('cancion', closest=True) == [('canción', 0), ('cancion', 0)]
+    assert index.search('cancian') == [('canción', 1), ('cancion', 1), ('cantina', 2)]
+    assert index.search('cancian', closest=True) == [('canción', 1), ('cancion', 1)]
+    assert index.search('sol') == []
+    # Las claves de varias palabras no se indexan
+    index.add('buenos días')
+    assert 'buenos días' not in index
+
+
+def test_remove_drops_key_and_its_deletes():
+    index = FuzzyIndex()
+    index.add('canción')
+    index.add('cancion')
+    index.remove('canción')
+    assert index.search('cancion') == [('cancion', 0)]
+    index.remove('cancion')
+    assert index.search('cancion') == []
+    assert len(index) == 0
+    assert not index._deletes
+
+
+def test_layered_index_keeps_base_untouched():
+    base = FuzzyIndex()
+    for key in ('ventana', 'ventura'):
+        base.add(key)
+    first = LayeredFuzzyIndex(base)
+    second = first.copy()
+    second.remove('ventana')
+    second.add('ventanas')
+    assert first.search('ventana', closest=True) == [('ventana', 0)]
+    assert second.search('ventana', closest=True) == [('ventanas', 1)]
+    assert second.search('ventanaz') == [('ventanas', 1)]
+    assert first.search('ventanaz') == [('ventana', 1)]
+    # Volver a agregar una clave de la base la recupera sin duplicarla
+    second.add('ventana')
+    assert second.search('ventana', closest=True) == [('ventana', 0)]
+    assert 'ventanas' not in base
+
+
+def make_lexicon():
+    return Lexicon({'canción': {'traduccion': 'kwe\'sx'}, 'ventana': {'traduccion': 'pjaka'}})
+
+
+def test_fuzzy_index_is_built_lazily_and_per_version():
+    lexicon = make_lexicon()
+    untouched = lexicon.with_changes([{'op': 'set', 'key': 'mañana', 'value': {'traduccion': 'kusxi'}}])
+    assert lexicon._fuzzy_indexes is None and untouched._fuzzy_indexes is None
+
+    assert lexicon.fuzzy_lookup('cancion') == ('canción', "kwe'sx", 0)
+    updated = lexicon.with_changes([
+        {'op': 'delete', 'key': 'canción'},
+        {'op': 'set', 'key': 'mañana', 'value': {'traduccion': 'kusxi'}},
+    ])
+    # La versión anterior no ve las claves nuevas y conserva las eliminadas
+    assert lexicon.fuzzy_lookup('manana') is None
+    assert lexicon.fuzzy_lookup('cancion') == ('canción', "kwe'sx", 0)
+    assert updated.fuzzy_lookup('manana') == ('mañana', 'kusxi', 0)
+    assert updated.fuzzy_lookup('cancion') is None
+    assert 'canción' in updated._fuzzy_indexes[0].removed
+    assert updated._fuzzy_indexes[0].base is lexicon._fuzzy_indexes[0].base
+    assert updated.fuzzy_lookup('pjaca', reverse=True) == ('pjaka', 'ventana', 1)
+
+
+def test_translation_prefers_rules_over_fuzzy_matches(model):
+    # El plural se reconoce por la tabla de flexiones, no como aproximación de "casa"
+    result = model.translate('casas', 'spanish', 'nasa_yuwe')
+    assert result['translation'] == 'yatwe'
+    assert 'fuzzy_matches' not in result
+
+    result = model.translate('cassa', 'spanish', 'nasa_yuwe')
+    assert result['translation'] == 'yat'
+    assert result['fuzzy_matches'] == [{'word': 'cassa', 'match': 'casa', 'distance': 1}]
+    assert result['confidence'] == 0.60
+
+    result = model.translate('cassa grande', 'spanish', 'nasa_yuwe')
+    assert result['translation'] == 'yat wala'
+
+
+def test_fuzzy_matches_follow_live_dictionary_updates(app_client):
+    def translate(text, source_lang='spanish', target_lang='nasa_yuwe'):
+        return app_client.post('/api/translate-text', json={
+            'text': text, 'source_lang': source_lang, 'target_lang': target_lang}).get_json()
+
+    assert translate('grnde')['translation'] == 'wala'
+    app_client.post('/add_word', json={'spanish_word': 'canción', 'nasa_yuwe_translation': "kwe'sx",
+                                       'context': 'Música'})
+    result = translate('cancion')
+    assert result['translation'] == "kwe'sx" and result['fuzzy_matches'][0]['distance'] == 0
+
+    # La entrada renombrada deja de encontrarse por su clave anterior
+    app_client.post('/api/feedback', json={'original_text': 'wala', 'corrected_translation': 'enorme',
+                                           'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'})
+    assert translate('grnde')['translation'] == 'grnde'
+    assert translate('enormee')['translation'] == 'wala'
+    assert translate('walla', 'nasa_yuwe', 'spanish')['translation'] == 'enorme'
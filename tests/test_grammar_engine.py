@@ -0,0 +1,101 @@
+import pytest
+
+from conftest import write_dictionary
+from grammar_engine import ConjugationEngine
+from text_analysis import TextAnalysis
+
+
+@pytest.fixture
+def engine(dictionary_path):
+    return ConjugationEngine(dictionary_path)
+
+
+def test_nasa_yuwe_forms_translate_to_spanish(engine):
+    assert engine.translate_nasa_yuwe_to_spanish('yat') == 'casa'
+    assert engine.translate_nasa_yuwe_to_spanish('yatwe') == 'casas'
+    assert engine.translate_nasa_yuwe_to_spanish('ũuswe') == 'come'
+    assert engine.translate_nasa_yuwe_to_spanish('ũus') == 'comer'
+    assert engine.translate_nasa_yuwe_to_spanish('desconocida') == 'desconocida'
+
+
+def test_spanish_inflections_translate_to_nasa_yuwe(engine):
+    assert engine.translate_spanish_to_nasa_yuwe('casas') == 'yatwe'
+    assert engine.translate_spanish_to_nasa_yuwe('como') == 'ũuswe'
+    assert engine.translate_spanish_form('casa') is None
+    assert engine.lookup_inflection('casas', 'noun') == ('casa', {'pos': 'noun', 'number': 'plural'})
+
+
+def test_lookup_translation_uses_reverse_morphology(engine):
+    analysis = TextAnalysis('ũuswe yatwe', 'nasa_yuwe', engine.lexicon)
+    assert engine.lookup_translation('ũuswe', 'nasa_yuwe', analysis) == 'come'
+    assert engine.lookup_translation('yatwe', 'nasa_yuwe') == 'casas'
+    assert engine.enhance_translation('ũuswe yatwe', 'nasa_yuwe', 'spanish') == 'come casas'
+
+
+def test_with_lexicon_updates_derived_tables_copy_on_write(engine):
+    lexicon = engine.lexicon.with_changes([
+        {'op': 'delete', 'key': 'casa'},
+        {'op': 'set', 'key': 'beber', 'value': {'traduccion': 'ĩ-'}},
+    ])
+    operations = [{'op': 'delete', 'key': 'casa'}, {'op': 'set', 'key': 'beber', 'value': {'traduccion': 'ĩ-'}}]
+    updated = engine.with_lexicon(lexicon, operations)
+    assert updated.translate_nasa_yuwe_to_spanish('yatwe') == 'yatwe'
+    assert updated.translate_nasa_yuwe_to_spanish('ĩwe') == 'bebe'
+    assert updated.translate_spanish_to_nasa_yuwe('bebo') == 'ĩwe'
+    assert ('beber', 'ĩ-') in updated.verb_patterns['action_verbs']
+    # El motor anterior sigue viendo su versión
+    assert engine.translate_nasa_yuwe_to_spanish('yatwe') == 'casas'
+    assert engine.translate_nasa_yuwe_to_spanish('ĩwe') == 'ĩwe'
+
+
+def test_conjugated_form_translates_through_the_api(app_client):
+    response = app_client.post('/api/translate-text', json={
+        'text': 'ũuswe yatwe', 'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'})
+    assert response.get_json()['translation'] == 'come casas'
+
+    response = app_client.post('/api/translate-text', json={
+        'text': 'yatwe', 'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'})
+    assert response.get_json()['translation'] == 'casas'
+
+
+def scan_conjugated_form(dictionary, word):
+    """Recorrido lineal original de detect_conjugated_form, como referencia"""
+    word_lower = word.lower()
+    for spanish_word, data in dictionary.items():
+        if spanish_word.lower() == word_lower:
+            return spanish_word, data['traduccion']
+    for ending in ['o', 'as', 'a', 'amos', 'áis', 'an', 'es', 'e', 'emos', 'éis', 'en', 'imos', 'ís']:
+        if word_lower.endswith(ending) and len(word_lower) > len(ending) + 2:
+            possible_root = word_lower[:-len(ending)]
+            for inf_ending in ['ar', 'er', 'ir']:
+                for spanish_word, data in dictionary.items():
+                    if spanish_word.lower() == possible_root + inf_ending:
+                        return spanish_word, data['traduccion']
+    return None
+
+
+def test_inflection_table_matches_the_original_scan(tmp_path):
+    dictionary = {
+        'comer': {'traduccion': 'ũus-'},
+        'Hablar': {'traduccion': 'wẽt-'},
+        'vivir': {'traduccion': 'pa\'ka-'},
+        'vivar': {'traduccion': 'otro-'},
+        'amar': {'traduccion': 'wẽ\'j-'},
+        'casa': {'traduccion': 'yat'},
+    }
+    engine = ConjugationEngine(write_dictionary(tmp_path, dictionary))
+    words = ['como', 'comes', 'come', 'comemos', 'coméis', 'comen', 'hablo', 'HABLAMOS', 'habláis', 'hablan',
+             'vivo', 'vivimos', 'vivís', 'viven', 'amo', 'ama', 'aman', 'casa', 'casas', 'Hablar', 'perro', 'o']
+    for word in words:
+        assert engine.detect_conjugated_form(word) == scan_conjugated_form(dictionary, word), word
+
+
+def test_inflection_table_follows_lexicon_changes(engine):
+    assert engine.detect_conjugated_form('bebemos') is None
+    operations = [{'op': 'set', 'key': 'beber', 'value': {'traduccion': 'ĩ-'}},
+                  {'op': 'delete', 'key': 'comer'}]
+    updated = engine.with_lexicon(engine.lexicon.with_changes(operations), operations)
+    assert updated.detect_conjugated_form('bebemos') == ('beber', 'ĩ-')
+    assert updated.detect_conjugated_form('comemos') is None
+    assert updated.lookup_inflection('bebemos') == ('beber', {'pos': 'verb', 'verb_type': 'er', 'person': 'nosotros'})
+    assert engine.detect_conjugated_form('comemos') == ('comer', 'ũus-')
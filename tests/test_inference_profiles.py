@@ -0,0 +1,65 @@
+import pytest
+
+from translation_model import AdvancedTranslationModel, INFERENCE_PROFILES
+
+
+def test_profiles_trade_beams_and_length_for_latency():
+    assert set(INFERENCE_PROFILES) == {'quality', 'balanced', 'fast', 'bf16'}
+    assert INFERENCE_PROFILES['quality'] == {'precision': 'float32', 'num_beams': 5,
+                                             'max_length_ratio': None, 'max_length_offset': 0}
+    assert INFERENCE_PROFILES['fast']['num_beams'] == 1
+    assert INFERENCE_PROFILES['fast']['precision'] == 'int8'
+    assert INFERENCE_PROFILES['bf16']['precision'] == 'bfloat16'
+
+
+def test_unknown_profiles_are_rejected(dictionary_path, model):
+    with pytest.raises(ValueError, match='turbo'):
+        AdvancedTranslationModel(dictionary_path, nllb_loading=None, inference_profile='turbo')
+    with pytest.raises(ValueError):
+        model.resolve_profile('turbo')
+    assert model.resolve_profile() == 'quality'
+    assert model.resolve_profile('fast') == 'fast'
+
+
+def test_profile_is_part_of_the_cache_key(model, nllb_calls):
+    assert model.translate('xqz', 'spanish', 'nasa_yuwe', profile='fast')['translation'] == 'nllb xqz'
+    assert model.translate('xqz', 'spanish', 'nasa_yuwe', profile='quality')['method'] == 'nllb'
+    assert model.translate('xqz', 'spanish', 'nasa_yuwe')['method'] == 'nllb'
+    assert nllb_calls == [(('xqz',), 'fast'), (('xqz',), 'quality')]
+
+
+def test_translate_endpoint_validates_the_profile(app_client):
+    payload = app_client.post('/api/translate-text', json={'text': 'casa', 'profile': 'turbo'}).get_json()
+    assert payload == {'error': 'Perfil de inferencia desconocido: turbo'}
+    payload = app_client.post('/api/translate-text', json={'text': 'casa', 'profile': 'fast'}).get_json()
+    assert payload['translation'] == 'yat'
+
+    info = app_client.get('/api/model-info').get_json()['model_info']
+    assert info['inference_profile']['name'] == 'quality'
+
+
+def test_generate_applies_the_profile_settings(model, monkeypatch):
+    torch = pytest.importorskip('torch')
+
+    class Tokenizer:
+        lang_code_to_id = {'spa_Latn': 7}
+
+        def __call__(self, texts, **kwargs):
+            return {'input_ids': torch.ones((len(texts), 10), dtype=torch.long)}
+
+        def batch_decode(self, tokens, skip_special_tokens=True):
+            return [' traducido '] * len(tokens)
+
+    class Model:
+        def generate(self, **kwargs):
+            self.kwargs = kwargs
+            return kwargs['input_ids']
+
+    model.tokenizer, model.model, model.device = Tokenizer(), Model(), torch.device('cpu')
+    assert model._generate(['a', 'b'], 'spanish', 'spanish', 'fast') == ['traducido', 'traducido']
+    assert model.model.kwargs['num_beams'] == 1
+    assert model.model.kwargs['max_length'] == int(10 * 1.5) + 8
+    assert not model.model.kwargs['early_stopping']
+    model._generate(['a'], 'spanish', 'spanish', 'quality')
+    assert model.model.kwargs['num_beams'] == 5
+    assert model.model.kwargs['max_length'] == 512
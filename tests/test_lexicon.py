@@ -0,0 +1,76 @@
+from lexicon import Lexicon, get_lexicon, update_lexicon
+
+
+def make_lexicon():
+    return Lexicon({
+        'Casa': {'traduccion': 'yat'},
+        'hogar': {'traduccion': 'Yat'},
+        'grande': {'traduccion': 'wala'},
+        'buenos días': {'traduccion': 'ewme kiwe'},
+    })
+
+
+def test_lookup_is_case_insensitive_and_first_key_wins():
+    lexicon = Lexicon({'Casa': {'traduccion': 'yat'}, 'casa': {'traduccion': 'otra'}})
+    assert lexicon.lookup('CASA') == ('Casa', {'traduccion': 'yat'})
+    assert lexicon.translate('casa') == 'yat'
+    assert 'cAsA' in lexicon
+    assert lexicon.translate('perro') is None
+
+
+def test_reverse_lookup_last_entry_wins():
+    lexicon = make_lexicon()
+    # Como el diccionario inverso original: la última entrada con esa traducción
+    assert lexicon.reverse_lookup('YAT') == 'hogar'
+    assert lexicon.reverse_lookup_all('yat') == ['Casa', 'hogar']
+    assert lexicon.reverse_lookup('nada') is None
+
+
+def test_reverse_lookup_after_removing_last_entry():
+    lexicon = make_lexicon()
+    lexicon.remove_entry('hogar')
+    assert lexicon.reverse_lookup('yat') == 'Casa'
+    lexicon.remove_entry('Casa')
+    assert lexicon.reverse_lookup('yat') is None
+    assert 'yat' not in lexicon.reverse_index
+
+
+def test_replacing_entry_updates_both_indexes_and_version():
+    lexicon = make_lexicon()
+    version = lexicon.version
+    lexicon.add_entry('grande', {'traduccion': 'wala wala'})
+    assert lexicon.version > version
+    assert lexicon.translate('grande') == 'wala wala'
+    assert lexicon.reverse_lookup('wala') is None
+
+
+def test_with_changes_leaves_previous_version_untouched():
+    lexicon = make_lexicon()
+    updated = lexicon.with_changes([
+        {'op': 'set', 'key': 'agua', 'value': {'traduccion': "yu'"}},
+        {'op': 'delete', 'key': 'Casa'},
+    ])
+    assert updated.version == lexicon.version + 2
+    assert updated.translate('agua') == "yu'"
+    assert updated.lookup('casa') is None
+    assert lexicon.translate('casa') == 'yat'
+    assert lexicon.lookup('agua') is None
+    assert lexicon.reverse_lookup_all('yat') == ['Casa', 'hogar']
+    assert updated.reverse_lookup_all('yat') == ['hogar']
+
+
+def test_phrases_match_longest_and_follow_index_order():
+    lexicon = make_lexicon()
+    words = list(Lexicon.phrase_key('Buenos días, casa'))
+    assert lexicon.match_phrases(words) == [(0, 2, 'buenos días')]
+    lexicon = lexicon.with_changes([{'op': 'set', 'key': 'saludo', 'value': {'traduccion': 'ewme kiwe'}}])
+    assert lexicon.match_phrases(['ewme', 'kiwe'], reverse=True) == [(0, 2, 'saludo')]
+
+
+def test_shared_lexicon_is_loaded_once_and_updated_by_reference(dictionary_path):
+    lexicon = get_lexicon(dictionary_path)
+    assert get_lexicon(dictionary_path) is lexicon
+    updated = update_lexicon(dictionary_path, [{'op': 'delete', 'key': 'casa'}])
+    assert get_lexicon(dictionary_path) is updated
+    assert lexicon.translate('casa') == 'yat'
+    assert updated.translate('casa') is None
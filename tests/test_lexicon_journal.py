@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+
+import pytest
+
+from lexicon import Lexicon
+from lexicon_journal import LexiconJournal
+
+
+def open_worker(dictionary_path, compact_threshold=500):
+    """Diario y léxico publicado de un proceso independiente"""
+    journal = LexiconJournal(dictionary_path, normalize=Lexicon.normalize, compact_threshold=compact_threshold)
+    return journal, Lexicon(*journal.load())
+
+
+def write(journal, lexicon, *operations):
+    """Anexar operaciones y devolver el léxico con los cambios publicados"""
+    with journal.edit(lexicon) as edit:
+        for operation in operations:
+            if operation[0] == 'set':
+                edit.set(operation[1], {'traduccion': operation[2]})
+            else:
+                edit.delete(operation[1])
+    return lexicon.with_changes(edit.changes, edit.position)
+
+
+def read_pending(journal, lexicon):
+    """Edición vacía: solo lee las operaciones que el léxico aún no tiene"""
+    with journal.edit(lexicon) as edit:
+        pass
+    return edit
+
+
+def test_journal_keeps_no_copy_of_the_dictionary(dictionary_path):
+    journal, lexicon = open_worker(dictionary_path)
+    write(journal, lexicon, ('set', 'perro', 'alku'))
+    for attribute in ('entries', '_forward', '_reverse'):
+        assert not hasattr(journal, attribute)
+
+
+def test_duplicate_checks_use_published_lexicon_and_own_operations(dictionary_path):
+    journal, lexicon = open_worker(dictionary_path)
+    with journal.edit(lexicon) as edit:
+        assert edit.pending == []
+        assert edit.find_key('CASA') == 'casa'
+        assert edit.find_by_translation('Yat') == 'casa'
+        assert edit.get('casa')['traduccion'] == 'yat'
+        assert edit.find_key('perro') is None
+        edit.set('Perro', {'traduccion': 'alku'})
+        assert edit.find_key('perro') == 'Perro'
+        edit.delete('casa')
+        assert edit.find_key('casa') is None
+        assert edit.get('casa') is None
+        assert edit.find_by_translation('yat') is None
+
+    updated = lexicon.with_changes(edit.changes, edit.position)
+    assert updated.translate('perro') == 'alku'
+    assert updated.lookup('casa') is None
+    # Lo escrito sobrevive a una carga nueva
+    entries, position = journal.load()
+    assert entries['Perro'] == {'traduccion': 'alku'}
+    assert 'casa' not in entries
+    assert position == updated.journal_position
+
+
+def test_find_by_translation_first_key_wins(dictionary_path):
+    journal, lexicon = open_worker(dictionary_path)
+    lexicon = write(journal, lexicon, ('set', 'hogar', 'yat'))
+    with journal.edit(lexicon) as edit:
+        assert edit.find_by_translation('yat') == 'casa'
+        edit.set('casa', {'traduccion': 'yat'})
+        # La clave reescrita pasa al final, igual que en el índice del léxico
+        assert edit.find_by_translation('yat') == 'hogar'
+
+
+def test_stale_worker_sees_writes_of_another_process(dictionary_path):
+    journal_a, lexicon_a = open_worker(dictionary_path)
+    journal_b, lexicon_b = open_worker(dictionary_path)
+
+    write(journal_a, lexicon_a, ('set', 'perro', 'alku'), ('delete', 'agua'))
+
+    with journal_b.edit(lexicon_b) as edit:
+        assert [operation['key'] for operation in edit.pending] == ['perro', 'agua']
+        assert edit.find_key('PERRO') == 'perro'
+        assert edit.get('agua') is None
+        edit.set('gato', {'traduccion': 'misi'})
+
+    # El worker publica las operaciones que no tenía junto con las propias
+    lexicon_b = lexicon_b.with_changes(edit.changes, edit.position)
+    assert lexicon_b.translate('perro') == 'alku'
+    assert lexicon_b.translate('agua') is None
+    assert lexicon_b.translate('gato') == 'misi'
+    assert Lexicon(*journal_a.load()).entries == lexicon_b.entries
+
+
+def test_concurrent_writers_do_not_lose_operations(dictionary_path):
+    workers = [open_worker(dictionary_path) for _ in range(4)]
+
+    def add_words(index):
+        journal, lexicon = workers[index]
+        for number in range(10):
+            lexicon = write(journal, lexicon, ('set', f'palabra{index}-{number}', f'nasa{index}-{number}'))
+
+    threads = [threading.Thread(target=add_words, args=(index,)) for index in range(len(workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    entries, _ = workers[0][0].load()
+    assert len(entries) == 5 + 40
+    with open(dictionary_path + '.journal', encoding='utf-8') as f:
+        assert len(f.readlines()) == 1 + 40
+
+
+def test_interrupted_line_is_ignored_and_truncated(dictionary_path):
+    journal, lexicon = open_worker(dictionary_path)
+    lexicon = write(journal, lexicon, ('set', 'perro', 'alku'))
+    with open(dictionary_path + '.journal', 'ab') as f:
+        f.write(b'{"op": "set", "key": "gato", "val')
+
+    entries, position = journal.load()
+    assert 'gato' not in entries
+    assert position == lexicon.journal_position
+
+    lexicon = write(journal, lexicon, ('set', 'gato', 'misi'))
+    with open(dictionary_path + '.journal', encoding='utf-8') as f:
+        lines = f.readlines()
+    assert all(line.endswith('\n') for line in lines)
+    assert json.loads(lines[-1])['key'] == 'gato'
+    assert journal.load()[0]['gato'] == {'traduccion': 'misi'}
+
+
+def test_compaction_keeps_positions_of_the_previous_generation(dictionary_path):
+    journal_a, lexicon_a = open_worker(dictionary_path)
+    journal_b, lexicon_b = open_worker(dictionary_path)
+    lexicon_a = write(journal_a, lexicon_a, ('set', 'perro', 'alku'))
+    edit = read_pending(journal_b, lexicon_b)
+    lexicon_b = lexicon_b.with_changes(edit.changes, edit.position)
+
+    journal_a.compact()
+    with open(dictionary_path, encoding='utf-8') as f:
+        assert json.load(f)['perro'] == {'traduccion': 'alku'}
+    with open(dictionary_path + '.journal', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+    assert header['previous'] == lexicon_a.journal_position[0]
+
+    write(journal_a, lexicon_a, ('set', 'gato', 'misi'))
+    # La posición de la generación anterior se traslada: solo llega lo nuevo
+    edit = read_pending(journal_b, lexicon_b)
+    assert [operation['key'] for operation in edit.pending] == ['gato']
+    assert edit.position[0] == header['generation']
+
+
+def test_worker_behind_two_compactions_is_brought_up_to_date(dictionary_path):
+    journal_a, lexicon_a = open_worker(dictionary_path)
+    journal_b, lexicon_b = open_worker(dictionary_path)
+    lexicon_a = write(journal_a, lexicon_a, ('set', 'perro', 'alku'))
+    journal_a.compact()
+    lexicon_a = write(journal_a, lexicon_a, ('delete', 'agua'))
+    journal_a.compact()
+
+    edit = read_pending(journal_b, lexicon_b)
+    assert sorted((operation['op'], operation['key']) for operation in edit.pending) == [
+        ('delete', 'agua'), ('set', 'perro')]
+    assert lexicon_b.with_changes(edit.changes, edit.position).entries == Lexicon(*journal_a.load()).entries
+
+
+def test_compaction_starts_at_threshold(dictionary_path):
+    journal, lexicon = open_worker(dictionary_path, compact_threshold=3)
+    compactions = []
+    journal.compact_in_background = lambda: compactions.append(True)
+    lexicon = write(journal, lexicon, ('set', 'a', '1'), ('set', 'b', '2'))
+    assert not compactions
+    write(journal, lexicon, ('set', 'c', '3'))
+    assert compactions
+
+
+def test_interrupted_compaction_loses_nothing(dictionary_path, monkeypatch):
+    journal, lexicon = open_worker(dictionary_path)
+    lexicon = write(journal, lexicon, ('set', 'perro', 'alku'), ('delete', 'agua'), ('set', 'casa', 'yat yat'))
+    expected = journal.load()[0]
+
+    replace = os.replace
+    calls = []
+
+    def crash_before_journal(source, destination):
+        calls.append(destination)
+        if destination.endswith('.journal'):
+            raise KeyboardInterrupt
+        replace(source, destination)
+
+    monkeypatch.setattr(os, 'replace', crash_before_journal)
+    with pytest.raises(KeyboardInterrupt):
+        journal.compact()
+    monkeypatch.setattr(os, 'replace', replace)
+
+    # La instantánea ya es la nueva y el diario anterior se vuelve a aplicar sobre ella sin efecto
+    assert calls == [dictionary_path, dictionary_path + '.journal']
+    assert journal.load()[0] == expected
+    assert not [name for name in os.listdir(os.path.dirname(dictionary_path)) if name.endswith('.tmp')]
+    # El léxico publicado sigue al día y la siguiente compactación termina bien
+    assert read_pending(journal, lexicon).pending == []
+    journal.compact()
+    assert open_worker(dictionary_path)[1].entries == lexicon.entries
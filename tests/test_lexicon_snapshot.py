@@ -0,0 +1,112 @@
+import gzip
+import json
+
+import app as app_module
+from conftest import SAMPLE_DICTIONARY
+from lexicon import Lexicon
+from lexicon_snapshot import LexiconSnapshots, Snapshot
+
+
+def add_word(client, spanish_word, translation):
+    return client.post('/add_word', json={
+        'spanish_word': spanish_word, 'nasa_yuwe_translation': translation, 'context': 'Prueba'})
+
+
+def delta(client, since):
+    return client.get('/api/lexicon/delta', query_string={'since': since}).get_json()
+
+
+def test_snapshot_is_compressed_and_revalidated_with_its_etag(app_client):
+    response = app_client.get('/api/lexicon', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Cache-Control'] == 'no-cache' and response.headers['Vary'] == 'Accept-Encoding'
+    snapshot = json.loads(gzip.decompress(response.get_data()))
+    assert snapshot['entries'] == [[key, data['traduccion']] for key, data in SAMPLE_DICTIONARY.items()]
+    assert snapshot['version'] == response.headers['X-Lexicon-Version']
+
+    etag = response.headers['ETag']
+    plain = app_client.get('/api/lexicon')
+    assert 'Content-Encoding' not in plain.headers and plain.get_json() == snapshot
+    assert plain.headers['ETag'] == etag
+
+    for if_none_match in (etag, etag.removeprefix('W/'), f'"otra", {etag}', '*'):
+        revalidated = app_client.get('/api/lexicon', headers={'If-None-Match': if_none_match})
+        assert revalidated.status_code == 304 and revalidated.get_data() == b''
+        assert revalidated.headers['ETag'] == etag
+    assert app_client.get('/api/lexicon', headers={'If-None-Match': '"otra"'}).status_code == 200
+
+
+def test_deltas_follow_dictionary_writes(app_client):
+    version = app_client.get('/api/lexicon').headers['X-Lexicon-Version']
+    assert delta(app_client, version) == {'status': 'success', 'full': False, 'version': version,
+                                          'set': [], 'delete': []}
+
+    add_word(app_client, 'perro', 'alku')
+    app_client.post('/api/feedback', json={'original_text': 'wala', 'corrected_translation': 'enorme',
+                                           'source_lang': 'nasa_yuwe', 'target_lang': 'spanish'})
+    response = app_client.get('/api/lexicon')
+    current = response.headers['X-Lexicon-Version']
+    assert current != version
+
+    changes = delta(app_client, version)
+    assert changes['version'] == current and not changes['full']
+    assert changes['set'] == [['perro', 'alku'], ['enorme', 'wala']]
+    assert changes['delete'] == ['grande']
+
+    # Aplicar el delta a la instantánea anterior da la instantánea actual
+    entries = dict((key, data['traduccion']) for key, data in SAMPLE_DICTIONARY.items())
+    for key in changes['delete']:
+        entries.pop(key)
+    entries.update(changes['set'])
+    assert sorted(map(list, entries.items())) == sorted(response.get_json()['entries'])
+
+
+def test_unknown_or_expired_versions_need_the_full_snapshot(app_client, monkeypatch):
+    version = app_client.get('/api/lexicon').headers['X-Lexicon-Version']
+    epoch = version.split('.')[0]
+    for since in ('', 'otra.0', f'{epoch}.x', f'{epoch}.999'):
+        assert delta(app_client, since)['full']
+
+    monkeypatch.setattr(app_module.lexicon_snapshots, 'max_changes', 1)
+    add_word(app_client, 'perro', 'alku')
+    add_word(app_client, 'gato', 'misi')
+    changes = delta(app_client, version)
+    assert changes['full'] and changes['version'] != version
+    # El último cambio sigue disponible como delta
+    previous = f"{epoch}.{int(changes['version'].split('.')[1]) - 1}"
+    assert delta(app_client, previous)['set'] == [['gato', 'misi']]
+
+
+def test_changes_collapse_to_the_last_operation_per_key():
+    snapshots = LexiconSnapshots()
+    lexicon = Lexicon(dict(SAMPLE_DICTIONARY))
+    start = lexicon.version
+    operations = [
+        [{'op': 'set', 'key': 'perro', 'value': {'traduccion': 'alku'}}],
+        [{'op': 'delete', 'key': 'perro'}, {'op': 'delete', 'key': 'agua'}],
+        [{'op': 'set', 'key': 'agua', 'value': {'traduccion': 'yuu'}}],
+    ]
+    for batch in operations:
+        previous = lexicon.version
+        lexicon = lexicon.with_changes(batch)
+        lexicon.mark_modified()
+        snapshots.record(previous, lexicon.version, batch)
+
+    changes = snapshots.delta(snapshots.version_id(start), lexicon)
+    assert changes == {'version': snapshots.version_id(lexicon.version),
+                       'set': [['agua', 'yuu']], 'delete': ['perro']}
+    # La instantánea se serializa una vez por versión
+    assert snapshots.snapshot(lexicon) is snapshots.snapshot(lexicon)
+
+
+def test_encoding_negotiation():
+    snapshot = Snapshot('e.1', b'{"entries":[]}')
+    assert snapshot.negotiate('GZIP;q=1.0, identity') == ('gzip', snapshot.encoded['gzip'])
+    assert snapshot.negotiate('deflate') == (None, snapshot.body)
+    assert snapshot.negotiate(None) == (None, snapshot.body)
+    if 'br' in snapshot.encoded:
+        assert snapshot.negotiate('gzip, br')[0] == 'br'
+    else:
+        assert snapshot.negotiate('br') == (None, snapshot.body)
+    assert Snapshot('otra.7', snapshot.body).etag == snapshot.etag
@@ -0,0 +1,40 @@
+import pytest
+
+import app as app_module
+from translation_model import PendingTranslation
+
+
+def test_translate_can_hand_back_work_that_needs_nllb(model, nllb_calls, monkeypatch):
+    assert model.translate('casa', 'spanish', 'nasa_yuwe', allow_nllb=False)['translation'] == 'yat'
+
+    pending = model.translate('xqz', 'spanish', 'nasa_yuwe', allow_nllb=False)
+    assert isinstance(pending, PendingTranslation) and nllb_calls == []
+    # Nada queda en caché hasta que NLLB responde
+    assert isinstance(model.translate('xqz', 'spanish', 'nasa_yuwe', allow_nllb=False), PendingTranslation)
+
+    # Completar no repite las etapas de reglas
+    monkeypatch.setattr(model, '_translate_with_rules', lambda *args: pytest.fail('reglas repetidas'))
+    assert model.finish_translation(pending)['translation'] == 'nllb xqz'
+    assert nllb_calls == [(('xqz',), 'quality')]
+    assert model.translate('xqz', 'spanish', 'nasa_yuwe', allow_nllb=False)['method'] == 'nllb'
+
+
+def test_live_requests_never_wait_for_nllb(app_client, fake_nllb):
+    calls = fake_nllb(app_module.get_translation_model())
+
+    def translate(text, **fields):
+        return app_client.post('/api/translate-text', json=dict(fields, text=text)).get_json()
+
+    assert translate('casa grande', live=True) == dict(translate('casa grande'), live=True, complete=True)
+
+    live = translate('xqz', live=True)
+    assert live['translation'] == 'xqz' and live['method'] == 'fallback'
+    assert live['live'] and not live['complete']
+    assert calls == []
+
+    # Al dejar de escribir, el cliente pide la traducción completa; la siguiente en vivo sale de la caché
+    assert translate('xqz')['translation'] == 'nllb xqz'
+    assert translate('xqz', live=True)['complete']
+    assert calls == [(('xqz',), 'quality')]
+
+    assert 'total' in translate('wvk', live=True, timings=True)['timings']
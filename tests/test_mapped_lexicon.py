@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from compile_lexicon import compile_lexicon
+from conftest import SAMPLE_DICTIONARY, write_dictionary
+from grammar_engine import ConjugationEngine
+from lexicon import Lexicon, get_lexicon, get_lexicon_journal, load_lexicon
+from mapped_lexicon import MappedLexicon, compiled_path
+
+ENTRIES = dict(SAMPLE_DICTIONARY, **{
+    'Casa': {'traduccion': 'yat', 'explanation': 'Mayúscula'},
+    'hogar': {'traduccion': 'yat', 'explanation': 'Sinónimo'},
+    'correr': {'traduccion': 'pẽe-', 'explanation': 'Verbo'},
+    'buenas noches': {'traduccion': 'ewme atx', 'explanation': 'Saludo'},
+})
+
+
+@pytest.fixture
+def compiled(tmp_path):
+    dictionary_path = write_dictionary(tmp_path, ENTRIES)
+    mapped = MappedLexicon(compile_lexicon(dictionary_path))
+    yield dictionary_path, mapped
+    mapped.close()
+
+
+def test_lookups_match_the_in_memory_lexicon(compiled):
+    dictionary_path, mapped = compiled
+    lexicon = Lexicon(dict(ENTRIES))
+    assert len(mapped) == len(lexicon)
+    assert dict(mapped.entries.items()) == ENTRIES
+    for word in ['casa', 'CASA', 'Casa', 'grande', 'buenos días', 'BUENAS noches', 'perro', '']:
+        assert mapped.lookup(word) == lexicon.lookup(word)
+        assert mapped.lookup_all(word) == lexicon.lookup_all(word)
+        assert mapped.translate(word) == lexicon.translate(word)
+        assert (word in mapped) == (word in lexicon)
+    for word in ['yat', 'YAT', 'wala', 'ewme kiwe', 'xqz']:
+        assert mapped.reverse_lookup(word) == lexicon.reverse_lookup(word)
+        assert mapped.reverse_lookup_all(word) == lexicon.reverse_lookup_all(word)
+    # Varias palabras con la misma traducción: gana la última, como en Lexicon
+    assert mapped.reverse_lookup('yat') == 'hogar'
+    assert 'Casa' in mapped.entries and 'CASA' not in mapped.entries
+
+
+def test_phrases_and_fuzzy_matches_match_the_in_memory_lexicon(compiled):
+    _, mapped = compiled
+    lexicon = Lexicon(dict(ENTRIES))
+    words = ['ya', 'son', 'buenas', 'noches', 'y', 'buenos', 'días']
+    assert mapped.match_phrases(words) == lexicon.match_phrases(words)
+    assert mapped.match_phrases(['ewme', 'atx'], reverse=True) == lexicon.match_phrases(['ewme', 'atx'], reverse=True)
+    for word in ['grnde', 'caza', 'agüa']:
+        assert mapped.fuzzy_lookup(word) == lexicon.fuzzy_lookup(word)
+    assert mapped.fuzzy_lookup('walla', reverse=True) == ('wala', 'grande', 1)
+
+
+def test_grammar_tables_are_precomputed(compiled):
+    dictionary_path, mapped = compiled
+    expected = ConjugationEngine(dictionary_path, lexicon=Lexicon(dict(ENTRIES)))
+    engine = ConjugationEngine(dictionary_path, lexicon=mapped)
+    assert {key: sorted(values) for key, values in engine.verb_patterns.items()} == {
+        key: sorted(values) for key, values in expected.verb_patterns.items()}
+    assert dict(engine.nasa_yuwe_forms.items()) == expected.nasa_yuwe_forms
+    assert dict(engine.inflection_table.items()) == expected.inflection_table
+    assert engine.lookup_inflection('corremos') == expected.lookup_inflection('corremos')
+
+
+def test_with_changes_returns_an_in_memory_copy(compiled):
+    _, mapped = compiled
+    updated = mapped.with_changes([{'op': 'set', 'key': 'perro', 'value': {'traduccion': 'alku'}},
+                                   {'op': 'delete', 'key': 'grande'}], ('gen', 10))
+    assert isinstance(updated, Lexicon)
+    assert updated.translate('perro') == 'alku' and updated.lookup('grande') is None
+    assert updated.journal_position == ('gen', 10)
+    assert mapped.translate('perro') is None and mapped.translate('grande') == 'wala'
+
+
+def test_compiled_file_includes_the_journal(tmp_path):
+    dictionary_path = write_dictionary(tmp_path)
+    journal = get_lexicon_journal(dictionary_path)
+    with journal.edit(Lexicon(*journal.load())) as edit:
+        edit.set('perro', {'traduccion': 'alku'})
+        edit.delete('agua')
+
+    mapped = MappedLexicon(compile_lexicon(dictionary_path))
+    try:
+        assert mapped.translate('perro') == 'alku' and mapped.translate('agua') is None
+        assert mapped.journal_position == edit.position
+        assert not journal.changed_since(mapped.journal_position)
+    finally:
+        mapped.close()
+
+
+def test_loader_prefers_a_current_compiled_file(tmp_path):
+    dictionary_path = write_dictionary(tmp_path)
+    assert type(load_lexicon(dictionary_path)) is Lexicon
+    compile_lexicon(dictionary_path)
+    lexicon = get_lexicon(dictionary_path)
+    assert isinstance(lexicon, MappedLexicon)
+    assert lexicon.translate('casa') == 'yat'
+
+
+def test_stale_or_broken_compiled_files_fall_back_to_json(tmp_path):
+    dictionary_path = write_dictionary(tmp_path)
+    compile_lexicon(dictionary_path)
+    journal = get_lexicon_journal(dictionary_path)
+    with journal.edit(Lexicon(*journal.load())) as edit:
+        edit.set('perro', {'traduccion': 'alku'})
+
+    # El diario cambió después de compilar: se usa el JSON con el diario
+    lexicon = load_lexicon(dictionary_path)
+    assert type(lexicon) is Lexicon and lexicon.translate('perro') == 'alku'
+
+    with open(compiled_path(dictionary_path), 'wb') as f:
+        f.write(b'basura')
+    lexicon = load_lexicon(dictionary_path)
+    assert type(lexicon) is Lexicon and lexicon.translate('perro') == 'alku'
+    assert os.path.exists(compiled_path(dictionary_path))
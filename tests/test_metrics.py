@@ -0,0 +1,92 @@
+import re
+import time
+
+from metrics import Counter, Histogram, MetricsRegistry, StageTimer
+
+
+def sample(text, name, **labels):
+    """Valor de una muestra del formato de texto de Prometheus (0 si no existe)"""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    pattern = re.escape(name + ('{' + label_text + '}' if labels else '')) + r' (\S+)$'
+    match = re.search(pattern, text, re.MULTILINE)
+    return float(match.group(1)) if match else 0
+
+
+def test_stage_timer_accumulates_repeated_stages():
+    timer = StageTimer()
+    with timer.stage('dictionary'):
+        time.sleep(0.002)
+    timer.add('dictionary', 0.5)
+    other = StageTimer()
+    other.add('grammar.contextual', 0.25)
+    timer.merge(other)
+
+    assert timer.timings['dictionary'] >= 0.502
+    timings = timer.as_dict()
+    assert timings['grammar.contextual'] == 250.0
+    assert timings['total'] >= 2
+
+
+def test_counters_and_histograms_use_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests', 'Peticiones', ('path',))
+    latency = registry.histogram('latency_seconds', 'Latencia', ('path',), buckets=(0.1, 1.0))
+    requests.inc(('/a"b',))
+    requests.inc(('/a"b',), 2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, ('/x',))
+
+    text = registry.render()
+    assert text.splitlines()[:3] == ['# HELP requests Peticiones', '# TYPE requests counter',
+                                     'requests_total{path="/a\\"b"} 3']
+    assert '# TYPE latency_seconds histogram' in text
+    assert sample(text, 'latency_seconds_bucket', path='/x', le='0.1') == 2
+    assert sample(text, 'latency_seconds_bucket', path='/x', le='1.0') == 3
+    assert sample(text, 'latency_seconds_bucket', path='/x', le='+Inf') == 4
+    assert sample(text, 'latency_seconds_sum', path='/x') == 3.65
+    assert sample(text, 'latency_seconds_count', path='/x') == 4
+    assert list(Counter('vacio', '').samples()) == list(Histogram('vacio', '').samples()) == []
+
+
+def test_translate_reports_stage_timings(model):
+    timer = StageTimer()
+    model.translate('casa grande', 'spanish', 'nasa_yuwe', timer=timer)
+    assert {'cache', 'memory', 'analysis', 'dictionary'} <= set(timer.timings)
+
+    cached = StageTimer()
+    model.translate('casa grande', 'spanish', 'nasa_yuwe', timer=cached)
+    assert set(cached.timings) == {'cache'}
+
+
+def test_timings_are_returned_only_on_request(app_client):
+    payload = app_client.post('/api/translate-text', json={'text': 'casa'}).get_json()
+    assert 'timings' not in payload
+    payload = app_client.post('/api/translate-text', json={'text': 'agua', 'timings': True}).get_json()
+    assert {'dictionary', 'total'} <= set(payload['timings'])
+    payload = app_client.post('/api/translate-text?timings=1', json={'text': 'grande'}).get_json()
+    assert 'total' in payload['timings']
+
+
+def test_metrics_endpoint_counts_translations_and_dictionary_writes(app_client):
+    before = app_client.get('/api/metrics').get_data(as_text=True)
+    app_client.post('/api/translate-text', json={'text': 'casa'})
+    app_client.post('/api/translate-text', json={'text': 'casa'})
+    app_client.post('/add_word', json={'spanish_word': 'perro', 'nasa_yuwe_translation': 'alku', 'context': 'x'})
+    app_client.post('/add_word', json={'spanish_word': 'perro', 'nasa_yuwe_translation': 'alku', 'context': 'x'})
+
+    response = app_client.get('/api/metrics')
+    assert response.mimetype == 'text/plain'
+    after = response.get_data(as_text=True)
+
+    def delta(name, **labels):
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    direction = 'spanish_to_nasa_yuwe'
+    assert delta('translations_total', method='dictionary', direction=direction) == 1
+    assert delta('translations_total', method='cache', direction=direction) == 1
+    assert delta('translation_seconds_count', method='dictionary', direction=direction) == 1
+    assert delta('translation_stage_seconds_count', stage='dictionary', direction=direction) == 1
+    assert delta('dictionary_writes_total', endpoint='add_word', status='success') == 1
+    assert delta('dictionary_writes_total', endpoint='add_word', status='conflict') == 1
+    assert delta('dictionary_write_seconds_count', endpoint='add_word', stage='lock') == 2
+    assert delta('dictionary_write_seconds_count', endpoint='add_word', stage='apply') == 1
@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+from metrics import StageTimer
+from nllb_scheduler import InferenceScheduler
+
+
+class RecordingBatch:
+    """run_batch de prueba: registra cada lote y puede retener el primero hasta que se libere"""
+
+    def __init__(self, hold_first=False):
+        self.batches = []
+        self.release = threading.Event()
+        self.started = threading.Event()
+        if not hold_first:
+            self.release.set()
+
+    def __call__(self, texts, source_lang, target_lang, profile, timer):
+        self.started.set()
+        self.release.wait(5)
+        with timer.stage('nllb.generate'):
+            self.batches.append((tuple(texts), source_lang, target_lang, profile))
+        return [f'{profile}:{text}' for text in texts]
+
+
+def test_concurrent_requests_share_batches_grouped_by_language_and_profile():
+    run_batch = RecordingBatch(hold_first=True)
+    scheduler = InferenceScheduler(run_batch, max_batch_size=8, max_wait=0.05)
+    try:
+        first = scheduler.submit('primero', 'spanish', 'spanish', 'quality')
+        assert run_batch.started.wait(5)
+        # Mientras el primer lote se ejecuta, los demás se acumulan en la cola
+        futures = [scheduler.submit(f'texto {i}', 'spanish', 'spanish', 'fast' if i % 2 else 'quality')
+                   for i in range(6)]
+        run_batch.release.set()
+        assert first.result(5) == 'quality:primero'
+        assert [future.result(5) for future in futures] == [
+            f'{"fast" if i % 2 else "quality"}:texto {i}' for i in range(6)]
+    finally:
+        scheduler.stop()
+
+    assert run_batch.batches[0] == (('primero',), 'spanish', 'spanish', 'quality')
+    assert sorted(run_batch.batches[1:]) == [
+        (('texto 0', 'texto 2', 'texto 4'), 'spanish', 'spanish', 'quality'),
+        (('texto 1', 'texto 3', 'texto 5'), 'spanish', 'spanish', 'fast'),
+    ]
+    stats = scheduler.stats()
+    assert stats['requests'] == 7 and stats['batches'] == 3
+    assert stats['average_batch_size'] == round(7 / 3, 2)
+    assert stats['batch_size_histogram'] == {'1': 1, '2': 1, '4': 3, '8': 3}
+
+
+def test_batches_never_exceed_the_maximum_size():
+    run_batch = RecordingBatch(hold_first=True)
+    scheduler = InferenceScheduler(run_batch, max_batch_size=3, max_wait=0.05)
+    try:
+        first = scheduler.submit('a', 'spanish', 'spanish')
+        assert run_batch.started.wait(5)
+        rest = [scheduler.submit(str(i), 'spanish', 'spanish') for i in range(7)]
+        run_batch.release.set()
+        first.result(5)
+        for future in rest:
+            future.result(5)
+    finally:
+        scheduler.stop()
+    assert max(len(batch[0]) for batch in run_batch.batches) == 3
+    assert sum(len(batch[0]) for batch in run_batch.batches) == 8
+
+
+def test_translate_many_reports_queue_wait_and_batch_stages():
+    scheduler = InferenceScheduler(RecordingBatch(), max_batch_size=4, max_wait=0)
+    timer = StageTimer()
+    try:
+        assert scheduler.translate_many(['x', 'y'], 'spanish', 'spanish', 'quality', timer) == [
+            'quality:x', 'quality:y']
+        assert scheduler.translate('z', 'spanish', 'spanish') == 'None:z'
+    finally:
+        scheduler.stop()
+    assert {'nllb.queue', 'nllb.generate'} <= set(timer.timings)
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    def failing_batch(texts, source_lang, target_lang, profile, timer):
+        raise RuntimeError('sin memoria')
+
+    scheduler = InferenceScheduler(failing_batch, max_batch_size=4, max_wait=0)
+    try:
+        with pytest.raises(RuntimeError, match='sin memoria'):
+            scheduler.translate('x', 'spanish', 'spanish')
+        # El hilo de trabajo sigue atendiendo después del error
+        with pytest.raises(RuntimeError):
+            scheduler.submit('y', 'spanish', 'spanish').result(5)
+    finally:
+        scheduler.stop()
+    assert not scheduler._thread.is_alive()
@@ -0,0 +1,86 @@
+import pytest
+
+from grammar_engine import ConjugationEngine
+from lexicon import Lexicon
+from phrase_matcher import PhraseMatcher
+
+TEXTS = [
+    'Ayer comí en la mañana',
+    '¿Qué haces hoy?',
+    'Después de la tarde, ¿por qué no vienes?',
+    'mañana en la noche',
+    'Nada que ver',
+    '¿Cómo y cuándo?',
+    '',
+]
+
+
+def test_iter_matches_finds_overlapping_patterns():
+    matcher = PhraseMatcher()
+    for pattern in ('he', 'she', 'his', 'hers'):
+        matcher.add(pattern, pattern)
+    matcher.add('', 'vacío')
+    assert len(matcher) == 4
+    assert sorted(matcher.iter_matches('ushers')) == [(1, 4, 'she'), (2, 4, 'he'), (2, 6, 'hers')]
+    assert list(matcher.iter_matches('xyz')) == []
+
+
+def test_longest_matches_over_word_tuples():
+    matcher = PhraseMatcher()
+    matcher.add(('en', 'la'), 'corta')
+    matcher.add(('en', 'la', 'mañana'), 'larga')
+    matcher.add(('la', 'mañana', 'fría'), 'solapada')
+    matcher.build()
+    words = ('salgo', 'en', 'la', 'mañana', 'fría', 'en', 'la', 'casa')
+    assert matcher.longest_matches(words) == [(1, 4, 'larga'), (5, 7, 'corta')]
+    # Se compila solo al buscar si se agregaron patrones después de build
+    matcher.add(('casa',), 'casa')
+    assert matcher.longest_matches(words)[-1] == (7, 8, 'casa')
+
+
+@pytest.fixture
+def engine(dictionary_path):
+    return ConjugationEngine(dictionary_path)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_context_markers_match_the_original_substring_scan(engine, text):
+    markers = engine.load_spanish_context_markers()
+    text_lower = text.lower()
+
+    expected_temporal = {'markers': [], 'tense': 'present'}
+    for marker, tense in markers['temporal'].items():
+        if marker in text_lower:
+            expected_temporal['markers'].append(marker)
+            if tense in ['past', 'present', 'future']:
+                expected_temporal['tense'] = tense
+    assert engine.detect_temporal_context(text, 'spanish') == expected_temporal
+
+    expected_question = {'is_question': text.strip().endswith('?'), 'type': None, 'particle': None}
+    for marker, question_type in markers['question'].items():
+        if marker in text_lower:
+            expected_question.update(is_question=True, type=question_type,
+                                     particle=engine.nasa_yuwe_grammar['question_particles'][question_type])
+            break
+    assert engine.detect_question_type(text, 'spanish') == expected_question
+
+
+def test_multi_word_entries_match_in_both_directions(model):
+    assert model.translate('Buenos días, casa', 'spanish', 'nasa_yuwe')['translation'] == 'ewme kiwe, yat'
+    assert model.translate('ewme kiwe', 'nasa_yuwe', 'spanish')['translation'] == 'buenos días'
+
+
+def test_phrase_matchers_are_rebuilt_only_when_a_phrase_changes():
+    lexicon = Lexicon({'buenos días': {'traduccion': 'ewme kiwe'}, 'casa': {'traduccion': 'yat'}})
+    assert lexicon.match_phrases(('buenos', 'días')) == [(0, 2, 'buenos días')]
+    matchers = lexicon._phrase_matchers
+
+    updated = lexicon.with_changes([{'op': 'set', 'key': 'agua', 'value': {'traduccion': "yu'"}}])
+    assert updated._phrase_matchers is matchers
+
+    updated = updated.with_changes([{'op': 'set', 'key': 'buenas noches', 'value': {'traduccion': 'ewme ãjxa'}},
+                                    {'op': 'delete', 'key': 'buenos días'}])
+    assert updated.match_phrases(('buenas', 'noches')) == [(0, 2, 'buenas noches')]
+    assert updated.match_phrases(('buenos', 'días')) == []
+    assert updated.match_phrases(('ewme', 'ãjxa'), reverse=True) == [(0, 2, 'buenas noches')]
+    assert lexicon.match_phrases(('buenos', 'días')) == [(0, 2, 'buenos días')]
@@ -0,0 +1,130 @@
+import gc
+import os
+import sys
+import types
+
+import app as app_module
+import prefork
+from lexicon import Lexicon
+from lexicon_journal import LexiconJournal
+from translation_memory import TranslationMemory
+
+DICTIONARY_PATH = os.path.join('data', 'nasa_yuwe_dictionary.json')
+MEMORY_PATH = os.path.join('data', 'translation_memory.jsonl')
+
+
+def translate(client, text, source_lang='spanish', target_lang='nasa_yuwe'):
+    response = client.post('/api/translate-text', json={
+        'text': text, 'source_lang': source_lang, 'target_lang': target_lang})
+    return response.get_json()
+
+
+def other_worker_writes(*operations):
+    """Escribir en el diario como lo haría otro worker, con su propio léxico publicado"""
+    journal = LexiconJournal(DICTIONARY_PATH, normalize=Lexicon.normalize)
+    lexicon = Lexicon(*journal.load())
+    with journal.edit(lexicon) as edit:
+        for spanish_word, translation in operations:
+            if translation is None:
+                edit.delete(spanish_word)
+            else:
+                edit.set(spanish_word, {'traduccion': translation, 'explanation': 'Otro worker'})
+
+
+def test_worker_applies_dictionary_writes_of_other_workers(app_client):
+    assert translate(app_client, 'perro')['translation'] != 'alku'
+    assert translate(app_client, 'casa')['translation'] == 'yat'
+
+    other_worker_writes(('perro', 'alku'), ('casa', None))
+
+    # La caché de traducciones no devuelve el resultado anterior
+    assert translate(app_client, 'perro')['translation'] == 'alku'
+    assert translate(app_client, 'casa')['translation'] != 'yat'
+    assert translate(app_client, 'alku', 'nasa_yuwe', 'spanish')['translation'] == 'perro'
+
+    # La comprobación de duplicados de este worker ve la palabra escrita por el otro
+    response = app_client.post('/add_word', json={
+        'spanish_word': 'Perro', 'nasa_yuwe_translation': 'x', 'context': 'duplicado'})
+    assert response.status_code == 409
+
+
+def test_worker_applies_memory_corrections_of_other_workers(app_client):
+    sentence = 'la casa grande de la montaña'
+    assert translate(app_client, sentence)['method'] != 'translation_memory'
+
+    TranslationMemory.from_file(MEMORY_PATH).store('spanish', 'nasa_yuwe', sentence, 'yat wala kiwe')
+
+    result = translate(app_client, sentence)
+    assert result['method'] == 'translation_memory'
+    assert result['translation'] == 'yat wala kiwe'
+
+
+def test_lexicon_snapshot_follows_other_workers(app_client):
+    first = app_client.get('/api/lexicon')
+    other_worker_writes(('perro', 'alku'))
+    response = app_client.get('/api/lexicon', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+
+
+def test_unchanged_files_are_not_read_again(app_client, monkeypatch):
+    translate(app_client, 'casa')
+    journal_reads = []
+    monkeypatch.setattr(LexiconJournal, 'read_since', lambda self, base: journal_reads.append(base))
+    monkeypatch.setattr(TranslationMemory, 'refresh', lambda self: journal_reads.append(self))
+    translate(app_client, 'grande')
+    translate(app_client, 'agua')
+    assert journal_reads == []
+
+
+def test_worker_info_and_default_threads():
+    info = prefork.worker_info()
+    assert info['pid'] == os.getpid()
+    assert set(prefork.SMAPS_FIELDS.values()) <= set(info['memory'])
+    assert prefork.default_torch_threads(10 ** 6) == 1
+    assert prefork.default_torch_threads(1) == (os.cpu_count() or 1)
+
+
+class FakeTorch(types.ModuleType):
+    """PyTorch de prueba: como el real, rechaza fijar los hilos inter-op tras el primer trabajo"""
+
+    def __init__(self):
+        super().__init__('torch')
+        self.started = False
+        self.calls = []
+
+    def set_num_threads(self, threads):
+        self.calls.append(('num_threads', threads))
+
+    def set_num_interop_threads(self, threads):
+        if self.started:
+            raise RuntimeError('Error: cannot set number of interop threads after parallel work has started')
+        self.calls.append(('interop_threads', threads))
+
+
+def test_interop_threads_are_set_in_the_master_before_loading(app_client, monkeypatch):
+    torch = FakeTorch()
+    monkeypatch.setitem(sys.modules, 'torch', torch)
+    monkeypatch.setattr(app_module, 'NLLB_LOADING', 'sync')
+    monkeypatch.setattr(app_module, 'TORCH_INTEROP_THREADS', 2)
+    monkeypatch.setattr(app_module, 'TORCH_THREADS_PER_WORKER', 3)
+    monkeypatch.setattr(app_module, 'model_preloaded', False)
+    monkeypatch.setattr(prefork, '_torch_threads', {'num_threads': None, 'interop_threads': None})
+    get_translation_model = app_module.get_translation_model
+
+    def load_model():
+        # La carga y el calentamiento de NLLB ya ejecutan trabajo de PyTorch
+        torch.started = True
+        return get_translation_model()
+
+    monkeypatch.setattr(app_module, 'get_translation_model', load_model)
+    try:
+        app_module.preload_translation_model()
+    finally:
+        gc.unfreeze()
+    assert torch.calls == [('num_threads', 1), ('interop_threads', 2)]
+
+    # Tras el fork el worker solo fija los hilos intra-op; los inter-op se heredan
+    app_module.init_worker(4)
+    assert torch.calls[2:] == [('num_threads', 3)]
+    assert prefork.worker_info()['torch_threads'] == {'num_threads': 3, 'interop_threads': 2}
@@ -0,0 +1,61 @@
+import threading
+
+import app as app_module
+import translation_model
+from translation_model import AdvancedTranslationModel
+
+
+def test_without_nllb_the_service_is_ready_at_once(model):
+    readiness = model.get_readiness()
+    assert readiness == {'ready': True, 'nllb_settled': True, 'components': {
+        'dictionary': 'ready', 'grammar_engine': 'ready', 'translation_memory': 'ready', 'nllb': 'disabled'}}
+    assert model.wait_until_ready(0)
+
+
+def test_background_loading_does_not_block_dictionary_translations(dictionary_path, monkeypatch):
+    release = threading.Event()
+    original_load = AdvancedTranslationModel._load_nllb_model
+
+    def slow_load(self):
+        self.component_status['nllb'] = 'loading'
+        release.wait(5)
+        original_load(self)
+
+    monkeypatch.setattr(AdvancedTranslationModel, '_load_nllb_model', slow_load)
+    monkeypatch.setattr(translation_model, 'NLLB_MODEL_PATH', str(dictionary_path) + '.no-model')
+    model = AdvancedTranslationModel(dictionary_path, nllb_loading='background')
+
+    readiness = model.get_readiness()
+    assert readiness['ready'] and not readiness['nllb_settled']
+    assert readiness['components']['nllb'] == 'loading'
+    assert model.translate('casa grande', 'spanish', 'nasa_yuwe')['translation'] == 'yat wala'
+    assert not model.wait_until_ready(0)
+
+    release.set()
+    assert model.wait_until_ready(5)
+    # Sin el modelo en disco la carga termina como no disponible y el servicio sigue con reglas
+    assert model.get_readiness()['components']['nllb'] == 'unavailable'
+    assert not model.model_loaded
+
+
+def test_ready_endpoint_can_require_nllb(app_client, monkeypatch):
+    response = app_client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['ready']
+
+    model = app_module.get_translation_model()
+    monkeypatch.setattr(model, 'nllb_ready', threading.Event())
+    assert app_client.get('/api/ready').status_code == 200
+    response = app_client.get('/api/ready?require=nllb')
+    assert response.status_code == 503
+    assert response.get_json() == dict(model.get_readiness(), ready=False)
+
+
+def test_ready_endpoint_reports_failures(app_client, monkeypatch):
+    def broken():
+        raise RuntimeError('sin diccionario')
+
+    monkeypatch.setattr(app_module, 'get_translation_model', broken)
+    response = app_client.get('/api/ready')
+    assert response.status_code == 503
+    assert response.get_json() == {'ready': False, 'error': 'sin diccionario'}
@@ -0,0 +1,101 @@
+import os
+import pstats
+import threading
+
+import pytest
+
+import app as app_module
+from request_profiler import RequestProfiler
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return RequestProfiler(str(tmp_path / 'perfiles'))
+
+
+def test_cprofile_writes_a_pstats_dump_and_metadata(profiler):
+    result, profile_id = profiler.profile(busy, {'endpoint': '/x'})
+    assert result == busy()
+    assert profiler.profile_file(profile_id) == profile_id + '.pstats'
+    stats = pstats.Stats(os.path.join(profiler.directory, profile_id + '.pstats'))
+    assert any(function[2] == 'busy' for function in stats.stats)
+
+    [metadata] = profiler.list_profiles()
+    assert metadata['id'] == profile_id and metadata['endpoint'] == '/x' and metadata['mode'] == 'cprofile'
+    assert 'busy' in profiler.summary(profile_id)
+
+
+def test_sampling_mode_writes_collapsed_stacks(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), mode='sampling', interval=0.0005)
+    stop = threading.Event()
+
+    def slow():
+        stop.wait(0.05)
+        return 'listo'
+
+    result, profile_id = profiler.profile(slow)
+    assert result == 'listo'
+    with open(os.path.join(str(tmp_path), profiler.profile_file(profile_id)), encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('test_request_profiler.py:slow' in line for line in lines)
+    assert profiler.summary(profile_id) is None
+
+
+def test_invalid_modes_ids_and_concurrent_profiles(profiler, tmp_path):
+    with pytest.raises(ValueError):
+        RequestProfiler(str(tmp_path), mode='perf')
+    assert profiler.profile_file('../../etc/passwd') is None
+    assert profiler.profile_file('20260101T000000-000000000000') is None
+
+    # Mientras se perfila una petición, las demás se atienden sin perfilar
+    inner = []
+    profiler.profile(lambda: inner.append(profiler.profile(busy)))
+    assert inner[0] == (busy(), None)
+
+
+def test_only_the_most_recent_profiles_are_kept(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_profiles=2)
+    ids = []
+    for _ in range(4):
+        ids.append(profiler.profile(busy)[1])
+    # Todos en el mismo segundo: se conservan los dos últimos, del más reciente al más antiguo
+    assert [metadata['id'] for metadata in profiler.list_profiles()] == ids[:1:-1]
+    assert len(os.listdir(str(tmp_path))) == 4
+
+
+def test_disabled_profiling_leaves_views_untouched(app_client):
+    assert app_module.request_profiler is None
+    assert app_module.profiled(busy) is busy
+    assert app_client.get('/api/profiles').status_code == 404
+    assert app_client.get('/api/profiles/20260101T000000-000000000000').status_code == 404
+    response = app_client.post('/api/translate-text?profiling=1', json={'text': 'casa'})
+    assert 'profile_id' not in response.get_json() and 'X-Profile-Id' not in response.headers
+
+
+def test_requested_profiles_can_be_listed_and_downloaded(app_client, profiler, monkeypatch):
+    monkeypatch.setattr(app_module, 'request_profiler', profiler)
+    # Con PROFILING_ENABLED la vista se envuelve al importar app; aquí se envuelve a mano
+    view = app_module.profiled(app_module.translate_text_endpoint)
+
+    with app_module.app.test_request_context('/api/translate-text', method='POST', json={'text': 'casa'}):
+        response = app_module.app.make_response(view())
+        assert 'X-Profile-Id' not in response.headers
+    with app_module.app.test_request_context('/api/translate-text', method='POST', json={'text': 'casa'},
+                                             headers={'X-Profile': '1'}):
+        response = view()
+    profile_id = response.headers['X-Profile-Id']
+    assert response.get_json()['profile_id'] == profile_id
+    assert response.get_json()['translation'] == 'yat'
+
+    listing = app_client.get('/api/profiles').get_json()
+    assert [metadata['id'] for metadata in listing['profiles']] == [profile_id]
+    assert listing['profiles'][0]['endpoint'] == '/api/translate-text'
+    download = app_client.get(f'/api/profiles/{profile_id}')
+    assert download.status_code == 200 and 'attachment' in download.headers['Content-Disposition']
+    assert 'cumulative' in app_client.get(f'/api/profiles/{profile_id}?format=text').get_data(as_text=True)
+    assert app_client.get('/api/profiles/no-existe').status_code == 404
@@ -0,0 +1,84 @@
+from collections import Counter
+
+import pytest
+
+import text_analysis
+from lexicon import Lexicon
+from text_analysis import TextAnalysis
+
+
+@pytest.fixture
+def calls(model, monkeypatch):
+    """Contar tokenizaciones, búsquedas en el léxico y clasificaciones de palabras del modelo"""
+    counter = Counter()
+    tokenize = text_analysis.tokenize
+    monkeypatch.setattr(text_analysis, 'tokenize', lambda text, *args: counter.update(['tokenize']) or
+                        tokenize(text, *args))
+    lexicon = model.lexicon
+    for name in ('translate', 'reverse_lookup', 'fuzzy_lookup'):
+        method = getattr(lexicon, name)
+        monkeypatch.setattr(lexicon, name, lambda word, *args, name=name, method=method:
+                            counter.update([(name, word)]) or method(word, *args))
+    detect_word_type = model.grammar_engine.detect_word_type
+    monkeypatch.setattr(model.grammar_engine, 'detect_word_type',
+                        lambda word: counter.update([('detect_word_type', word)]) or detect_word_type(word))
+    return counter
+
+
+def test_analysis_is_compact_and_memoizes_lookups(dictionary_path):
+    lexicon = Lexicon.from_file(dictionary_path)
+    analysis = TextAnalysis('Casa grande, buenos días', 'spanish', lexicon)
+    assert not hasattr(analysis, '__dict__')
+    assert [token.clean for token in analysis.tokens] == ['Casa', 'grande', 'buenos', 'días']
+    assert analysis.normalized() == ['casa', 'grande', 'buenos', 'días']
+    assert analysis.phrases() == {2: (4, 'buenos días')}
+
+    lookups = []
+    translate = lexicon.translate
+    lexicon.translate = lambda word: lookups.append(word) or translate(word)
+    assert analysis.lookup('casa') == analysis.lookup('casa') == 'yat'
+    assert analysis.inflected_lookup('casas', False, lambda word: 'yatwe') == 'yatwe'
+    assert analysis.inflected_lookup('casas', False, lambda word: 'otra') == 'yatwe'
+    assert lookups == ['casa']
+
+
+def test_analysis_keeps_the_lexicon_it_was_created_with(dictionary_path):
+    lexicon = Lexicon.from_file(dictionary_path)
+    analysis = TextAnalysis('perro casa', 'spanish', lexicon)
+    updated = lexicon.with_changes([{'op': 'set', 'key': 'perro', 'value': {'traduccion': 'alku'}}])
+    assert updated.translate('perro') == 'alku'
+    assert analysis.lookup('perro') is None
+
+
+def test_a_sentence_is_analyzed_once_across_all_rule_stages(model, calls):
+    result = model.translate('¿Dónde xqz wvk ayer?', 'spanish', 'nasa_yuwe')
+    assert result['method'] == 'enhanced_grammar'
+    # Diccionario, gramática contextual y gramática básica comparten tokens, búsquedas y clases
+    assert calls['tokenize'] == 1
+    assert all(count == 1 for key, count in calls.items() if key != 'tokenize')
+    assert [key[1] for key in calls if key[0] == 'detect_word_type'] == ['Dónde', 'xqz', 'wvk', 'ayer']
+
+
+def test_fuzzy_stage_reuses_the_analysis(model, calls):
+    result = model.translate('xqz wvk', 'nasa_yuwe', 'spanish')
+    assert result['method'] == 'fallback'
+    assert calls['tokenize'] == 1
+    assert calls[('reverse_lookup', 'xqz')] == calls[('fuzzy_lookup', 'xqz')] == 1
+
+
+def test_grammar_engine_reuses_only_matching_analyses(model):
+    engine = model.grammar_engine
+    analysis = TextAnalysis('casa', 'spanish', engine.lexicon)
+    assert engine.analyze('casa', 'spanish', analysis) is analysis
+    assert engine.analyze('agua', 'spanish', analysis) is not analysis
+    assert engine.analyze('casa', 'nasa_yuwe', analysis) is not analysis
+    other = TextAnalysis('casa', 'spanish', Lexicon(dict(engine.lexicon.entries)))
+    assert engine.analyze('casa', 'spanish', other) is not other
+
+    # enhance_translation guarda su resultado en el análisis
+    analysis = engine.analyze('casa grande', 'spanish')
+    first = engine.enhance_translation('casa grande', 'spanish', 'nasa_yuwe', analysis)
+    assert analysis.enhanced == {'nasa_yuwe': first}
+    analysis.classified = False
+    assert engine.enhance_translation('casa grande', 'spanish', 'nasa_yuwe', analysis) == first
+    assert not analysis.classified
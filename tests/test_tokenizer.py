@@ -0,0 +1,65 @@
+import types
+
+import grammar_engine
+from grammar_engine import ConjugationEngine
+from tokenizer import split_punctuation, split_sentences, tokenize
+
+
+def test_split_punctuation_keeps_leading_and_trailing_marks():
+    assert split_punctuation('¿Comes?') == ('¿', 'Comes', '?')
+    assert split_punctuation('"casa",') == ('"', 'casa', '",')
+    assert split_punctuation('yu\'') == ('', 'yu', '\'')
+    assert split_punctuation('...') == ('...', '', '')
+    assert split_punctuation('agua') == ('', 'agua', '')
+
+
+def test_tokenize_is_single_pass_with_positions_and_classes():
+    calls = []
+
+    def classify(word):
+        calls.append(word)
+        return 'verb' if word.endswith('er') else 'unknown'
+
+    tokens = tokenize('  ¡Comer  la casa!\n', classify)
+    assert [(token.surface, token.clean, token.leading, token.trailing, token.word_class, token.position)
+            for token in tokens] == [
+        ('¡Comer', 'Comer', '¡', '', 'verb', 0),
+        ('la', 'la', '', '', 'unknown', 1),
+        ('casa!', 'casa', '', '!', 'unknown', 2),
+    ]
+    assert calls == ['Comer', 'la', 'casa']
+    assert tokens[2].rebuild('yat') == 'yat!'
+    assert [token.word_class for token in tokenize('casa')] == [None]
+    assert tokenize('   ') == []
+
+
+def test_split_sentences_is_lazy_and_keeps_separators():
+    sentences = split_sentences('Hola. ¿Cómo estás?  Bien…\nAdiós')
+    assert isinstance(sentences, types.GeneratorType)
+    assert list(sentences) == [('Hola.', ' '), ('¿Cómo estás?', '  '), ('Bien…', '\n'), ('Adiós', '')]
+    assert list(split_sentences('Dijo "sí." Luego')) == [('Dijo "sí."', ' '), ('Luego', '')]
+    assert list(split_sentences('')) == []
+
+
+def test_split_sentences_cuts_long_sentences_at_spaces():
+    pieces = list(split_sentences('palabra ' * 30, max_length=50))
+    assert all(len(sentence) <= 50 for sentence, _ in pieces)
+    assert ' '.join(sentence for sentence, _ in pieces).split() == ['palabra'] * 30
+    assert list(split_sentences('x' * 12, max_length=5)) == [('xxxxx', ' '), ('xxxxx', ' '), ('xx', '')]
+
+
+def test_word_classes_are_memoized_and_bounded(dictionary_path, monkeypatch):
+    monkeypatch.setattr(grammar_engine, 'WORD_TYPE_CACHE_SIZE', 3)
+    engine = ConjugationEngine(dictionary_path)
+    assert engine.detect_word_type('comer') == 'verb'
+    assert engine.detect_word_type('canción') == 'noun'
+    assert engine.detect_word_type('amable') == 'adjective'
+    assert engine.detect_word_type('yat') == 'unknown'
+    assert len(engine.word_type_cache) <= 3
+    assert engine.detect_word_type('yat') == 'unknown'
+
+
+def test_enhance_translation_keeps_punctuation(dictionary_path):
+    engine = ConjugationEngine(dictionary_path)
+    assert engine.enhance_translation('¿casa grande?', 'spanish', 'nasa_yuwe') == '¿yat wala?'
+    assert engine.enhance_translation('agua, casa.', 'spanish', 'nasa_yuwe') == "yu', yat."
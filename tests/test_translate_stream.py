@@ -0,0 +1,67 @@
+import json
+
+import app as app_module
+
+
+def stream(client, text, **fields):
+    return client.post('/api/translate-stream', json=dict(fields, text=text), buffered=False)
+
+
+def test_sentences_are_streamed_in_order_with_a_final_line(app_client):
+    response = stream(app_client, 'Casa grande. ¿Agua?\nbuenos días')
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert [(line['index'], line['source'], line['separator']) for line in lines[:-1]] == [
+        (0, 'Casa grande.', ' '), (1, '¿Agua?', '\n'), (2, 'buenos días', '')]
+    # Cada oración se traduce igual que en /api/translate-text
+    assert [line['translation'] for line in lines[:-1]] == [
+        app_client.post('/api/translate-text', json={'text': line['source']}).get_json()['translation']
+        for line in lines[:-1]]
+    assert all('method' in line and 'confidence' in line for line in lines[:-1])
+    assert lines[-1] == {'status': 'success', 'done': True, 'sentences': 3}
+
+
+def test_each_line_is_sent_before_the_next_sentence_is_translated(app_client, monkeypatch):
+    model = app_module.get_translation_model()
+    translated = []
+    translate = model.translate
+    monkeypatch.setattr(model, 'translate',
+                        lambda sentence, *args, **kwargs: translated.append(sentence) or translate(sentence, *args, **kwargs))
+
+    response = stream(app_client, 'Casa. Grande. Agua.')
+    chunks = iter(response.response)
+    first = json.loads(next(chunks))
+    assert first['source'] == 'Casa.' and translated == ['Casa.']
+    assert len(list(chunks)) == 3
+    assert translated == ['Casa.', 'Grande.', 'Agua.']
+    response.close()
+
+
+def test_errors_are_reported_per_sentence(app_client, monkeypatch):
+    model = app_module.get_translation_model()
+    translate = model.translate
+
+    def failing(sentence, *args, **kwargs):
+        if sentence == 'Grande.':
+            raise RuntimeError('falló')
+        return translate(sentence, *args, **kwargs)
+
+    monkeypatch.setattr(model, 'translate', failing)
+    lines = [json.loads(line) for line in
+             stream(app_client, 'Casa. Grande. Agua.').get_data(as_text=True).splitlines()]
+    assert lines[1] == {'error': 'falló', 'index': 1, 'source': 'Grande.', 'separator': ' '}
+    assert lines[2]['translation'] == translate('Agua.', 'spanish', 'nasa_yuwe')['translation']
+    assert lines[-1]['sentences'] == 3
+
+
+def test_invalid_requests_return_a_single_error(app_client):
+    assert stream(app_client, '  ').get_json() == {'error': 'No se proporcionó texto para traducir'}
+    assert 'error' in stream(app_client, 'casa', target_lang='klingon').get_json()
+
+
+def test_timings_are_reported_per_sentence_when_requested(app_client):
+    lines = [json.loads(line) for line in
+             stream(app_client, 'Casa. Agua.', timings=True).get_data(as_text=True).splitlines()]
+    assert all('total' in line['timings'] for line in lines[:-1])
@@ -0,0 +1,74 @@
+import time
+
+from translation_cache import TranslationCache
+
+
+def make_result():
+    return {'translation': 'yat', 'method': 'dictionary',
+            'word_analysis': [{'word': 'casa', 'forms': ['yat']}], 'alternatives': ['yat']}
+
+
+def test_key_collapses_whitespace():
+    assert TranslationCache.make_key(' la  casa ', 'spanish', 'nasa_yuwe', 1) == \
+        TranslationCache.make_key('la casa', 'spanish', 'nasa_yuwe', 1)
+
+
+def test_nested_values_are_not_shared_with_callers():
+    cache = TranslationCache(max_size=4)
+    result = make_result()
+    cache.put('k', result)
+    # Modificar el original después de guardarlo no altera la caché
+    result['word_analysis'][0]['forms'].append('otra')
+    result['alternatives'].clear()
+
+    first = cache.get('k')
+    assert first == make_result()
+    first['word_analysis'].append({'word': 'x'})
+    first['alternatives'].append('x')
+    assert cache.get('k') == make_result()
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache = TranslationCache(max_size=2)
+    cache.put('a', {'translation': 'a'})
+    cache.put('b', {'translation': 'b'})
+    cache.get('a')
+    cache.put('c', {'translation': 'c'})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'translation': 'a'}
+    assert cache.stats()['evictions'] == 1
+
+    disabled = TranslationCache(max_size=0)
+    disabled.put('a', {'translation': 'a'})
+    assert disabled.get('a') is None
+
+
+def test_expiration_and_version_invalidation():
+    cache = TranslationCache(max_size=4, ttl=0.01)
+    cache.put('a', {'translation': 'a'})
+    time.sleep(0.02)
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+    cache = TranslationCache(max_size=4)
+    cache.sync_version(1)
+    cache.put('a', {'translation': 'a'})
+    cache.sync_version(1)
+    assert cache.get('a') is not None
+    cache.sync_version(2)
+    assert cache.get('a') is None
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_model_results_are_independent_copies(model):
+    first = model.translate('casa grande')
+    first['translation'] = 'cambiada'
+    first.setdefault('tried_methods', []).append('x')
+    second = model.translate('casa grande')
+    assert second['translation'] != 'cambiada'
+    assert 'x' not in second['tried_methods']
+    assert model.cache.stats()['hits'] == 1
+
+    results = model.translate_batch([{'text': 'casa'}, {'text': 'casa'}])
+    results[0]['tried_methods'].append('x')
+    assert 'x' not in results[1]['tried_methods']
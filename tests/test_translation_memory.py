@@ -0,0 +1,130 @@
+import json
+import random
+
+import pytest
+
+from translation_memory import (TranslationMemory, get_translation_memory, jaccard, normalize_sentence, same_words,
+                                shingles)
+
+SENTENCE = 'Como en la casa grande todos los días'
+TRANSLATION = 'ũuswe yat wala kiwe'
+NEGATED = 'No como en la casa grande todos los días'
+
+
+def test_normalize_sentence_ignores_case_and_surrounding_punctuation():
+    assert normalize_sentence('  ¿Cómo  estás, Amigo? ') == 'cómo estás amigo'
+    assert normalize_sentence('...') == ''
+    assert jaccard(shingles('casa'), shingles('casa')) == 1.0
+    assert jaccard(set(), set()) == 0.0
+
+
+def test_exact_and_near_lookups(tmp_path):
+    memory = TranslationMemory.from_file(str(tmp_path / 'memory.jsonl'))
+    assert memory.store('spanish', 'nasa_yuwe', SENTENCE, TRANSLATION)
+    assert not memory.store('spanish', 'nasa_yuwe', ' ¿? ', 'x')
+
+    match = memory.lookup('¡como en la CASA grande todos los días!', 'spanish', 'nasa_yuwe')
+    assert match == {'translation': TRANSLATION, 'source': SENTENCE, 'similarity': 1.0, 'exact': True}
+
+    match = memory.lookup('Comó en la casa grnde todos los dias', 'spanish', 'nasa_yuwe')
+    assert match['translation'] == TRANSLATION
+    assert not match['exact']
+    assert 0.8 <= match['similarity'] < 1.0
+
+    # Igual de parecidas, pero con palabras que cambian el sentido
+    assert jaccard(shingles(normalize_sentence(NEGATED)), shingles(normalize_sentence(SENTENCE))) >= 0.8
+    assert memory.lookup(NEGATED, 'spanish', 'nasa_yuwe') is None
+    assert not same_words('como en la casa grande todos los dias', 'como en la casa grande todas las noches')
+    assert not same_words('tengo 12 casas', 'tengo 13 casas')
+    assert not same_words('no como', 'ni como')
+
+    # Cada dirección tiene su propia memoria
+    assert memory.lookup(SENTENCE, 'nasa_yuwe', 'spanish') is None
+    assert memory.lookup('una oración completamente diferente', 'spanish', 'nasa_yuwe') is None
+
+
+def test_last_correction_wins_and_survives_reload(tmp_path):
+    path = str(tmp_path / 'memory.jsonl')
+    memory = TranslationMemory.from_file(path)
+    memory.store('spanish', 'nasa_yuwe', SENTENCE, 'primera')
+    version = memory.version
+    memory.store('spanish', 'nasa_yuwe', SENTENCE.upper(), 'segunda')
+    assert memory.version > version
+    assert len(memory) == 1
+    assert memory.lookup(SENTENCE, 'spanish', 'nasa_yuwe')['translation'] == 'segunda'
+
+    reloaded = TranslationMemory.from_file(path)
+    assert len(reloaded) == 1
+    assert reloaded.lookup(SENTENCE, 'spanish', 'nasa_yuwe')['translation'] == 'segunda'
+
+
+def test_other_writers_are_picked_up_on_refresh_and_store(tmp_path):
+    path = str(tmp_path / 'memory.jsonl')
+    first = TranslationMemory.from_file(path)
+    second = TranslationMemory.from_file(path)
+    first.store('spanish', 'nasa_yuwe', SENTENCE, 'del primero')
+    assert second.lookup(SENTENCE, 'spanish', 'nasa_yuwe') is None
+    # Al escribir, un proceso incorpora antes lo que anexaron los demás
+    second.store('spanish', 'nasa_yuwe', 'Otra oración distinta para la memoria', 'del segundo')
+    assert second.lookup(SENTENCE, 'spanish', 'nasa_yuwe')['translation'] == 'del primero'
+    first.refresh()
+    assert first.lookup('Otra oración distinta para la memoria', 'spanish', 'nasa_yuwe')['translation'] == 'del segundo'
+
+
+def test_interrupted_write_is_discarded_and_overwritten(tmp_path):
+    path = tmp_path / 'memory.jsonl'
+    record = {'source_lang': 'spanish', 'target_lang': 'nasa_yuwe', 'source': SENTENCE, 'translation': TRANSLATION}
+    path.write_text(json.dumps(record) + '\n' + '{"source_lang": "spa', encoding='utf-8')
+
+    memory = TranslationMemory.from_file(str(path))
+    assert len(memory) == 1
+    memory.store('spanish', 'nasa_yuwe', 'Otra oración distinta para la memoria', 'nueva')
+    lines = path.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[1])['translation'] == 'nueva'
+    assert len(TranslationMemory.from_file(str(path))) == 2
+
+
+def test_many_sentences_keep_near_lookups_after_index_rebuilds(tmp_path):
+    # Oraciones distintas entre sí: con casi todos los trigramas en común, más de MAX_CANDIDATES
+    # empatarían en todas las bandas y el resultado dependería de la semilla de hash()
+    rng = random.Random(0)
+    words = ['casa', 'grande', 'río', 'montaña', 'maíz', 'camino', 'fuego', 'luna', 'tierra', 'niño',
+             'mañana', 'canción', 'pájaro', 'árbol', 'piedra', 'noche', 'viento', 'agua', 'sol', 'flor']
+    sentences = [' '.join(rng.choice(words) for _ in range(8)) + f' {number}' for number in range(600)]
+    memory = TranslationMemory.from_file(str(tmp_path / 'memory.jsonl'))
+    for number, sentence in enumerate(sentences):
+        memory.add('spanish', 'nasa_yuwe', sentence, f't{number}')
+    query = normalize_sentence(sentences[321]).replace('í', 'i').replace('ñ', 'n').upper()
+    match = memory.lookup(query + '!', 'spanish', 'nasa_yuwe')
+    assert match['translation'] == 't321'
+    assert not match['exact']
+    assert get_translation_memory(str(tmp_path / 'memory.jsonl')) is get_translation_memory(str(tmp_path / 'memory.jsonl'))
+
+
+def test_model_returns_exact_and_near_sentences_without_the_rules(model, monkeypatch):
+    memory = model.memory
+    memory.store('spanish', 'nasa_yuwe', 'como en la casa grande', 'ũuswe yat wala kiwe')
+
+    result = model.translate('Como en la casa grande', 'spanish', 'nasa_yuwe')
+    assert result['method'] == 'translation_memory'
+    assert result['translation'] == 'ũuswe yat wala kiwe'
+    assert result['confidence'] == 0.95
+    assert result['memory_match'] == {'source': 'como en la casa grande', 'similarity': 1.0}
+
+    # Con una negación la oración sigue por las reglas, sin la corrección guardada
+    result = model.translate('no como en la casa grande', 'spanish', 'nasa_yuwe')
+    assert result['method'] != 'translation_memory'
+    assert result['translation'].startswith('no ')
+    assert 'memory_match' not in result and 'memory_suggestion' not in result
+
+    # Una oración parecida (tildes y un tipeo) se devuelve con menos confianza, sin reglas ni NLLB
+    monkeypatch.setattr(model, 'model_loaded', True)
+    monkeypatch.setattr(model, '_translate_with_dictionary', lambda *args, **kwargs: pytest.fail('reglas'))
+    monkeypatch.setattr(model, '_translate_with_nllb', lambda *args, **kwargs: pytest.fail('NLLB'))
+    result = model.translate('cómo en la casa grand', 'spanish', 'nasa_yuwe')
+    assert result['method'] == 'translation_memory'
+    assert result['translation'] == 'ũuswe yat wala kiwe'
+    assert result['confidence'] < 0.95
+    assert result['memory_match']['source'] == 'como en la casa grande'
+    assert result['memory_match']['similarity'] < 1.0
@@ -0,0 +1,83 @@
+from typing import Callable, Dict, List, Optional, Tuple
+from lexicon import Lexicon
+from tokenizer import Token, tokenize
+
+
+class TextAnalysis:
+    """
+    Análisis de un texto compartido por las etapas de una misma traducción.
+
+    El texto se tokeniza una sola vez al crear el objeto. Lo demás (formas
+    normalizadas, frases del léxico, búsquedas de palabras, clases de
+    palabra, contexto temporal y de pregunta y la traducción base del motor
+    gramatical) se calcula la primera vez que una etapa lo pide y las
+    siguientes lo reutilizan. Todas las consultas usan el léxico con el que
+    se creó el análisis, aunque entretanto se publique otra versión.
+    """
+
+    __slots__ = ('text', 'source_lang', 'lexicon', 'tokens', 'classified', 'temporal', 'question',
+                 'enhanced', '_normalized', '_phrases', '_lookups')
+
+    def __init__(self, text: str, source_lang: str, lexicon):
+        self.text = text
+        self.source_lang = source_lang
+        self.lexicon = lexicon
+        self.tokens = tokenize(text)
+        self.classified = False  # clases de palabra ya asignadas a los tokens
+        self.temporal = None  # detect_temporal_context
+        self.question = None  # detect_question_type
+        self.enhanced = {}  # idioma destino -> resultado de enhance_translation
+        self._normalized = None
+        self._phrases = {}
+        self._lookups = {}
+
+    def normalized(self) -> List[str]:
+        """Forma normalizada (clave del léxico) de cada token"""
+        if self._normalized is None:
+            self._normalized = [Lexicon.normalize(token.clean) for token in self.tokens]
+        return self._normalized
+
+    def phrases(self, reverse: bool = False) -> Dict[int, Tuple[int, str]]:
+        """Entradas de varias palabras: posición inicial -> (posición final, clave en español)"""
+        phrases = self._phrases.get(reverse)
+        if phrases is None:
+            phrases = self._phrases[reverse] = {
+                start: (end, spanish_word)
+                for start, end, spanish_word in self.lexicon.match_phrases(self.normalized(), reverse)
+            }
+        return phrases
+
+    def lookup(self, word: str, reverse: bool = False) -> Optional[str]:
+        """Traducción de una palabra (o la palabra en español si `reverse`), memorizada por texto"""
+        key = (word, reverse)
+        if key in self._lookups:
+            return self._lookups[key]
+        translation = self.lexicon.reverse_lookup(word) if reverse else self.lexicon.translate(word)
+        self._lookups[key] = translation
+        return translation
+
+    def fuzzy_lookup(self, word: str, reverse: bool = False) -> Optional[Tuple[str, str, int]]:
+        """Entrada más cercana a una palabra ausente (Lexicon.fuzzy_lookup), memorizada por texto"""
+        key = (word, reverse, 'fuzzy')
+        if key in self._lookups:
+            return self._lookups[key]
+        match = self.lexicon.fuzzy_lookup(word, reverse)
+        self._lookups[key] = match
+        return match
+
+    def inflected_lookup(self, word: str, reverse: bool, resolve: Callable[[str], Optional[str]]) -> Optional[str]:
+        """Traducción de una forma flexionada (plural, conjugación) con `resolve`, memorizada por texto"""
+        key = (word, reverse, 'inflected')
+        if key in self._lookups:
+            return self._lookups[key]
+        translation = resolve(word)
+        self._lookups[key] = translation
+        return translation
+
+    def classify(self, classify: Callable[[str], str]) -> List[Token]:
+        """Tokens con su clase de palabra (se asigna una sola vez)"""
+        if not self.classified:
+            for token in self.tokens:
+                token.word_class = classify(token.clean)
+            self.classified = True
+        return self.tokens
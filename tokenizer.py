@@ -0,0 +1,94 @@
+import re
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# Patrones precompilados (se compilan una sola vez al importar el módulo)
+TOKEN_PATTERN = re.compile(r'\S+')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+LEADING_PUNCTUATION_PATTERN = re.compile(r'^[^\w\s]+')
+TRAILING_PUNCTUATION_PATTERN = re.compile(r'[^\w\s]+$')
+
+# Oración: texto hasta un signo de cierre (con comillas o paréntesis de cierre) o un salto de línea,
+# seguida de los espacios que la separan de la siguiente
+SENTENCE_PATTERN = re.compile(r'\s*([^\n]*?(?:[.!?…]+["\'»”)\]]*(?=\s|$)|(?=\n)|$))(\s*)')
+
+# Longitud máxima de un segmento de traducción (NLLB trunca las entradas a 512 tokens)
+MAX_SENTENCE_LENGTH = 1000
+
+# Terminaciones usadas para clasificar palabras en español
+VERB_ENDING_PATTERN = re.compile(r'(ar|er|ir)$')
+NOUN_ENDING_PATTERN = re.compile(r'(ción|sión|dad|tad|eza|ura|ancia|encia)$')
+ADJECTIVE_ENDING_PATTERN = re.compile(r'(oso|osa|ivo|iva|able|ible|ante|ente)$')
+
+
+class Token:
+    """Palabra del texto de entrada con su puntuación y su clase gramatical"""
+
+    __slots__ = ('surface', 'clean', 'leading', 'trailing', 'word_class', 'position')
+
+    def __init__(self, surface: str, clean: str, leading: str, trailing: str,
+                 word_class: Optional[str], position: int):
+        self.surface = surface        # forma tal como aparece en el texto
+        self.clean = clean            # forma sin signos de puntuación
+        self.leading = leading        # puntuación inicial (p. ej. '¿', '¡', '"')
+        self.trailing = trailing      # puntuación final (p. ej. '?', ',', '.')
+        self.word_class = word_class  # 'verb', 'noun', 'adjective', 'unknown' o None
+        self.position = position      # índice de la palabra en el texto
+
+    def rebuild(self, translation: str) -> str:
+        """Reconstruir la palabra traducida conservando su puntuación"""
+        return self.leading + translation + self.trailing
+
+    def __repr__(self):
+        return f"Token({self.surface!r}, clean={self.clean!r}, class={self.word_class!r})"
+
+
+def split_punctuation(word: str):
+    """Separar una palabra en (puntuación inicial, forma limpia, puntuación final)"""
+    clean = NON_WORD_PATTERN.sub('', word)
+    if not clean:
+        # Palabras formadas solo por signos: se conservan completas
+        return word, '', ''
+
+    leading_match = LEADING_PUNCTUATION_PATTERN.search(word)
+    trailing_match = TRAILING_PUNCTUATION_PATTERN.search(word)
+    leading = leading_match.group(0) if leading_match else ''
+    trailing = trailing_match.group(0) if trailing_match else ''
+    return leading, clean, trailing
+
+
+def split_sentences(text: str, max_length: int = MAX_SENTENCE_LENGTH) -> Iterator[Tuple[str, str]]:
+    """
+    Recorrer el texto oración por oración: (oración, separador que la sigue).
+
+    Es un generador: no construye la lista completa de oraciones. Las
+    oraciones más largas que `max_length` se parten en el último espacio
+    antes del límite.
+    """
+    for match in SENTENCE_PATTERN.finditer(text):
+        sentence, separator = match.group(1), match.group(2)
+        if not sentence:
+            continue
+        while len(sentence) > max_length:
+            cut = sentence.rfind(' ', 0, max_length)
+            if cut <= 0:
+                cut = max_length
+            yield sentence[:cut], ' '
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            yield sentence, separator
+
+
+def tokenize(text: str, classify: Optional[Callable[[str], str]] = None) -> List[Token]:
+    """
+    Recorrer el texto una sola vez y devolver sus tokens.
+
+    Si se proporciona `classify`, se usa para asignar la clase gramatical de
+    cada forma limpia (el clasificador se encarga de memorizar sus resultados).
+    """
+    tokens = []
+    for position, match in enumerate(TOKEN_PATTERN.finditer(text)):
+        surface = match.group(0)
+        leading, clean, trailing = split_punctuation(surface)
+        word_class = classify(clean) if classify else None
+        tokens.append(Token(surface, clean, leading, trailing, word_class, position))
+    return tokens
@@ -0,0 +1,106 @@
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class TranslationCache:
+    """
+    Caché LRU con expiración (TTL) para resultados de traducción.
+
+    Las claves incluyen la versión del léxico; cuando la versión cambia
+    (por /add_word o /api/feedback) la caché se vacía automáticamente.
+    Los resultados se guardan y se entregan como copias profundas: las
+    listas anidadas (word_analysis, alternatives...) nunca se comparten
+    con los llamadores.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 3600):
+        self.max_size = max_size  # 0 desactiva la caché
+        self.ttl = ttl            # segundos; 0 o None = sin expiración
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(text: str, source_lang: str, target_lang: str, version: Hashable,
+                 profile: Optional[str] = None) -> Tuple:
+        """Clave normalizada (espacios colapsados) + dirección + versión del léxico + perfil de NLLB"""
+        return (' '.join(text.split()), source_lang, target_lang, version, profile)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def sync_version(self, version: Hashable):
+        """Vaciar la caché si la versión del léxico cambió"""
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+
+    def get(self, key: Hashable) -> Optional[Dict]:
+        """Obtener un resultado; devuelve una copia profunda o None si no está o expiró"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # El valor guardado no se modifica nunca: se copia fuera del bloqueo
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Dict):
+        """Guardar un resultado, desalojando los menos usados si se supera el límite"""
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Estadísticas de uso para /api/model-info"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
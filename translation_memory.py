@@ -0,0 +1,371 @@
+import os
+import re
+import json
+import logging
+import heapq
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+from fuzzy_index import allowed_distance, edit_distance, fold
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializan los hilos del proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Similitud mínima (Jaccard de trigramas de caracteres sin tildes) para usar una oración parecida
+MIN_SIMILARITY = 0.8
+
+# Palabras que invierten el sentido: una oración parecida no se usa si difiere en alguna de ellas
+NEGATION_WORDS = frozenset({'no', 'ni', 'nunca', 'jamas', 'tampoco', 'nada', 'nadie', 'ningun', 'ninguno',
+                            'ninguna', 'sin'})
+
+# MinHash de una permutación: casillas de la firma y filas por banda del índice LSH
+SHINGLE_SIZE = 3
+SIGNATURE_BINS = 24
+BAND_ROWS = 4
+# Candidatos que se comparan como máximo en una búsqueda aproximada
+MAX_CANDIDATES = 32
+# Claves de banda agregadas desde la última reconstrucción a partir de las cuales se reconstruye
+# el índice ordenado (como mínimo; también al superar 1/8 de su tamaño)
+REBUILD_THRESHOLD = 4096
+
+# Puntuación al comienzo o al final de cada palabra, y diacríticos combinantes tras NFD
+EDGE_PUNCTUATION_PATTERN = re.compile(r'(?<!\S)[^\w\s]+|[^\w\s]+(?!\S)')
+COMBINING_MARKS_PATTERN = re.compile('[\u0300-\u036f]')
+
+_HASH_MASK = (1 << 64) - 1
+_EMPTY_BIN = _HASH_MASK
+# Cada entrada del índice ordenado empaqueta 40 bits de la clave de banda y 24 del id del par
+_ID_BITS = 24
+_ID_MASK = (1 << _ID_BITS) - 1
+_BAND_MASK = (1 << (64 - _ID_BITS)) - 1
+
+
+def normalize_sentence(text: str) -> str:
+    """Oración en minúsculas, con espacios simples y sin la puntuación que rodea cada palabra"""
+    return ' '.join(EDGE_PUNCTUATION_PATTERN.sub('', text.casefold()).split())
+
+
+def shingles(normalized: str) -> Set[str]:
+    """Trigramas de caracteres de la forma sin tildes (con los bordes de la oración)"""
+    padded = ' ' + COMBINING_MARKS_PATTERN.sub('', unicodedata.normalize('NFD', normalized)) + ' '
+    return {padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+def signature(shingle_set: Set[str], bins: int = SIGNATURE_BINS) -> List[int]:
+    """
+    Firma MinHash de una sola permutación: cada trigrama se dispersa una vez,
+    cae en una casilla y la casilla guarda el menor valor. Las casillas vacías
+    (oraciones cortas) toman el valor de la siguiente ocupada más un
+    desplazamiento por la distancia, para que dos firmas solo coincidan en
+    ellas si también coinciden las casillas de las que provienen.
+    """
+    values = [_EMPTY_BIN] * bins
+    # hash() de str (SipHash) se calcula una vez por cadena y es el mismo en los workers de un fork
+    for h in map(hash, shingle_set):
+        h &= _HASH_MASK
+        slot = h % bins
+        if h < values[slot]:
+            values[slot] = h
+    if _EMPTY_BIN in values:
+        if all(value == _EMPTY_BIN for value in values):
+            return values
+        for i in range(bins):
+            if values[i] == _EMPTY_BIN:
+                distance = 1
+                while values[(i + distance) % bins] == _EMPTY_BIN:
+                    distance += 1
+                # El valor prestado se marca con la distancia (no cambia la casilla original)
+                values[i] = ~(values[(i + distance) % bins] * bins + distance) & _HASH_MASK
+    return values
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def same_words(query: str, source: str) -> bool:
+    """
+    Si dos oraciones normalizadas tienen las mismas palabras salvo tildes y
+    tipeos (la distancia que tolera el índice aproximado del léxico). Las
+    palabras agregadas, quitadas o reemplazadas, los números distintos y las
+    negaciones pueden cambiar el sentido, así que no se toleran.
+    """
+    query_words, source_words = query.split(), source.split()
+    if len(query_words) != len(source_words):
+        return False
+    for query_word, source_word in zip(map(fold, query_words), map(fold, source_words)):
+        if query_word == source_word:
+            continue
+        if query_word in NEGATION_WORDS or source_word in NEGATION_WORDS:
+            return False
+        if any(char.isdigit() for char in query_word + source_word):
+            return False
+        max_distance = allowed_distance(min(len(query_word), len(source_word)))
+        if edit_distance(query_word, source_word, max_distance) > max_distance:
+            return False
+    return True
+
+
+class TranslationMemory:
+    """
+    Memoria de traducción de oraciones corregidas por los usuarios.
+
+    Los pares (oración original, traducción corregida) de cada dirección se
+    anexan a un archivo JSONL (`translation_memory.jsonl` junto al
+    diccionario) bajo un bloqueo de archivo; al cargarlo, la última
+    corrección de cada oración gana. En memoria:
+
+    - Coincidencia exacta: un diccionario por la forma normalizada de la
+      oración (sin mayúsculas ni puntuación alrededor de las palabras).
+    - Coincidencia aproximada: firma MinHash de los trigramas de caracteres
+      sin tildes, dividida en bandas (LSH). Solo las oraciones que comparten
+      alguna banda se comparan con la similitud de Jaccard exacta, así que
+      el costo de una búsqueda no depende del tamaño de la memoria.
+
+    Las claves de banda se guardan empaquetadas con el id del par en un
+    arreglo ordenado (8 bytes cada una, se buscan por bisección); las
+    agregadas después de la carga van a un diccionario pequeño que se mezcla
+    con el arreglo al crecer. Las escrituras se serializan con un bloqueo y
+    el arreglo y las tuplas de los cubos se reemplazan en lugar de
+    modificarse, de modo que las búsquedas no se bloquean. `version` aumenta
+    con cada cambio para invalidar la caché de traducciones.
+    """
+
+    def __init__(self, memory_path: Optional[str] = None, min_similarity: float = MIN_SIMILARITY,
+                 bins: int = SIGNATURE_BINS, band_rows: int = BAND_ROWS):
+        self.memory_path = memory_path
+        self.min_similarity = min_similarity
+        self.bins = bins
+        self.band_rows = band_rows
+        self.version = 0
+        self._exact = {}     # 'origen>destino:oración normalizada' -> id
+        self._pairs = []     # id -> (oración original, traducción)
+        # Índice LSH: claves de banda empaquetadas y ordenadas, más un diccionario con las
+        # agregadas desde la última reconstrucción (clave de banda -> id o tupla de ids)
+        self._index = array('Q')
+        self._recent = {}
+        self._staged = None  # claves empaquetadas durante la carga inicial (se ordenan una vez)
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, memory_path: str, **kwargs) -> 'TranslationMemory':
+        """Cargar la memoria desde su archivo (vacía si aún no existe)"""
+        memory = cls(memory_path, **kwargs)
+        memory._staged = array('Q')
+        memory.refresh()
+        memory._index = array('Q', sorted(memory._staged))
+        memory._staged = None
+        if len(memory):
+            logger.info(f"Memoria de traducción cargada: {len(memory)} oraciones")
+        return memory
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Exclusión entre hilos y, con fcntl, entre procesos"""
+        with self._file_lock:
+            if fcntl is None:
+                yield
+                return
+            directory = os.path.dirname(self.memory_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.memory_path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_appended(self):
+        """Agregar los pares completos anexados al archivo desde la última lectura"""
+        try:
+            f = open(self.memory_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(self._offset)
+            for line in f:
+                # Una línea sin salto final es una escritura interrumpida: se descarta
+                if not line.endswith(b'\n'):
+                    break
+                self._offset += len(line)
+                try:
+                    record = json.loads(line)
+                    self.add(record['source_lang'], record['target_lang'], record['source'], record['translation'])
+                except (ValueError, KeyError, TypeError):
+                    logger.warning("Línea inválida en la memoria de traducción, se ignora")
+
+    def changed_on_disk(self) -> bool:
+        """Si el archivo tiene datos que aún no se leyeron (p. ej. de otro proceso); solo consulta su tamaño"""
+        if self.memory_path is None:
+            return False
+        try:
+            return os.path.getsize(self.memory_path) != self._offset
+        except FileNotFoundError:
+            return False
+
+    def refresh(self):
+        """Incorporar los pares anexados al archivo (al cargar, también los de otros procesos)"""
+        if self.memory_path is None:
+            return
+        with self._file_lock:
+            self._load_appended()
+
+    def _bands(self, source_lang: str, target_lang: str, normalized: str) -> List[int]:
+        """Claves de las bandas de la firma de una oración (40 bits, dependen de la dirección)"""
+        values = signature(shingles(normalized), self.bins)
+        if values[0] == _EMPTY_BIN:
+            return []
+        rows = self.band_rows
+        return [hash((source_lang, target_lang, band) + tuple(values[band * rows:(band + 1) * rows])) & _BAND_MASK
+                for band in range(self.bins // rows)]
+
+    def _rebuild_index(self):
+        """Pasar las claves recientes al índice ordenado (requiere el bloqueo de escritura)"""
+        recent = sorted(band << _ID_BITS | pair_id for band, bucket in self._recent.items()
+                        for pair_id in ((bucket,) if isinstance(bucket, int) else bucket))
+        # Mezcla en un solo recorrido, sin copiar el índice a una lista de enteros
+        index = array('Q', heapq.merge(self._index, recent))
+        # Se publica el índice nuevo antes de vaciar las recientes: una búsqueda nunca pierde claves
+        self._index = index
+        self._recent = {}
+
+    def _candidates(self, bands: List[int]) -> Dict[int, int]:
+        """Ids de los pares que comparten alguna banda, con el número de bandas compartidas"""
+        index, recent = self._index, self._recent
+        votes = {}
+        for band in bands:
+            position = bisect_left(index, band << _ID_BITS)
+            while position < len(index) and index[position] >> _ID_BITS == band:
+                pair_id = index[position] & _ID_MASK
+                votes[pair_id] = votes.get(pair_id, 0) + 1
+                position += 1
+            bucket = recent.get(band)
+            if bucket is not None:
+                for pair_id in ((bucket,) if isinstance(bucket, int) else bucket):
+                    votes[pair_id] = votes.get(pair_id, 0) + 1
+        return votes
+
+    def add(self, source_lang: str, target_lang: str, source: str, translation: str):
+        """Agregar (o reemplazar) en memoria la traducción de una oración"""
+        normalized = normalize_sentence(source)
+        if not normalized:
+            return
+        key = f'{source_lang}>{target_lang}:{normalized}'
+        with self._lock:
+            pair_id = self._exact.get(key)
+            if pair_id is not None:
+                # Misma forma normalizada: mismas bandas, solo cambia la traducción
+                self._pairs[pair_id] = (source, translation)
+            else:
+                pair_id = len(self._pairs)
+                if pair_id > _ID_MASK:
+                    raise ValueError("La memoria de traducción admite como máximo 2^24 oraciones")
+                self._pairs.append((source, translation))
+                self._exact[key] = pair_id
+                bands = self._bands(source_lang, target_lang, normalized)
+                if self._staged is not None:
+                    self._staged.extend(band << _ID_BITS | pair_id for band in bands)
+                else:
+                    recent = self._recent
+                    for band in bands:
+                        bucket = recent.get(band)
+                        if bucket is None:
+                            recent[band] = pair_id
+                        elif isinstance(bucket, int):
+                            recent[band] = (bucket, pair_id)
+                        else:
+                            recent[band] = bucket + (pair_id,)
+                    if len(recent) >= max(REBUILD_THRESHOLD, len(self._index) // 8):
+                        self._rebuild_index()
+            self.version += 1
+
+    def store(self, source_lang: str, target_lang: str, source: str, translation: str) -> bool:
+        """Anexar una corrección al archivo (con fsync) y agregarla; False si la oración está vacía"""
+        if not normalize_sentence(source):
+            return False
+        record = {'source_lang': source_lang, 'target_lang': target_lang,
+                  'source': source, 'translation': translation}
+        data = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._locked():
+            # Primero lo que anexaron otros procesos, para que la última corrección gane
+            self._load_appended()
+            with open(self.memory_path, 'ab') as f:
+                # Descartar una línea incompleta que haya dejado una escritura interrumpida
+                if f.tell() > self._offset:
+                    f.truncate(self._offset)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            self._offset += len(data)
+            self.add(source_lang, target_lang, source, translation)
+        return True
+
+    def lookup(self, text: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """
+        Traducción guardada de la oración idéntica o de la más parecida con
+        similitud de al menos `min_similarity` y las mismas palabras (ver
+        same_words), como {'translation', 'source', 'similarity', 'exact'};
+        None si no hay ninguna. `exact` indica una coincidencia de la forma
+        normalizada completa.
+        """
+        normalized = normalize_sentence(text)
+        if not normalized:
+            return None
+        pairs = self._pairs
+        pair_id = self._exact.get(f'{source_lang}>{target_lang}:{normalized}')
+        if pair_id is not None:
+            source, translation = pairs[pair_id]
+            return {'translation': translation, 'source': source, 'similarity': 1.0, 'exact': True}
+
+        # Candidatos ordenados por bandas compartidas (una estimación de la similitud)
+        votes = self._candidates(self._bands(source_lang, target_lang, normalized))
+        if not votes:
+            return None
+
+        query = shingles(normalized)
+        best, best_similarity = None, self.min_similarity
+        for candidate in sorted(votes, key=votes.get, reverse=True)[:MAX_CANDIDATES]:
+            source, translation = pairs[candidate]
+            candidate = normalize_sentence(source)
+            candidate_shingles = shingles(candidate)
+            # Jaccard no puede superar el cociente entre los tamaños de ambos conjuntos
+            if min(len(query), len(candidate_shingles)) < best_similarity * max(len(query), len(candidate_shingles)):
+                continue
+            similarity = jaccard(query, candidate_shingles)
+            if similarity >= best_similarity and same_words(normalized, candidate):
+                best, best_similarity = (source, translation), similarity
+        if best is None:
+            return None
+        return {'translation': best[1], 'source': best[0], 'similarity': round(best_similarity, 3), 'exact': False}
+
+
+_memories = {}
+_memories_lock = threading.Lock()
+
+
+def get_translation_memory(memory_path: str = os.path.join('data', 'translation_memory.jsonl')) -> TranslationMemory:
+    """Obtener la memoria de traducción compartida, cargándola la primera vez que se solicita"""
+    key = os.path.abspath(memory_path)
+    with _memories_lock:
+        memory = _memories.get(key)
+        if memory is None:
+            memory = TranslationMemory.from_file(memory_path)
+            _memories[key] = memory
+        return memory
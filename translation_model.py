@@ -1,26 +1,105 @@
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-import torch
 import os
-import json
-from typing import Dict
+import copy
+import threading
+from typing import Dict, List, Optional
 from grammar_engine import ConjugationEngine
+from lexicon import Lexicon, get_lexicon
+from text_analysis import TextAnalysis
+from translation_cache import TranslationCache
+from translation_memory import get_translation_memory
+from metrics import NLLB_BATCH_SECONDS, StageTimer, direction_label, observe_translation
+from nllb_scheduler import InferenceScheduler
 import logging
 
+# Máximo de textos por llamada a generate y espera máxima (s) para formar un micro-lote
+NLLB_BATCH_SIZE = 32
+NLLB_MAX_WAIT = 0.01
+
+# Ruta del modelo NLLB-200 y frase usada para calentarlo tras la carga
+NLLB_MODEL_PATH = "models/nllb-200-distilled-600M"
+NLLB_WARMUP_TEXT = "Hola, ¿cómo estás?"
+
+# Perfiles de inferencia de NLLB para CPU:
+# - precision: pesos en 'float32', 'bfloat16' o 'int8' (cuantización dinámica de capas lineales)
+# - num_beams: 1 = decodificación voraz
+# - max_length_ratio/offset: tope de longitud de salida relativo a la entrada (None = 512 fijo)
+INFERENCE_PROFILES = {
+    'quality': {'precision': 'float32', 'num_beams': 5, 'max_length_ratio': None, 'max_length_offset': 0},
+    'balanced': {'precision': 'int8', 'num_beams': 2, 'max_length_ratio': 2.0, 'max_length_offset': 10},
+    'fast': {'precision': 'int8', 'num_beams': 1, 'max_length_ratio': 1.5, 'max_length_offset': 8},
+    'bf16': {'precision': 'bfloat16', 'num_beams': 2, 'max_length_ratio': 2.0, 'max_length_offset': 10}
+}
+DEFAULT_INFERENCE_PROFILE = 'quality'
+
+# Confianza del diccionario: coincidencias exactas y aproximadas según su distancia sin tildes
+DICTIONARY_CONFIDENCE = 0.80
+FUZZY_CONFIDENCE = {0: 0.70, 1: 0.60, 2: 0.50}
+# Confianza de la memoria de traducción (oraciones corregidas por usuarios): idénticas y muy parecidas
+MEMORY_CONFIDENCE = 0.95
+NEAR_MEMORY_CONFIDENCE = 0.85
+NLLB_MAX_LENGTH = 512
+
+class PendingTranslation:
+    """
+    Texto que solo NLLB puede traducir, devuelto por translate con
+    allow_nllb=False. Conserva lo ya calculado (clave de caché y tiempos
+    de las etapas de reglas) para que finish_translation lo complete sin
+    repetir esas etapas.
+    """
+    
+    __slots__ = ('text', 'source_lang', 'target_lang', 'profile', 'cache_key', 'timer')
+    
+    def __init__(self, text: str, source_lang: str, target_lang: str, profile: str, cache_key,
+                 timer: StageTimer):
+        self.text = text
+        self.source_lang = source_lang
+        self.target_lang = target_lang
+        self.profile = profile
+        self.cache_key = cache_key
+        self.timer = timer
+
 class AdvancedTranslationModel:
     """
     Modelo de traducción avanzado que combina:
     1. Modelo NLLB-200 para traducción contextual
     2. Diccionario personalizado para términos específicos
     3. Motor gramatical para reglas del Nasa Yuwe
+    4. Memoria de traducción con las oraciones corregidas por los usuarios
+    
+    El diccionario y el motor gramatical quedan disponibles al construir el
+    objeto. NLLB (torch/transformers) se importa y carga de forma diferida:
+    en un hilo en segundo plano ('background', por defecto), de forma
+    síncrona ('sync') o nunca (None).
     """
     
-    def __init__(self, dictionary_path='data/nasa_yuwe_dictionary.json'):
+    def __init__(self, dictionary_path='data/nasa_yuwe_dictionary.json', cache_size=1024, cache_ttl=3600,
+                 nllb_loading='background', nllb_max_batch_size=NLLB_BATCH_SIZE, nllb_max_wait=NLLB_MAX_WAIT,
+                 inference_profile=DEFAULT_INFERENCE_PROFILE, memory_path=None):
+        if inference_profile not in INFERENCE_PROFILES:
+            raise ValueError(f"Perfil de inferencia desconocido: {inference_profile}")
         self.dictionary_path = dictionary_path
+        # La memoria de traducción vive junto al diccionario
+        self.memory_path = memory_path or os.path.join(os.path.dirname(dictionary_path), 'translation_memory.jsonl')
+        self.inference_profile = inference_profile
+        self.precision = None
         self.model = None
         self.tokenizer = None
+        self.device = None
+        self.lexicon = None
         self.dictionary = {}
         self.grammar_engine = None
+        self.memory = None
         self.model_loaded = False
+        self.cache = TranslationCache(cache_size, cache_ttl)
+        # Todas las llamadas a NLLB pasan por el planificador de micro-lotes
+        self.scheduler = InferenceScheduler(self._run_nllb_batch, nllb_max_batch_size, nllb_max_wait)
+        self.nllb_ready = threading.Event()
+        self.component_status = {
+            'dictionary': 'loading',
+            'grammar_engine': 'pending',
+            'translation_memory': 'pending',
+            'nllb': 'pending'
+        }
         
         # Configurar logging
         logging.basicConfig(level=logging.INFO)
@@ -29,49 +108,159 @@ class AdvancedTranslationModel:
         # Inicializar componentes
         self._load_dictionary()
         self._initialize_grammar_engine()
-        self._load_nllb_model()
+        self._load_translation_memory()
+        self.start_nllb_loading(nllb_loading)
     
     def _load_dictionary(self):
-        """Cargar el diccionario personalizado de Nasa Yuwe"""
+        """Obtener el léxico compartido de Nasa Yuwe (se carga una vez por proceso)"""
         try:
-            if os.path.exists(self.dictionary_path):
-                with open(self.dictionary_path, 'r', encoding='utf-8') as f:
-                    self.dictionary = json.load(f)
-                self.logger.info(f"Diccionario cargado: {len(self.dictionary)} entradas")
-            else:
-                self.logger.warning("Diccionario no encontrado, usando diccionario vacío")
+            self.lexicon = get_lexicon(self.dictionary_path)
+            self.dictionary = self.lexicon.entries
+            self.component_status['dictionary'] = 'ready'
+            self.logger.info(f"Diccionario cargado: {len(self.dictionary)} entradas")
         except Exception as e:
+            self.component_status['dictionary'] = 'error'
             self.logger.error(f"Error cargando diccionario: {e}")
     
     def _initialize_grammar_engine(self):
         """Inicializar el motor gramatical"""
         try:
-            self.grammar_engine = ConjugationEngine(self.dictionary_path)
+            self.grammar_engine = ConjugationEngine(self.dictionary_path, lexicon=self.lexicon)
+            self.component_status['grammar_engine'] = 'ready'
             self.logger.info("Motor gramatical inicializado")
         except Exception as e:
+            self.component_status['grammar_engine'] = 'error'
             self.logger.error(f"Error inicializando motor gramatical: {e}")
     
+    def _load_translation_memory(self):
+        """Obtener la memoria de traducción compartida (se carga una vez por proceso)"""
+        try:
+            self.memory = get_translation_memory(self.memory_path)
+            self.component_status['translation_memory'] = 'ready'
+            self.logger.info(f"Memoria de traducción cargada: {len(self.memory)} oraciones")
+        except Exception as e:
+            self.component_status['translation_memory'] = 'error'
+            self.logger.error(f"Error cargando memoria de traducción: {e}")
+    
+    def apply_lexicon_update(self, lexicon: Lexicon, operations: List[Dict]):
+        """
+        Publicar una nueva versión del léxico sin reiniciar (ni recargar NLLB).
+        
+        El motor gramatical se reconstruye por copia y luego se intercambian
+        las referencias; las traducciones en curso terminan con la versión que
+        ya tenían y ningún lector se bloquea.
+        """
+        engine = self.grammar_engine.with_lexicon(lexicon, operations) if self.grammar_engine else None
+        if engine is not None:
+            self.grammar_engine = engine
+        self.lexicon = lexicon
+        self.dictionary = lexicon.entries
+        self.logger.info(f"Léxico actualizado en memoria: versión {lexicon.version}, {len(lexicon)} entradas")
+    
+    def start_nllb_loading(self, mode='background'):
+        """Iniciar la carga de NLLB: 'background' (hilo), 'sync' o None (no cargar)"""
+        if mode is None:
+            self.component_status['nllb'] = 'disabled'
+            self.nllb_ready.set()
+        elif mode == 'sync':
+            self._load_nllb_model()
+        else:
+            thread = threading.Thread(target=self._load_nllb_model, name='nllb-loader', daemon=True)
+            thread.start()
+    
+    def wait_until_ready(self, timeout=None) -> bool:
+        """Esperar a que termine la carga de NLLB (con éxito o no)"""
+        return self.nllb_ready.wait(timeout)
+    
     def _load_nllb_model(self):
-        """Cargar el modelo NLLB-200 si está disponible"""
-        model_path = "models/nllb-200-distilled-600M"
+        """Cargar y calentar el modelo NLLB-200 si está disponible"""
+        model_path = NLLB_MODEL_PATH
         
         try:
             if os.path.exists(model_path):
+                self.component_status['nllb'] = 'loading'
                 self.logger.info("Cargando modelo NLLB-200...")
+                # Importaciones pesadas diferidas hasta que realmente se necesitan
+                from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+                import torch
+                
                 self.tokenizer = AutoTokenizer.from_pretrained(model_path)
                 self.model = AutoModelForSeq2SeqLM.from_pretrained(model_path)
                 
                 # Configurar dispositivo (CPU/GPU)
                 self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
                 self.model.to(self.device)
+                self.model.eval()
+                
+                # Precisión de los pesos según el perfil de la implantación
+                self._apply_precision(INFERENCE_PROFILES[self.inference_profile]['precision'])
+                
+                # Calentar el modelo con una generación antes de aceptar tráfico
+                self.component_status['nllb'] = 'warming_up'
+                self._generate([NLLB_WARMUP_TEXT], 'spanish', 'spanish')
                 
                 self.model_loaded = True
+                self.component_status['nllb'] = 'ready'
                 self.logger.info(f"Modelo NLLB-200 cargado en {self.device}")
             else:
+                self.component_status['nllb'] = 'unavailable'
                 self.logger.warning("Modelo NLLB-200 no encontrado, usando solo diccionario")
         except Exception as e:
+            self.component_status['nllb'] = 'error'
             self.logger.error(f"Error cargando modelo NLLB-200: {e}")
             self.model_loaded = False
+        finally:
+            self.nllb_ready.set()
+    
+    def _apply_precision(self, precision: str):
+        """Convertir los pesos a bf16 o cuantizar las capas lineales a int8"""
+        import torch
+        
+        if precision == 'int8':
+            if self.device.type != 'cpu':
+                self.logger.warning("La cuantización int8 dinámica solo está disponible en CPU; se usa float32")
+                precision = 'float32'
+            else:
+                self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif precision == 'bfloat16':
+            self.model = self.model.to(dtype=torch.bfloat16)
+        
+        self.precision = precision
+        self.logger.info(f"Precisión de NLLB: {precision}")
+    
+    def share_memory(self) -> bool:
+        """
+        Mover los pesos de NLLB a memoria compartida antes de crear workers.
+        
+        Con la copia en escritura de fork bastaría una escritura en la misma
+        página (contadores, alojador) para duplicarla en un worker; en memoria
+        compartida las páginas de los tensores no se duplican nunca. Devuelve
+        False si NLLB no está cargado o no está en CPU.
+        """
+        if not self.model_loaded or self.device.type != 'cpu':
+            return False
+        self.model.share_memory()
+        self.logger.info("Pesos de NLLB movidos a memoria compartida")
+        return True
+    
+    def resolve_profile(self, profile: Optional[str] = None) -> str:
+        """Perfil efectivo de una petición (por defecto, el de la implantación)"""
+        if profile is None:
+            return self.inference_profile
+        if profile not in INFERENCE_PROFILES:
+            raise ValueError(f"Perfil de inferencia desconocido: {profile}")
+        return profile
+    
+    def get_readiness(self) -> Dict:
+        """Estado de preparación por componente para /api/ready"""
+        components = dict(self.component_status)
+        return {
+            # Listo para atender tráfico con diccionario y gramática
+            'ready': components['dictionary'] == 'ready' and components['grammar_engine'] == 'ready',
+            # NLLB terminó de cargar (o no está disponible)
+            'nllb_settled': self.nllb_ready.is_set(),
+            'components': components
+        }
     
     def _get_language_code(self, lang):
         """Obtener códigos de idioma para NLLB"""
@@ -81,86 +270,184 @@ class AdvancedTranslationModel:
         }
         return language_codes.get(lang, 'spa_Latn')
     
-    def _translate_with_dictionary(self, text, source_lang, target_lang):
-        """Traducción usando el diccionario personalizado"""
-        if not self.dictionary:
-            return None
+    def _translate_with_dictionary(self, text, source_lang, target_lang, analysis=None, fuzzy=False):
+        """
+        Traducción usando el diccionario personalizado.
+        
+        Las palabras ausentes se aproximan con el índice aproximado del léxico
+        solo junto a palabras reconocidas por las reglas (entradas, frases y
+        formas flexionadas); un resultado hecho solo de aproximaciones se
+        devuelve únicamente con `fuzzy`, cuando ya fallaron las demás etapas.
+        """
+        if analysis is None:
+            # Una sola lectura de la referencia: toda la traducción usa la misma versión del léxico
+            lexicon = self.lexicon
+            if not lexicon:
+                return None
+            analysis = TextAnalysis(text, source_lang, lexicon)
+        lexicon = analysis.lexicon
             
-        words = text.lower().split()
+        if source_lang == 'spanish' and target_lang == 'nasa_yuwe':
+            reverse = False
+        elif source_lang == 'nasa_yuwe' and target_lang == 'spanish':
+            # Usar el índice inverso del léxico compartido
+            reverse = True
+        else:
+            return None
+        
+        # Plurales y conjugaciones con el motor gramatical del mismo léxico
+        grammar_engine = self.grammar_engine
+        inflected = None
+        if grammar_engine is not None and grammar_engine.lexicon is lexicon:
+            inflected = lambda word: grammar_engine.translate_inflected_form(word, source_lang)
+        
+        tokens = analysis.tokens
         translated_words = []
         found_translations = False
+        fuzzy_matches = []
+        approximate = []
         
-        if source_lang == 'spanish' and target_lang == 'nasa_yuwe':
-            for word in words:
-                if word in self.dictionary:
-                    translated_words.append(self.dictionary[word]['traduccion'])
-                    found_translations = True
-                else:
-                    translated_words.append(word)
+        # Entradas de varias palabras: coincidencia más larga en una sola pasada
+        phrases = analysis.phrases(reverse)
         
-        elif source_lang == 'nasa_yuwe' and target_lang == 'spanish':
-            # Crear diccionario inverso
-            reverse_dict = {}
-            for spanish_word, data in self.dictionary.items():
-                nasa_word = data['traduccion'].lower()
-                reverse_dict[nasa_word] = spanish_word
+        position = 0
+        while position < len(tokens):
+            token = tokens[position]
+            position += 1
+            
+            if token.position in phrases:
+                end, spanish_word = phrases[token.position]
+                translation = spanish_word if reverse else lexicon.entries[spanish_word]['traduccion']
+                translated_words.append(token.leading + translation + tokens[end - 1].trailing)
+                found_translations = True
+                position = end
+                continue
             
-            for word in words:
-                if word in reverse_dict:
-                    translated_words.append(reverse_dict[word])
+            # Probar la palabra completa (el Nasa Yuwe usa ' y - como letras)
+            # y luego su forma sin puntuación
+            translation = analysis.lookup(token.surface, reverse)
+            if translation is not None:
+                translated_words.append(translation)
+                found_translations = True
+                continue
+            
+            translation = analysis.lookup(token.clean, reverse) if token.clean else None
+            if translation is None and inflected and token.clean:
+                translation = analysis.inflected_lookup(token.clean, reverse, inflected)
+            if translation is not None:
+                translated_words.append(token.rebuild(translation))
+                found_translations = True
+                continue
+            
+            # Se resuelve al final: solo si alguna palabra se reconoció o se permiten aproximaciones
+            approximate.append((len(translated_words), token))
+            translated_words.append(token.surface.lower())
+        
+        if approximate and (found_translations or fuzzy):
+            # Errores de tipeo y palabras escritas sin tildes: entrada más cercana del índice aproximado
+            for position, token in approximate:
+                match = analysis.fuzzy_lookup(token.clean, reverse) if token.clean else None
+                if match is not None:
+                    matched_word, translation, distance = match
+                    translated_words[position] = token.rebuild(translation)
+                    fuzzy_matches.append({'word': token.clean, 'match': matched_word, 'distance': distance})
                     found_translations = True
-                else:
-                    translated_words.append(word)
         
         if found_translations:
-            result = ' '.join(translated_words)
-            return {
-                'translation': result,
+            result = {
+                'translation': ' '.join(translated_words),
                 'method': 'dictionary',
-                'confidence': 0.80,
+                'confidence': DICTIONARY_CONFIDENCE,
                 'tried_methods': ['dictionary']
             }
+            if fuzzy_matches:
+                # La confianza baja según la coincidencia aproximada más lejana
+                result['confidence'] = FUZZY_CONFIDENCE[max(match['distance'] for match in fuzzy_matches)]
+                result['fuzzy_matches'] = fuzzy_matches
+            return result
         
         return None
     
-    def _translate_with_nllb(self, text, source_lang, target_lang):
+    def _translate_with_nllb(self, text, source_lang, target_lang, profile=None, timer=None):
         """Traducción usando el modelo NLLB-200"""
+        return self._translate_with_nllb_batch([text], source_lang, target_lang, profile, timer)[0]
+    
+    def _translate_with_nllb_batch(self, texts: List[str], source_lang: str, target_lang: str,
+                                   profile: Optional[str] = None,
+                                   timer: Optional[StageTimer] = None) -> List[Optional[str]]:
+        """Traducir varios textos con NLLB a través del planificador de micro-lotes"""
         if not self.model_loaded:
-            return None
+            return [None] * len(texts)
         
+        return self.scheduler.translate_many(texts, source_lang, target_lang, self.resolve_profile(profile), timer)
+    
+    def _run_nllb_batch(self, texts: List[str], source_lang: str, target_lang: str,
+                        profile: Optional[str] = None,
+                        timer: Optional[StageTimer] = None) -> List[Optional[str]]:
+        """Traducir varios textos con una sola llamada (con relleno) a generate"""
+        timer = timer if timer is not None else StageTimer()
         try:
-            # Preparar el texto para NLLB
-            src_lang = self._get_language_code(source_lang)
-            tgt_lang = self._get_language_code(target_lang)
-            
-            # Tokenizar
-            inputs = self.tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Generar traducción
-            with torch.no_grad():
-                generated_tokens = self.model.generate(
-                    **inputs,
-                    forced_bos_token_id=self.tokenizer.lang_code_to_id[tgt_lang],
-                    max_length=512,
-                    num_beams=5,
-                    early_stopping=True
-                )
-            
-            # Decodificar resultado
-            translation = self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)[0]
-            return translation.strip()
-            
+            return self._generate(texts, source_lang, target_lang, profile, timer)
         except Exception as e:
             self.logger.error(f"Error en traducción NLLB: {e}")
-            return None
+            return [None] * len(texts)
+        finally:
+            profile = self.resolve_profile(profile)
+            for stage, seconds in timer.timings.items():
+                NLLB_BATCH_SECONDS.observe(seconds, (stage, profile))
+    
+    def _generate(self, texts: List[str], source_lang: str, target_lang: str,
+                  profile: Optional[str] = None, timer: Optional[StageTimer] = None) -> List[str]:
+        """Tokenizar, generar y decodificar un lote de textos con NLLB"""
+        import torch
+        
+        timer = timer if timer is not None else StageTimer()
+        settings = INFERENCE_PROFILES[self.resolve_profile(profile)]
+        
+        # Preparar el texto para NLLB
+        src_lang = self._get_language_code(source_lang)
+        tgt_lang = self._get_language_code(target_lang)
+        
+        # Tokenizar
+        with timer.stage('nllb.tokenize'):
+            inputs = self.tokenizer(texts, return_tensors="pt", padding=True, truncation=True, max_length=NLLB_MAX_LENGTH)
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        
+        # Limitar la longitud de salida en proporción a la entrada
+        max_length = NLLB_MAX_LENGTH
+        if settings['max_length_ratio']:
+            input_length = inputs['input_ids'].shape[1]
+            max_length = min(NLLB_MAX_LENGTH, int(input_length * settings['max_length_ratio']) + settings['max_length_offset'])
+        
+        # Generar traducción (num_beams=1 equivale a decodificación voraz)
+        with timer.stage('nllb.generate'), torch.no_grad():
+            generated_tokens = self.model.generate(
+                **inputs,
+                forced_bos_token_id=self.tokenizer.lang_code_to_id[tgt_lang],
+                max_length=max_length,
+                num_beams=settings['num_beams'],
+                early_stopping=settings['num_beams'] > 1
+            )
+        
+        # Decodificar resultado
+        with timer.stage('nllb.decode'):
+            translations = self.tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
+        return [translation.strip() for translation in translations]
     
-    def _translate_with_grammar(self, text: str, source_lang: str, target_lang: str) -> Dict:
+    def _translate_with_grammar(self, text: str, source_lang: str, target_lang: str,
+                                timer: Optional[StageTimer] = None,
+                                analysis: Optional[TextAnalysis] = None) -> Dict:
         """Traducir usando el motor gramatical"""
-        if self.grammar_engine:
+        grammar_engine = self.grammar_engine
+        timer = timer if timer is not None else StageTimer()
+        if grammar_engine:
             try:
+                # El mismo análisis sirve a ambos métodos (el motor descarta uno de otro léxico)
+                analysis = grammar_engine.analyze(text, source_lang, analysis)
+                
                 # Intentar con el método contextual mejorado primero
-                enhanced = self.grammar_engine.enhanced_contextual_translation(text, source_lang, target_lang)
+                with timer.stage('grammar.contextual'):
+                    enhanced = grammar_engine.enhanced_contextual_translation(text, source_lang, target_lang, analysis)
                 if enhanced and enhanced != text:
                     return {
                         'translation': enhanced,
@@ -169,8 +456,9 @@ class AdvancedTranslationModel:
                         'tried_methods': ['enhanced_grammar']
                     }
                 
-                # Fallback al método original
-                enhanced = self.grammar_engine.enhance_translation(text, source_lang, target_lang)
+                # Fallback al método original (su resultado ya está en el análisis)
+                with timer.stage('grammar.enhance'):
+                    enhanced = grammar_engine.enhance_translation(text, source_lang, target_lang, analysis)
                 if enhanced and enhanced != text:
                     return {
                         'translation': enhanced,
@@ -182,35 +470,74 @@ class AdvancedTranslationModel:
                 print(f"Error en motor gramatical: {e}")
         return None
     
-    def translate(self, text, source_lang='spanish', target_lang='nasa_yuwe'):
-        """Traducción híbrida usando múltiples métodos"""
-        if not text or not text.strip():
-            return {'translation': '', 'method': 'empty', 'confidence': 0}
+    def _translate_with_memory(self, text: str, source_lang: str, target_lang: str) -> Optional[Dict]:
+        """
+        Traducción corregida de la misma oración (o de una muy parecida) en la memoria de traducción.
         
-        text = text.strip()
+        La memoria solo devuelve oraciones parecidas que difieren en tildes o
+        en letras sueltas de las mismas palabras; reciben menos confianza que
+        una oración idéntica.
+        """
+        memory = self.memory
+        if not memory:
+            return None
+        match = memory.lookup(text, source_lang, target_lang)
+        if match is None:
+            return None
+        return {
+            'translation': match['translation'],
+            'method': 'translation_memory',
+            'confidence': MEMORY_CONFIDENCE if match['exact'] else NEAR_MEMORY_CONFIDENCE,
+            'tried_methods': ['translation_memory'],
+            'memory_match': {'source': match['source'], 'similarity': match['similarity']}
+        }
+    
+    def _translate_with_rules(self, text: str, source_lang: str, target_lang: str,
+                              timer: Optional[StageTimer] = None) -> Optional[Dict]:
+        """Etapas sin NLLB: memoria de traducción, diccionario, motor gramatical y por último entradas aproximadas"""
+        timer = timer if timer is not None else StageTimer()
         
-        # Intentar diferentes métodos de traducción en orden de prioridad
+        # Oraciones corregidas por los usuarios: sin análisis ni inferencia
+        with timer.stage('memory'):
+            memory_result = self._translate_with_memory(text, source_lang, target_lang)
+        if memory_result:
+            return memory_result
+        
+        # Un solo análisis del texto para todas las etapas, ligado a la versión del léxico del motor
+        grammar_engine = self.grammar_engine
+        lexicon = grammar_engine.lexicon if grammar_engine else self.lexicon
+        with timer.stage('analysis'):
+            analysis = TextAnalysis(text, source_lang, lexicon) if lexicon else None
         
         # 1. Intentar con diccionario personalizado (mayor precisión)
-        dict_result = self._translate_with_dictionary(text, source_lang, target_lang)
+        with timer.stage('dictionary'):
+            dict_result = self._translate_with_dictionary(text, source_lang, target_lang, analysis)
         if dict_result:
             return dict_result
         
         # 2. Intentar con motor gramatical mejorado
-        grammar_result = self._translate_with_grammar(text, source_lang, target_lang)
+        with timer.stage('grammar'):
+            grammar_result = self._translate_with_grammar(text, source_lang, target_lang, timer, analysis)
         if grammar_result:
             return grammar_result
         
-        # 3. Intentar con NLLB (solo para español-español como fallback)
-        if self.model_loaded and source_lang == 'spanish':
-            nllb_translation = self._translate_with_nllb(text, source_lang, 'spanish')
-            if nllb_translation and nllb_translation != text:
-                return {
-                    'translation': nllb_translation,
-                    'method': 'nllb',
-                    'confidence': 0.7,
-                    'tried_methods': ['dictionary', 'grammar', 'nllb']
-                }
+        # 3. Ninguna regla reconoce el texto: entradas aproximadas (tipeo, tildes)
+        with timer.stage('fuzzy'):
+            return self._translate_with_dictionary(text, source_lang, target_lang, analysis, fuzzy=True)
+    
+    def _needs_nllb(self, source_lang: str) -> bool:
+        """NLLB solo se usa para español-español como fallback"""
+        return self.model_loaded and source_lang == 'spanish'
+    
+    def _finish_translation(self, text: str, nllb_translation: Optional[str]) -> Dict:
+        """Resultado final a partir de la salida de NLLB (o del texto original)"""
+        if nllb_translation and nllb_translation != text:
+            return {
+                'translation': nllb_translation,
+                'method': 'nllb',
+                'confidence': 0.7,
+                'tried_methods': ['dictionary', 'grammar', 'nllb']
+            }
         
         # Fallback: devolver texto original
         return {
@@ -220,11 +547,157 @@ class AdvancedTranslationModel:
             'tried_methods': ['dictionary', 'grammar', 'nllb']
         }
     
+    def _cache_key(self, text: str, source_lang: str, target_lang: str, profile: str):
+        """Clave de caché ligada a las versiones del léxico y de la memoria y a la disponibilidad de NLLB"""
+        # Los resultados de respaldo calculados antes de cargar NLLB dejan de ser válidos
+        version = (self.lexicon.version if self.lexicon else 0, self.memory.version if self.memory else 0,
+                   self.model_loaded)
+        self.cache.sync_version(version)
+        return TranslationCache.make_key(text, source_lang, target_lang, version, profile)
+    
+    def translate(self, text, source_lang='spanish', target_lang='nasa_yuwe', profile=None, timer=None,
+                  allow_nllb=True):
+        """
+        Traducción híbrida usando múltiples métodos.
+        
+        Los tiempos de cada etapa se registran en las métricas del proceso y,
+        si se pasa un StageTimer en `timer`, se le suman también. Con
+        `allow_nllb=False`, cuando el texto solo puede traducirse con el
+        modelo devuelve sin esperar a NLLB una PendingTranslation, que
+        finish_translation completa sin repetir la caché ni las reglas.
+        """
+        if not text or not text.strip():
+            return {'translation': '', 'method': 'empty', 'confidence': 0}
+        
+        text = text.strip()
+        profile = self.resolve_profile(profile)
+        request_timer = StageTimer()
+        
+        # 0. Resultado en caché para frases repetidas
+        with request_timer.stage('cache'):
+            cache_key = self._cache_key(text, source_lang, target_lang, profile)
+            cached = self.cache.get(cache_key)
+        if cached is not None:
+            self._observe(request_timer, 'cache', source_lang, target_lang, timer)
+            return cached
+        
+        # Intentar diferentes métodos de traducción en orden de prioridad
+        result = self._translate_with_rules(text, source_lang, target_lang, request_timer)
+        if not result:
+            # 3. Intentar con NLLB (solo para español-español como fallback)
+            if self._needs_nllb(source_lang):
+                pending = PendingTranslation(text, source_lang, target_lang, profile, cache_key, request_timer)
+                if not allow_nllb:
+                    # El llamador decide dónde (y si) esperar al modelo
+                    return pending
+                return self.finish_translation(pending, timer)
+            result = self._finish_translation(text, None)
+        
+        self.cache.put(cache_key, result)
+        self._observe(request_timer, result['method'], source_lang, target_lang, timer)
+        return result
+    
+    def finish_translation(self, pending: 'PendingTranslation', timer: Optional[StageTimer] = None) -> Dict:
+        """Completar con NLLB una traducción que las reglas no resolvieron (devuelta por translate)"""
+        with pending.timer.stage('nllb'):
+            nllb_translation = self._translate_with_nllb(pending.text, pending.source_lang, 'spanish',
+                                                         pending.profile, pending.timer)
+        result = self._finish_translation(pending.text, nllb_translation)
+        self.cache.put(pending.cache_key, result)
+        self._observe(pending.timer, result['method'], pending.source_lang, pending.target_lang, timer)
+        return result
+    
+    def _observe(self, request_timer: StageTimer, method: str, source_lang: str, target_lang: str,
+                 timer: Optional[StageTimer] = None):
+        """Registrar los tiempos de una traducción y pasarlos al temporizador del llamador"""
+        observe_translation(request_timer, method, direction_label(source_lang, target_lang))
+        if timer is not None:
+            timer.merge(request_timer)
+    
+    def translate_batch(self, items: List[Dict]) -> List[Dict]:
+        """
+        Traducir varios textos a la vez.
+
+        Cada elemento es un diccionario con 'text', 'source_lang', 'target_lang'
+        y, opcionalmente, 'profile' (perfil de inferencia de NLLB).
+        Los textos idénticos se traducen una sola vez, las etapas de diccionario y
+        gramática se aplican a todo el lote y los textos que requieren NLLB se
+        encolan juntos en el planificador de micro-lotes. Devuelve un resultado
+        por elemento, en orden.
+        """
+        keys = []
+        results = {}
+        cache_keys = {}
+        pending_nllb = {}
+        timers = {}
+        
+        for item in items:
+            text = (item.get('text') or '').strip()
+            key = (text, item.get('source_lang', 'spanish'), item.get('target_lang', 'nasa_yuwe'),
+                   self.resolve_profile(item.get('profile')))
+            keys.append(key)
+            if key in results:
+                continue
+            
+            text, source_lang, target_lang, profile = key
+            if not text:
+                results[key] = {'translation': '', 'method': 'empty', 'confidence': 0}
+                continue
+            
+            timer = timers[key] = StageTimer()
+            with timer.stage('cache'):
+                cache_keys[key] = self._cache_key(text, source_lang, target_lang, profile)
+                results[key] = self.cache.get(cache_keys[key])
+            if results[key] is not None:
+                del cache_keys[key]
+                continue
+            
+            results[key] = self._translate_with_rules(text, source_lang, target_lang, timer)
+            if results[key] is None:
+                if self._needs_nllb(source_lang):
+                    pending_nllb.setdefault((source_lang, profile), []).append(key)
+                else:
+                    results[key] = self._finish_translation(text, None)
+        
+        # 3. NLLB por lotes: el planificador agrupa los textos pendientes en llamadas a generate
+        for (source_lang, profile), pending in pending_nllb.items():
+            nllb_timer = StageTimer()
+            with nllb_timer.stage('nllb'):
+                translations = self._translate_with_nllb_batch(
+                    [key[0] for key in pending], source_lang, 'spanish', profile, nllb_timer)
+            for key, nllb_translation in zip(pending, translations):
+                results[key] = self._finish_translation(key[0], nllb_translation)
+                timers[key].merge(nllb_timer)
+        
+        # Guardar en caché solo los resultados recién calculados
+        for key, cache_key in cache_keys.items():
+            self.cache.put(cache_key, results[key])
+        
+        # Métricas por texto: la duración es la suma de sus etapas (no la del lote completo)
+        for key, timer in timers.items():
+            method = 'cache' if key not in cache_keys else results[key]['method']
+            seconds = sum(seconds for stage, seconds in timer.timings.items() if '.' not in stage)
+            observe_translation(timer, method, direction_label(key[1], key[2]), seconds)
+        
+        # Los textos repetidos reciben copias independientes del mismo resultado
+        return [copy.deepcopy(results[key]) for key in keys]
+    
     def get_model_info(self):
         """Obtener información sobre el estado del modelo"""
         return {
             'nllb_loaded': self.model_loaded,
+            'nllb_status': self.component_status['nllb'],
             'dictionary_entries': len(self.dictionary),
             'grammar_engine_loaded': self.grammar_engine is not None,
-            'device': str(self.device) if self.model_loaded else 'N/A'
+            'device': str(self.device) if self.model_loaded else 'N/A',
+            'dictionary_version': self.lexicon.version if self.lexicon else 0,
+            'translation_memory_entries': len(self.memory) if self.memory else 0,
+            'inference_profile': {
+                'name': self.inference_profile,
+                'precision': self.precision or INFERENCE_PROFILES[self.inference_profile]['precision'],
+                'settings': dict(INFERENCE_PROFILES[self.inference_profile]),
+                'available': sorted(INFERENCE_PROFILES)
+            },
+            'cache': self.cache.stats(),
+            'nllb_scheduler': self.scheduler.stats()
         }
\ No newline at end of file